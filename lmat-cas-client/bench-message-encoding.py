@@ -0,0 +1,117 @@
+import timeit
+
+import jsonpickle
+from lmat_cas_client.MessageEncoding import ENCODINGS, decode_frame
+from tabulate import tabulate
+
+# compares encode / decode time and frame size of the supported message encodings,
+# and jsonpickle, which was used before encodings could be negotiated, for typical messages.
+
+REPEATS = 2000
+
+
+def environment(definition_count: int) -> dict:
+    return {
+        "variables": {
+            f"x_{{{i}}}": f"{i} \\cdot y + \\frac{{1}}{{{i + 1}}}"
+            for i in range(definition_count)
+        },
+        "functions": {
+            f"f_{{{i}}}": {"args": ["x", "y"], "expr": f"x^{{{i}}} + \\sin(y)"}
+            for i in range(definition_count)
+        },
+        "symbols": {
+            f"s_{{{i}}}": ["real", "positive"] for i in range(definition_count)
+        },
+        "unit_system": "SI",
+        "domain": "",
+    }
+
+
+def start_message(expression: str, environment: dict) -> dict:
+    return {
+        "type": "start",
+        "uid": "0b4a2d43-3c1e-4c4e-9f55-0c2f1f8e29a1",
+        "payload": {
+            "command_type": "eval",
+            "start_args": {"expression": expression, "environment": environment},
+        },
+    }
+
+
+def result_message(value: dict) -> dict:
+    return {
+        "status": "success",
+        "uid": "0b4a2d43-3c1e-4c4e-9f55-0c2f1f8e29a1",
+        "payload": {"type": "result", "value": value},
+    }
+
+
+MATRIX_LATEX = (
+    r"\begin{bmatrix}"
+    + r" \\ ".join(
+        " & ".join(rf"\frac{{{i}}}{{{j + 1}}} x" for j in range(20)) for i in range(20)
+    )
+    + r"\end{bmatrix}"
+)
+
+TRUTH_TABLE_LATEX = (
+    r"\begin{array}{c:c:c:c:c:c|c}p&q&r&s&t&u & p \wedge q\\ \hline "
+    + r"\\ \hline ".join(
+        "&".join(r"\text{T}" if (row >> col) & 1 else r"\text{F}" for col in range(7))
+        for row in range(64)
+    )
+    + r"\end{array}"
+)
+
+MESSAGES = {
+    "small eval": start_message("x + x", environment(0)),
+    "large environment": start_message(r"f_{1}(x_{2}, 2)", environment(200)),
+    "matrix result": result_message({
+        "evaluated_expression": MATRIX_LATEX,
+        "metadata": {"separator": "="},
+    }),
+    "truth table result": result_message({"truth_table": TRUTH_TABLE_LATEX}),
+}
+
+
+def benchmark(encode, decode, message: dict) -> tuple[float, float, int]:
+    frame = encode(message)
+
+    encode_time = timeit.timeit(lambda: encode(message), number=REPEATS) / REPEATS
+    decode_time = timeit.timeit(lambda: decode(frame), number=REPEATS) / REPEATS
+    frame_size = len(frame.encode() if isinstance(frame, str) else frame)
+
+    return encode_time, decode_time, frame_size
+
+
+encoders = {
+    "jsonpickle": (jsonpickle.encode, jsonpickle.decode),
+    **{name: (encoding.encode, decode_frame) for name, encoding in ENCODINGS.items()},
+}
+
+rows = []
+
+for message_name, message in MESSAGES.items():
+    # sanity check all encodings round trip the message.
+    assert all(
+        decode(encode(message)) == message for encode, decode in encoders.values()
+    )
+
+    for encoder_name, (encode, decode) in encoders.items():
+        encode_time, decode_time, frame_size = benchmark(encode, decode, message)
+        rows.append([
+            message_name,
+            encoder_name,
+            f"{encode_time * 1e6:.1f}",
+            f"{decode_time * 1e6:.1f}",
+            frame_size,
+        ])
+
+print(
+    tabulate(
+        rows,
+        headers=["message", "encoding", "encode (us)", "decode (us)", "bytes"],
+        tablefmt="pipe",
+    )
+)
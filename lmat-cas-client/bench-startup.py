@@ -0,0 +1,87 @@
+import os
+import statistics
+import subprocess
+import sys
+
+from tabulate import tabulate
+
+# measures the time it takes to import everything lmat-cas-client.py needs before connecting to the plugin,
+# using python -X importtime in a fresh interpreter for every run, so nothing is cached in memory between runs.
+# the median total is reported, along with the imports contributing the most to it.
+
+RUNS = 10
+SLOWEST_IMPORT_COUNT = 15
+
+CLIENT_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "lmat-cas-client.py"
+)
+
+# imports the client script without running it, as it is only run if it is the main module.
+IMPORT_CLIENT = f"import runpy; runpy.run_path({CLIENT_SCRIPT!r})"
+
+
+# returns the self and cumulative import time in microseconds of every imported module, in the order reported.
+def measure_imports() -> list[tuple[str, int, int]]:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_CLIENT],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(CLIENT_SCRIPT),
+    )
+
+    imports = []
+
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_time, cumulative_time, module = line.removeprefix("import time:").split(
+            "|"
+        )
+        imports.append((module, int(self_time), int(cumulative_time)))
+
+    return imports
+
+
+# modules imported directly by the script, or any module they did not already import, are not indented.
+def total_import_time(imports: list[tuple[str, int, int]]) -> int:
+    return sum(
+        cumulative_time
+        for module, _, cumulative_time in imports
+        if not module[1:].startswith(" ")
+    )
+
+
+runs = [measure_imports() for _ in range(RUNS)]
+totals = [total_import_time(imports) for imports in runs]
+median_run = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+print(f"total import time over {RUNS} runs (ms):")
+print(
+    tabulate(
+        [
+            [
+                f"{statistics.median(totals) / 1000:.1f}",
+                f"{min(totals) / 1000:.1f}",
+                f"{max(totals) / 1000:.1f}",
+            ]
+        ],
+        headers=["median", "min", "max"],
+        tablefmt="pipe",
+    )
+)
+
+print("\nslowest imports of the median run, by self time (ms):")
+print(
+    tabulate(
+        [
+            [module.strip(), f"{self_time / 1000:.1f}", f"{cumulative_time / 1000:.1f}"]
+            for module, self_time, cumulative_time in sorted(
+                median_run, key=lambda entry: entry[1], reverse=True
+            )[:SLOWEST_IMPORT_COUNT]
+        ],
+        headers=["module", "self", "cumulative"],
+        tablefmt="pipe",
+    )
+)
@@ -1,67 +1,341 @@
+import argparse
 import asyncio
+import json
+import multiprocessing
 import os
+import sqlite3
 import sys
+import traceback
 
+from lmat_cas_client.caching.DiskResultCache import DiskResultCache
+from lmat_cas_client.caching.ResultCache import ResultCache
 from lmat_cas_client.Client import LmatCasClient
-from lmat_cas_client.command_handlers.ApartHandler import ApartHandler
-from lmat_cas_client.command_handlers.ConvertSympyHandler import ConvertSympyHandler
-from lmat_cas_client.command_handlers.ConvertUnitsHandler import ConvertUnitsHandler
-from lmat_cas_client.command_handlers.EvalfHandler import EvalfHandler
-from lmat_cas_client.command_handlers.EvalHandler import EvalHandler
-from lmat_cas_client.command_handlers.ExpandHandler import ExpandHandler
-from lmat_cas_client.command_handlers.FactorHandler import FactorHandler
-from lmat_cas_client.command_handlers.SolveHandler import SolveHandler, SolveInfoHandler
-from lmat_cas_client.command_handlers.SymbolSetHandler import SymbolSetHandler
-from lmat_cas_client.command_handlers.test_handlers.TestHangHandler import (
-    TestHangHandler,
+from lmat_cas_client.command_handlers.LazyCommandHandler import LazyCommandHandler
+from lmat_cas_client.command_handlers.StatsHandler import StatsHandler
+from lmat_cas_client.execution.CommandScheduler import CommandScheduler
+from lmat_cas_client.execution.DefinitionCompilerPool import (
+    DefinitionCompilerPool,
+    set_compiler_pool,
 )
-from lmat_cas_client.command_handlers.TruthTableHandler import TruthTableHandler
-from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
-from lmat_cas_client.math_lib.setup import setup_mathlib
+from lmat_cas_client.execution.ProcessPoolBackend import ProcessPoolBackend
+from lmat_cas_client.monitoring.MemoryWatchdog import MemoryWatchdog
 
-if len(sys.argv) != 2:
-    print(
-        "Usage:"
-        f"\npython {os.path.basename(__file__)} [port]"
-        "\n\tport - port number on local host the plugin server is listening at."
+# commands the user is actively waiting on are run before potentially long running background commands.
+INTERACTIVE_PRIORITY = 1
+BACKGROUND_PRIORITY = 0
+
+# handlers are only imported once they handle their first command, as importing them imports sympy and loads the parser,
+# which would otherwise delay connecting to the plugin, and thereby obsidian startup, by more than a second.
+# Use bench-startup.py to measure the startup time.
+LATEX_COMPILER = "lmat_cas_client.compiling.Compiler:LatexToSympyCompiler"
+
+
+def compiling_handler(handler_path: str) -> LazyCommandHandler:
+    return LazyCommandHandler(
+        f"lmat_cas_client.command_handlers.{handler_path}", LATEX_COMPILER
     )
-    sys.exit(1)
 
-port = int(sys.argv[1])
 
-setup_mathlib()
+# handlers of the evaluate modes of the plugin, these can also be used in batch mode.
+EVALUATE_HANDLER_PATHS = {
+    "eval": "EvalHandler:EvalHandler",
+    "evalf": "EvalfHandler:EvalfHandler",
+    "expand": "ExpandHandler:ExpandHandler",
+    "factor": "FactorHandler:FactorHandler",
+    "apart": "ApartHandler:ApartHandler",
+}
 
-client = LmatCasClient()
 
-client.register_handler("eval", EvalHandler(LatexToSympyCompiler()))
-client.register_handler("evalf", EvalfHandler(LatexToSympyCompiler()))
-client.register_handler("expand", ExpandHandler(LatexToSympyCompiler()))
-client.register_handler("factor", FactorHandler(LatexToSympyCompiler()))
-client.register_handler("apart", ApartHandler(LatexToSympyCompiler()))
-client.register_handler("solve", SolveHandler(LatexToSympyCompiler()))
-client.register_handler("solve-info", SolveInfoHandler(LatexToSympyCompiler()))
-client.register_handler("symbolsets", SymbolSetHandler(LatexToSympyCompiler()))
-client.register_handler("convert-sympy", ConvertSympyHandler(LatexToSympyCompiler()))
-client.register_handler("convert-units", ConvertUnitsHandler(LatexToSympyCompiler()))
-client.register_handler("truth-table", TruthTableHandler(LatexToSympyCompiler()))
+def parse_args() -> argparse.Namespace:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument(
+        "port",
+        type=int,
+        nargs="?",
+        help="port number on local host the plugin server is listening at.",
+    )
+    arg_parser.add_argument(
+        "--batch",
+        nargs="+",
+        metavar="MARKDOWN_FILE",
+        help="evaluate every equation in the given markdown files, without connecting to the plugin, "
+        "and write the results as json. exits with status 1 if any equation failed to evaluate. "
+        "equations are evaluated in a process pool, with one worker per cpu core unless --workers is given.",
+    )
+    arg_parser.add_argument(
+        "--batch-output",
+        default=None,
+        help="file to write batch results to, they are written to stdout if not given.",
+    )
+    arg_parser.add_argument(
+        "--batch-command",
+        default="eval",
+        choices=list(EVALUATE_HANDLER_PATHS),
+        help="command equations are evaluated with in batch mode.",
+    )
+    arg_parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="number of worker processes to evaluate commands in. "
+        "0 runs every command in a thread of the client process instead. "
+        "negative values use one worker per cpu core.",
+    )
+    arg_parser.add_argument(
+        "--compile-workers",
+        type=int,
+        default=0,
+        help="number of processes to compile the definitions of large environments in, without worker processes. "
+        "the processes are only started once an environment is large enough to benefit from them. "
+        "0 or 1 compiles them in the thread running the command instead. "
+        "negative values use one process per cpu core.",
+    )
+    arg_parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=256,
+        help="maximum number of commands waiting to run, further commands are rejected.",
+    )
+    arg_parser.add_argument(
+        "--result-cache-size",
+        type=int,
+        default=64,
+        help="memory budget in megabytes for caching command results. 0 disables the cache.",
+    )
+    arg_parser.add_argument(
+        "--result-cache-file",
+        default=None,
+        help="sqlite database file to persist cached command results in between runs.",
+    )
+    arg_parser.add_argument(
+        "--result-cache-version",
+        default="",
+        help="version of the plugin, persisted results from other versions are discarded.",
+    )
+    arg_parser.add_argument(
+        "--memory-soft-limit",
+        type=int,
+        default=512,
+        help="memory usage in megabytes of a worker, above which it clears its caches. 0 disables the limit.",
+    )
+    arg_parser.add_argument(
+        "--memory-hard-limit",
+        type=int,
+        default=1024,
+        help="memory usage in megabytes of a worker, above which it is replaced by a fresh worker. "
+        "0 disables the limit. without worker processes, caches are cleared instead.",
+    )
+    arg_parser.add_argument(
+        "--max-worker-requests",
+        type=int,
+        default=0,
+        help="number of commands a worker handles before it is replaced by a fresh worker. 0 disables the limit.",
+    )
+    arg_parser.add_argument(
+        "--no-warm-up",
+        action="store_true",
+        help="skip running representative commands on startup, "
+        "the first commands are then slower, as they pay for loading the parser, lazy imports and cold caches.",
+    )
+
+    args = arg_parser.parse_args()
+
+    if (args.port is None) == (args.batch is None):
+        arg_parser.error("either a port or --batch must be given.")
+
+    return args
 
-# test specific handlers
 
-client.register_handler("test-hang", TestHangHandler())
+def create_client(
+    args: argparse.Namespace, disk_cache: DiskResultCache | None
+) -> LmatCasClient:
+    execution_backend = None
+    result_cache = None
+    scheduler = CommandScheduler(max_pending=args.max_pending)
+    # threads share the interpreter, so only a few background commands should compete with interactive ones.
+    background_concurrency = 2
 
+    if args.workers != 0:
+        execution_backend = ProcessPoolBackend(
+            args.workers if args.workers > 0 else None
+        )
+        # let the scheduler order commands waiting on a worker,
+        # and always keep a worker available for interactive commands.
+        scheduler.max_running = execution_backend.worker_count
+        background_concurrency = max(1, execution_backend.worker_count - 1)
 
-async def main():
+    if args.result_cache_size > 0:
+        result_cache = ResultCache(
+            max_bytes=args.result_cache_size * 1024 * 1024, disk_cache=disk_cache
+        )
+
+    memory_watchdog = MemoryWatchdog(
+        soft_limit_bytes=args.memory_soft_limit * 1024 * 1024
+        if args.memory_soft_limit > 0
+        else None,
+        hard_limit_bytes=args.memory_hard_limit * 1024 * 1024
+        if args.memory_hard_limit > 0
+        else None,
+        max_requests=args.max_worker_requests if args.max_worker_requests > 0 else None,
+    )
+
+    client = LmatCasClient(
+        execution_backend,
+        result_cache,
+        scheduler,
+        warm_up=not args.no_warm_up,
+        memory_watchdog=memory_watchdog,
+    )
+
+    interactive = dict(priority=INTERACTIVE_PRIORITY)
+    background = dict(
+        priority=BACKGROUND_PRIORITY, max_concurrency=background_concurrency
+    )
+
+    for command_type, handler_path in EVALUATE_HANDLER_PATHS.items():
+        client.register_handler(
+            command_type, compiling_handler(handler_path), **interactive
+        )
+
+    client.register_handler(
+        "solve", compiling_handler("SolveHandler:SolveHandler"), **background
+    )
+    client.register_handler(
+        "solve-info", compiling_handler("SolveHandler:SolveInfoHandler"), **interactive
+    )
+    client.register_handler(
+        "symbolsets",
+        compiling_handler("SymbolSetHandler:SymbolSetHandler"),
+        **interactive,
+    )
+    client.register_handler(
+        "convert-sympy",
+        compiling_handler("ConvertSympyHandler:ConvertSympyHandler"),
+        **interactive,
+    )
+    client.register_handler(
+        "convert-units",
+        compiling_handler("ConvertUnitsHandler:ConvertUnitsHandler"),
+        **interactive,
+    )
+    client.register_handler(
+        "truth-table",
+        compiling_handler("TruthTableHandler:TruthTableHandler"),
+        **background,
+    )
+
+    client.register_handler("stats", StatsHandler(client), local=True)
+
+    # test specific handlers
+
+    client.register_handler(
+        "test-hang",
+        LazyCommandHandler(
+            "lmat_cas_client.command_handlers.test_handlers.TestHangHandler:TestHangHandler"
+        ),
+        cacheable=False,
+    )
+
+    return client
+
+
+# Create the pool compiling definitions of large environments, None if they should be compiled serially.
+def create_compiler_pool(args: argparse.Namespace) -> DefinitionCompilerPool | None:
+    # worker processes compile their definitions themselves, and cannot start processes of their own.
+    if args.workers != 0:
+        return None
+
+    worker_count = (
+        args.compile_workers if args.compile_workers >= 0 else (os.cpu_count() or 1)
+    )
+
+    # a single process would only compile serially, with the overhead of sending definitions back and forth.
+    if worker_count <= 1:
+        return None
+
+    return DefinitionCompilerPool(worker_count)
+
+
+async def main(client: LmatCasClient, port: int):
     await client.connect(port)
     await client.run_message_loop()
 
 
-# set this policy so async functions work in threads on windows.
-# otherwise exceptions randomly occur when async loops terminate.
-if (
-    sys.version_info[0] == 3
-    and sys.version_info[1] >= 8
-    and sys.platform.startswith("win")
-):
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+# Evaluate the equations of the batch markdown files, and write the results.
+# Returns the exit status of the client.
+def run_batch(args: argparse.Namespace) -> int:
+    # extracting equations requires the environment models, which import the compiler,
+    # so batch mode is only imported when it is used, to keep it from slowing down the startup of the client.
+    from lmat_cas_client.headless.BatchEvaluator import evaluate_markdown_files
+
+    report = asyncio.run(
+        evaluate_markdown_files(
+            args.batch,
+            {
+                args.batch_command: compiling_handler(
+                    EVALUATE_HANDLER_PATHS[args.batch_command]
+                )
+            },
+            # the report may be written to stdout, so equations printing anything must not mix with it.
+            ProcessPoolBackend(
+                args.workers if args.workers > 0 else None, stdout_to_stderr=True
+            ),
+            args.batch_command,
+        )
+    )
+
+    if args.batch_output is None:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.batch_output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    summary = report["summary"]
+    return 1 if summary["errors"] > 0 or summary["file_errors"] > 0 else 0
+
+
+# worker processes are spawned by re-running this file,
+# so everything below must only run in the main process.
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    args = parse_args()
+
+    if args.batch is not None:
+        sys.exit(run_batch(args))
+
+    disk_cache = None
+
+    if args.result_cache_file is not None and args.result_cache_size > 0:
+        try:
+            disk_cache = DiskResultCache(
+                args.result_cache_file, args.result_cache_version
+            )
+        except sqlite3.Error:
+            # a broken cache file should never prevent the client from starting.
+            traceback.print_exc(file=sys.stderr)
+
+    client = create_client(args, disk_cache)
+    compiler_pool = create_compiler_pool(args)
+
+    if compiler_pool is not None:
+        set_compiler_pool(compiler_pool)
+
+    # set this policy so async functions work in threads on windows.
+    # otherwise exceptions randomly occur when async loops terminate.
+    if (
+        sys.version_info[0] == 3
+        and sys.version_info[1] >= 8
+        and sys.platform.startswith("win")
+    ):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    try:
+        asyncio.run(main(client, args.port))
+    finally:
+        if compiler_pool is not None:
+            compiler_pool.shutdown()
 
-asyncio.run(main())
+        if disk_cache is not None:
+            disk_cache.close()
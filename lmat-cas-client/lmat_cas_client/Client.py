@@ -1,29 +1,81 @@
 import asyncio
-import ctypes
 import sys
 import traceback
-from threading import Thread
 from typing import *
 
-import jsonpickle
 import websockets
 
-from lmat_cas_client.command_handlers.CommandHandler import CommandHandler
+from lmat_cas_client.caching.ResultCache import ResultCache
+from lmat_cas_client.command_handlers.CommandHandler import (
+    FALLBACK_RESULT,
+    PARTIAL_RESULT,
+    CommandHandler,
+)
+from lmat_cas_client.EnvironmentSessions import (
+    EnvironmentSessions,
+    UnknownEnvironmentError,
+)
+from lmat_cas_client.execution.CommandScheduler import CommandScheduler
+from lmat_cas_client.execution.ExecutionBackend import CommandError, ExecutionBackend
+from lmat_cas_client.execution.ThreadBackend import ThreadBackend
+from lmat_cas_client.MessageEncoding import (
+    JsonEncoding,
+    MessageEncoding,
+    decode_frame,
+    negotiate_encoding,
+)
+from lmat_cas_client.monitoring.ClientStats import ClientStats
+from lmat_cas_client.monitoring.MemoryWatchdog import MemoryWatchdog
+from lmat_cas_client.monitoring.ProcessMemory import process_rss_bytes
 
 
-class ThreadKill(Exception):
+class HandlerError(Exception):
     pass
 
 
-class KillableThread(Thread):
-    def kill(self):
-        ctypes.pythonapi.PyThreadState_SetAsyncExc(
-            ctypes.c_long(self.ident), ctypes.py_object(ThreadKill)
+# A CommandJob is a single execution of a command, which one or more start messages (subscribers) wait on.
+class CommandJob:
+    def __init__(
+        self, job_id: str, command_type: str, start_args: dict, key: str | None
+    ):
+        self.job_id = job_id
+        self.command_type = command_type
+        self.start_args = start_args
+        # identifies commands which produce the same result, None if the command is not cacheable.
+        self.key = key
+        # identifies the start messages which may subscribe to this job, None if the command is not cacheable.
+        # deadlines are part of it, as subscribers would otherwise get fallback results, or be stopped, at a deadline they did not ask for.
+        self.coalescing_key = (
+            None if key is None else (key, start_args.get("deadline_ms"))
         )
+        # uids of start messages waiting on the result of this job.
+        self.subscribers: list[str] = []
+        # subscribers which are sent partial results as the job reports them.
+        self.streaming_subscribers: set[str] = set()
+        self.task: asyncio.Task | None = None
+        # event loop time the job must be responded to by, None if it has no deadline.
+        self.deadline: float | None = None
+        # payload of the last fallback result reported by the job, responded with if the deadline is exceeded.
+        self.fallback_payload: tuple[str, dict] | None = None
+
+    def set_fallback_payload(self, payload: tuple[str, dict]):
+        self.fallback_payload = payload
+
+
+# Describe why the given batch item cannot be started, None if it can.
+def _batch_item_error(item) -> str | None:
+    if not isinstance(item, dict):
+        return "Batch item is not an object"
+
+    for field, field_type in (
+        ("uid", str),
+        ("command_type", str),
+        ("start_args", dict),
+    ):
+        if not isinstance(item.get(field), field_type):
+            return f"Batch item has no valid {field}"
 
-
-class HandlerError(Exception):
-    pass
+    return None
 
 
 #
@@ -31,35 +83,172 @@ class HandlerError(Exception):
 # The connection works based on 'handle keys', which act like message types.
 # A handle key is simply a string indicating what sort of data is sent as the payload, and how it should be handled.
 # The payload is always a json object decoded into a python object.
+# Responses are sent as json, until the plugin negotiates a more compact encoding with a protocol message.
 #
 # Each handle key has a handler registered, which is called with the received payload.
 #
+# Commands are executed by an execution backend, by default each command runs in its own thread.
+# Before being executed, commands wait in the scheduler until their priority and concurrency limits allow them to run.
+# Everything else, including sending responses, happens on the event loop running the message loop.
+#
+# If a result cache is given, results of cacheable commands are cached,
+# and identical commands are responded to from the cache without being executed again.
+# Identical cacheable commands received while one is already running subscribe to the running command,
+# instead of being executed again.
+#
+# Commands may specify a deadline_ms start arg, once it has passed, the command is stopped,
+# and responded to with the last fallback result it reported, or an error if it reported none.
+# Only start messages with the same deadline_ms are coalesced, and the deadline of a job is set by the start message which created it.
+#
+# Start messages may set stream, in which case partial results reported by the command
+# are sent in partial status responses, before the final response.
+# Only commands started by a streaming start message report partial results.
+#
+# If warm_up is set, the execution backend runs a corpus of representative commands in the background on start,
+# so the first commands do not pay for lazy imports, parser loading and cold caches.
+# A ready message is responded to with the warm-up timings, once the warm-up has finished.
+# Commands are still accepted while warming up, they just run at cold start speed.
+#
+# If a memory watchdog is given, the execution backend checks the memory usage of its workers after every command,
+# clearing their caches or recycling them once they exceed its limits.
+# The memory usage of the workers is reported along with the other stats of the client.
+#
+# The plugin may open environment sessions with an env-open message, update single definitions of them with env-update messages,
+# and close them again with env-close messages. Start args may then refer to an open environment by its environment_id,
+# which is replaced with the current environment of the session before the command is cached or executed.
+#
+# Local handlers are run directly on the event loop, instead of on the execution backend,
+# so they have access to the client itself, e.g. to report its stats. They must therefore return quickly.
+#
+# Start messages may specify a slot, in which case a new start message with the same slot
+# interrupts the previous start message in the slot, if it is still waiting on its result.
+#
 class LmatCasClient:
     SUCCESS_STATUS = "success"
+    PARTIAL_STATUS = "partial"
     ERR_STATUS = "error"
     INTERRUPT_STATUS = "interrupted"
 
-    def __init__(self):
+    def __init__(
+        self,
+        execution_backend: ExecutionBackend | None = None,
+        result_cache: ResultCache | None = None,
+        scheduler: CommandScheduler | None = None,
+        warm_up: bool = False,
+        memory_watchdog: MemoryWatchdog | None = None,
+    ):
         self.command_handlers: dict[str, CommandHandler] = {}
-        self.command_handler_threads: dict[str, Thread] = {}
+        self.local_command_handlers: dict[str, CommandHandler] = {}
+        self.cacheable_commands: set[str] = set()
+        # jobs by the uids of the start messages subscribed to them.
+        self.command_jobs: dict[str, CommandJob] = {}
+        # running jobs of cacheable commands by their coalescing key.
+        self.coalesced_jobs: dict[tuple[str, float | None], CommandJob] = {}
+        # uids of start messages waiting on a result in each slot, and the reverse mapping.
+        self.slot_uids: dict[str, str] = {}
+        self.uid_slots: dict[str, str] = {}
+        self.environment_sessions = EnvironmentSessions()
+
+        self.execution_backend = (
+            execution_backend if execution_backend is not None else ThreadBackend()
+        )
+        self.result_cache = result_cache
+        self.scheduler = scheduler if scheduler is not None else CommandScheduler()
+        self.stats = ClientStats()
+        self.warm_up = warm_up
+        self.memory_watchdog = memory_watchdog
+        # tasks waiting on the execution backend to become ready, before responding to a ready message.
+        self._ready_tasks: set[asyncio.Task] = set()
 
         self.pending_message_responses: set[str] = set()
 
         self.connection = None
+        # encoding of sent responses, received messages are decoded based on their frame type instead.
+        self.encoding: MessageEncoding = JsonEncoding()
+        # encoded responses waiting to be sent, this queue is only ever accessed from the message loop.
+        self._send_queue: asyncio.Queue[str | bytes] | None = None
 
     # Connect to a Latex Math plugin currently hosting on the local host at the given port.
     async def connect(self, port: int):
         self.connection = await websockets.connect(f"ws://localhost:{port}")
 
     # Register a message handler.
-    def register_handler(self, handler_key: str, handler_factory: CommandHandler):
+    # Results of cacheable handlers may be reused for commands with identical start args,
+    # so only handlers producing the same result for the same input should be cacheable.
+    # Pending commands with a higher priority are run first,
+    # and at most max_concurrency commands of this handler run at the same time, if given.
+    # Local handlers are never cached or scheduled.
+    def register_handler(
+        self,
+        handler_key: str,
+        handler_factory: CommandHandler,
+        *,
+        cacheable: bool = True,
+        priority: int = 0,
+        max_concurrency: int | None = None,
+        local: bool = False,
+    ):
+        if local:
+            self.local_command_handlers[handler_key] = handler_factory
+            return
+
         self.command_handlers[handler_key] = handler_factory
+        self.scheduler.configure(handler_key, priority, max_concurrency)
+
+        if cacheable:
+            self.cacheable_commands.add(handler_key)
+        else:
+            self.cacheable_commands.discard(handler_key)
+
+    # Retreive a json serializable snapshot of the client stats, the scheduler queue, the result cache,
+    # the client process memory usage, and the memory usage of the workers of the execution backend.
+    def get_stats(self) -> dict:
+        return dict(
+            **self.stats.to_dict(),
+            scheduler=dict(
+                running=self.scheduler.running_count,
+                pending=self.scheduler.pending_count,
+                queue_depths=self.scheduler.queue_depths(),
+            ),
+            result_cache=None
+            if self.result_cache is None
+            else dict(
+                entries=len(self.result_cache),
+                size_bytes=self.result_cache.size_bytes,
+                hits=self.result_cache.hits,
+                misses=self.result_cache.misses,
+                evictions=self.result_cache.evictions,
+                hit_ratio=self.result_cache.hit_ratio(),
+            ),
+            rss_bytes=process_rss_bytes(),
+            memory=self.execution_backend.memory_stats(),
+        )
 
     # Start the message loop, this is required to run, before any handlers will be called.
     async def run_message_loop(self):
+        self._send_queue = asyncio.Queue()
+        send_task = asyncio.create_task(self._send_loop())
+
+        self.execution_backend.start(
+            self.command_handlers, self.warm_up, self.memory_watchdog
+        )
+
+        try:
+            await self._message_loop()
+            # make sure the exit response is sent before returning.
+            await self._send_queue.join()
+        finally:
+            send_task.cancel()
+
+            for ready_task in self._ready_tasks:
+                ready_task.cancel()
+
+            self.execution_backend.shutdown()
+
+    async def _message_loop(self):
         while True:
             try:
-                message = jsonpickle.decode(await self.connection.recv())
+                message = decode_frame(await self.connection.recv())
 
                 uid = message["uid"]
                 message_type = message["type"]
@@ -69,107 +258,408 @@ class LmatCasClient:
 
                 match message_type:
                     case "exit":
-                        await self._respond_success(uid, "exit", {})
+                        self._respond_success(uid, "exit", {})
                         break
                     case "start":
-                        await self._start_handler(payload, uid)
+                        self._start_handler(payload, uid)
+                    case "start-batch":
+                        self._start_batch_handler(payload, uid)
                     case "interrupt":
-                        await self._interrupt_handler(payload["target_uids"], uid)
+                        self._interrupt_handler(payload["target_uids"], uid)
+                    case "protocol":
+                        self._protocol_handler(payload["encodings"], uid)
+                    case "ready":
+                        self._ready_handler(uid)
+                    case "env-open":
+                        self._env_open_handler(payload, uid)
+                    case "env-update":
+                        self._env_update_handler(payload, uid)
+                    case "env-close":
+                        self._env_close_handler(payload, uid)
                     case _:
                         # If we get here in a release build, then either the cas client or the plugin source is not the same version.
                         # A plugin reinstall should (hopefully) install a cas client and plugin source with the same version.
-                        await self._respond_error(
+                        self._respond_error(
                             uid,
-                            dev_message=f"Unsupported message type: {message.type}",
+                            dev_message=f"Unsupported message type: {message_type}",
                             usr_message="Message type is not supported, please try reinstalling the plugin.",
                         )
             except Exception:
                 traceback.print_exc(file=sys.stderr)
 
-    async def _start_handler(self, payload: dict, uid: str):
-        if payload["command_type"] not in self.command_handlers:
-            await self._respond_error(
+    # Send queued responses to the plugin, one at a time, in the order they were queued.
+    async def _send_loop(self):
+        while True:
+            response = await self._send_queue.get()
+
+            try:
+                await self.connection.send(response)
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+            finally:
+                self._send_queue.task_done()
+
+    # Switch to the most preferred of the given encodings which is supported.
+    # The response is still encoded with the previous encoding, every response after it uses the new one.
+    def _protocol_handler(self, encoding_names: list[str], uid: str):
+        encoding = negotiate_encoding(encoding_names)
+        self._respond_success(uid, "protocol", dict(encoding=encoding.name))
+        self.encoding = encoding
+
+    # Respond with the warm-up timings of the execution backend, once it has finished warming up.
+    def _ready_handler(self, uid: str):
+        async def respond_when_ready():
+            try:
+                warm_up_timings = await self.execution_backend.wait_until_ready()
+            except Exception as e:
+                self._respond_error(
+                    uid,
+                    dev_message=str(e) + "\n" + traceback.format_exc(),
+                    usr_message=str(e),
+                )
+                return
+
+            self._respond_success(uid, "ready", dict(warm_up=warm_up_timings))
+
+        ready_task = asyncio.create_task(respond_when_ready())
+        self._ready_tasks.add(ready_task)
+        ready_task.add_done_callback(self._ready_tasks.discard)
+
+    def _env_open_handler(self, payload: dict, uid: str):
+        self.environment_sessions.open(
+            payload["environment_id"], payload["environment"]
+        )
+        self._respond_success(uid, "result", dict())
+
+    def _env_update_handler(self, payload: dict, uid: str):
+        try:
+            self.environment_sessions.update(payload["environment_id"], payload)
+        except UnknownEnvironmentError as e:
+            self._respond_unknown_environment(uid, e)
+            return
+
+        self._respond_success(uid, "result", dict())
+
+    def _env_close_handler(self, payload: dict, uid: str):
+        self.environment_sessions.close(payload["environment_id"])
+        self._respond_success(uid, "result", dict())
+
+    # Start every item of the batch as if it was sent in its own start message with the batch environment,
+    # each item is responded to separately using its own uid, as soon as its result is ready.
+    # Items sharing an environment also share its definition store, so the environment is only built once per worker.
+    # The batch environment may also be given as the environment_id of an open environment session.
+    # Every item is validated before any is started, malformed items are responded to with an error,
+    # along with the batch itself, while the remaining items are still started.
+    def _start_batch_handler(self, payload: dict, uid: str):
+        items = payload.get("items")
+
+        if not isinstance(items, list):
+            self._respond_error(
                 uid,
-                dev_message=f"Unsupported command type: {payload['command_type']}",
-                usr_message="Command type is not supported, please try reinstalling the plugin.",
+                dev_message="Batch has no list of items",
+                usr_message="Commands could not be started, please try reinstalling the plugin.",
             )
             return
 
-        self.command_handler_threads[uid] = KillableThread(
-            target=self._async_target,
-            args=(
+        if "environment_id" in payload:
+            environment_args = dict(environment_id=payload["environment_id"])
+        elif "environment" in payload:
+            environment_args = dict(environment=payload["environment"])
+        else:
+            environment_args = None
+
+        item_errors = [
+            "Batch has neither an environment nor an environment_id"
+            if environment_args is None
+            else _batch_item_error(item)
+            for item in items
+        ]
+
+        for item, item_error in zip(items, item_errors):
+            if item_error is None:
+                self.pending_message_responses.add(item["uid"])
+                self._start_handler(
+                    dict(
+                        item,
+                        start_args=dict(item["start_args"], **environment_args),
+                    ),
+                    item["uid"],
+                )
+                continue
+
+            # items without a uid cannot be responded to, which the error response of the batch reports instead.
+            item_uid = item.get("uid") if isinstance(item, dict) else None
+
+            if isinstance(item_uid, str):
+                self.pending_message_responses.add(item_uid)
+                self._respond_error(
+                    item_uid,
+                    dev_message=item_error,
+                    usr_message="Command could not be started, please try reinstalling the plugin.",
+                )
+
+        failed_items = [
+            f"item {i}: {item_error}"
+            for i, item_error in enumerate(item_errors)
+            if item_error is not None
+        ]
+
+        if len(failed_items) > 0:
+            self._respond_error(
                 uid,
-                self._handle_command,
-                payload["command_type"],
+                dev_message=f"{len(failed_items)} of {len(items)} batch items could not be started\n"
+                + "\n".join(failed_items),
+                usr_message="Some commands could not be started, please try reinstalling the plugin.",
+            )
+            return
+
+        self._respond_success(uid, "result", dict())
+
+    def _start_handler(self, payload: dict, uid: str):
+        command_type = payload["command_type"]
+
+        if (
+            command_type not in self.command_handlers
+            and command_type not in self.local_command_handlers
+        ):
+            self._respond_error(
                 uid,
-                payload["start_args"],
-            ),
-            daemon=True,
-        )
+                dev_message=f"Unsupported command type: {command_type}",
+                usr_message="Command type is not supported, please try reinstalling the plugin.",
+            )
+            return
 
-        self.command_handler_threads[uid].start()
+        try:
+            start_args = self.environment_sessions.resolve(payload["start_args"])
+        except UnknownEnvironmentError as e:
+            self._respond_unknown_environment(uid, e)
+            return
 
-    async def _handle_command(self, command: str, uid: str, payload: dict):
-        command_response = self.command_handlers[command].handle(payload)
-        response_type, response_value = command_response.getResponsePayload()
-        await self._respond_success(uid, response_type, response_value)
+        self.stats.command_started(uid, command_type)
 
-    async def _interrupt_handler(self, target_uids: list[str], uid: str):
-        for target_uid in target_uids:
-            if target_uid in self.command_handler_threads:
-                # we make sure to send the interrupt response before the
-                # target handler has an opportunity to respond with an error
-                # from us interrupting it.
-                await self._respond_interrupt(target_uid)
+        if command_type in self.local_command_handlers:
+            self._run_local_command(command_type, start_args, uid)
+            return
 
-                self.command_handler_threads[target_uid].kill()
+        slot = payload.get("slot")
+        stream = payload.get("stream", False)
+        key = None
 
-        await self._respond_success(uid, "result", dict())
+        if slot is not None:
+            self._supersede_slot(slot)
 
-    def _async_target(self, uid, coro, *args, **kwargs):
-        async def coro_err_handler():
-            try:
-                await coro(*args, **kwargs)
-            except Exception as e:
-                try:
-                    await self._respond_error(
-                        uid,
-                        dev_message=str(e) + "\n" + traceback.format_exc(),
-                        usr_message=str(e),
-                    )
-                except ValueError:
-                    # This error means the thread was intentionally interrupted,
-                    # so just do nothing instead of reporting back an error.
-                    pass
+        # profiled commands are always executed, as their results describe that specific execution.
+        if command_type in self.cacheable_commands and not start_args.get(
+            "profile", False
+        ):
+            key = ResultCache.create_key(command_type, start_args)
 
-            # remove thread from threads dict when handling has finished
+            if self.result_cache is not None:
+                cached_payload = self.result_cache.get(key)
 
-            del self.command_handler_threads[uid]
+                if cached_payload is not None:
+                    self._respond_success(uid, *cached_payload)
+                    return
 
-        return asyncio.run(coro_err_handler())
+            coalesced_job = self.coalesced_jobs.get((
+                key,
+                start_args.get("deadline_ms"),
+            ))
 
-    # Send the given json dumpable object back to the plugin.
-    async def _respond(self, status: str, uid: str, message: dict):
+            if coalesced_job is not None:
+                self._subscribe(coalesced_job, uid, slot, stream)
+                return
+
+        job = CommandJob(uid, command_type, start_args, key)
+        self._subscribe(job, uid, slot, stream)
+
+        if start_args.get("deadline_ms") is not None:
+            job.deadline = (
+                asyncio.get_running_loop().time() + start_args["deadline_ms"] / 1000
+            )
+
+        if key is not None:
+            self.coalesced_jobs[job.coalescing_key] = job
+
+        job.task = asyncio.create_task(self._execute_command(job))
+
+    def _run_local_command(self, command_type: str, start_args: dict, uid: str):
+        try:
+            result = self.local_command_handlers[command_type].handle(start_args)
+            self._respond_success(uid, *result.getResponsePayload())
+        except Exception as e:
+            self._respond_error(
+                uid,
+                dev_message=str(e) + "\n" + traceback.format_exc(),
+                usr_message=str(e),
+            )
+
+    # Interrupt the start message currently waiting on a result in the given slot, if any.
+    def _supersede_slot(self, slot: str):
+        superseded_uid = self.slot_uids.get(slot)
+
+        if superseded_uid is not None:
+            self._unsubscribe(superseded_uid)
+
+    def _release_slot(self, uid: str):
+        slot = self.uid_slots.pop(uid, None)
+
+        if slot is not None and self.slot_uids.get(slot) == uid:
+            del self.slot_uids[slot]
+
+    def _subscribe(
+        self, job: CommandJob, uid: str, slot: str | None = None, stream: bool = False
+    ):
+        job.subscribers.append(uid)
+        self.command_jobs[uid] = job
+
+        if stream:
+            job.streaming_subscribers.add(uid)
+
+        if slot is not None:
+            self.slot_uids[slot] = uid
+            self.uid_slots[uid] = slot
+
+    # Run the given job on the execution backend, and respond to all its subscribers with its result.
+    # The result is cached if the job has a key.
+    async def _execute_command(self, job: CommandJob):
+        reporters = {}
+
+        if job.deadline is not None:
+            reporters[FALLBACK_RESULT] = job.set_fallback_payload
+
+        if job.job_id in job.streaming_subscribers:
+            reporters[PARTIAL_RESULT] = lambda payload: self._respond_partial(
+                job, *payload
+            )
+
+        try:
+            # the deadline includes the time spent waiting in the scheduler.
+            async with asyncio.timeout_at(job.deadline):
+                async with self.scheduler.schedule(job.command_type):
+                    response_payload = await self.execution_backend.execute(
+                        job.job_id,
+                        job.command_type,
+                        job.start_args,
+                        reporters,
+                    )
+
+            if job.key is not None and self.result_cache is not None:
+                self.result_cache.put(job.key, response_payload)
+
+            for uid in job.subscribers:
+                self._respond_success(uid, *response_payload)
+        except TimeoutError:
+            # fallback results are never cached, as they are not the actual result of the command.
+            for uid in job.subscribers:
+                if job.fallback_payload is not None:
+                    self._respond_success(uid, *job.fallback_payload)
+                else:
+                    self._respond_error(
+                        uid,
+                        dev_message=f"{job.command_type} exceeded its deadline of {job.start_args['deadline_ms']} ms",
+                        usr_message="The command took too long and was stopped.",
+                    )
+        except CommandError as e:
+            for uid in job.subscribers:
+                self._respond_error(
+                    uid, dev_message=e.dev_message, usr_message=e.usr_message
+                )
+        except Exception as e:
+            for uid in job.subscribers:
+                self._respond_error(
+                    uid,
+                    dev_message=str(e) + "\n" + traceback.format_exc(),
+                    usr_message=str(e),
+                )
+        finally:
+            self._remove_job(job)
+
+    # Stop tracking the given job, so no new subscribers attach to it.
+    def _remove_job(self, job: CommandJob):
+        for uid in job.subscribers:
+            if self.command_jobs.get(uid) is job:
+                del self.command_jobs[uid]
+
+            self._release_slot(uid)
+
+        if (
+            job.coalescing_key is not None
+            and self.coalesced_jobs.get(job.coalescing_key) is job
+        ):
+            del self.coalesced_jobs[job.coalescing_key]
+
+    def _interrupt_handler(self, target_uids: list[str], uid: str):
+        for target_uid in target_uids:
+            if target_uid in self.command_jobs:
+                self._unsubscribe(target_uid)
+
+        self._respond_success(uid, "result", dict())
+
+    # Respond with an interrupt to the given subscriber, and cancel its job if no one else is subscribed to it.
+    def _unsubscribe(self, uid: str):
+        job = self.command_jobs.pop(uid)
+        job.subscribers.remove(uid)
+        job.streaming_subscribers.discard(uid)
+        self._release_slot(uid)
+
+        # we make sure to respond before cancelling the target handler,
+        # so it never gets an opportunity to respond with an error
+        # from us interrupting it.
+        self._respond_interrupt(uid)
+
+        if len(job.subscribers) == 0:
+            self._remove_job(job)
+            # the backend is responsible for stopping the command once its task is cancelled.
+            job.task.cancel()
+
+    # Queue the given encodable object to be sent back to the plugin.
+    def _respond(self, status: str, uid: str, message: dict):
         if uid not in self.pending_message_responses:
             raise ValueError(f"Response not pending for message with uid '{uid}'")
 
         self.pending_message_responses.remove(uid)
+        self.stats.command_responded(uid, status)
 
-        await self.connection.send(
-            jsonpickle.encode(dict(status=status, uid=uid, payload=message))
+        self._send_queue.put_nowait(
+            self.encoding.encode(dict(status=status, uid=uid, payload=message))
         )
 
-    async def _respond_success(self, uid: str, type: str, value: dict):
-        await self._respond(self.SUCCESS_STATUS, uid, dict(type=type, value=value))
+    def _respond_success(self, uid: str, type: str, value: dict):
+        self._respond(self.SUCCESS_STATUS, uid, dict(type=type, value=value))
+
+    # Send a partial result to the streaming subscribers of the given job, without completing their responses.
+    def _respond_partial(self, job: CommandJob, type: str, value: dict):
+        for uid in job.streaming_subscribers:
+            # the final response may already have been sent, if the job reports results after its deadline.
+            if uid not in self.pending_message_responses:
+                continue
+
+            self._send_queue.put_nowait(
+                self.encoding.encode(
+                    dict(
+                        status=self.PARTIAL_STATUS,
+                        uid=uid,
+                        payload=dict(type=type, value=value),
+                    )
+                )
+            )
+
+    def _respond_unknown_environment(self, uid: str, error: UnknownEnvironmentError):
+        self._respond_error(
+            uid,
+            dev_message=str(error),
+            usr_message="The environment of the note is out of sync, please try again.",
+        )
 
-    async def _respond_interrupt(self, uid):
-        await self._respond(self.INTERRUPT_STATUS, uid, {})
+    def _respond_interrupt(self, uid):
+        self._respond(self.INTERRUPT_STATUS, uid, {})
 
-    async def _respond_error(
+    def _respond_error(
         self, uid: str, dev_message: str, usr_message: str | None = None
     ):
         usr_message = dev_message if usr_message is None else usr_message
 
-        await self._respond(
+        self._respond(
             self.ERR_STATUS, uid, dict(dev_message=dev_message, usr_message=usr_message)
         )
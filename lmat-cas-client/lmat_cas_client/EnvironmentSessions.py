@@ -0,0 +1,136 @@
+class UnknownEnvironmentError(KeyError):
+    def __init__(self, environment_id: str):
+        super().__init__(environment_id)
+        self.environment_id = environment_id
+
+    def __str__(self) -> str:
+        return f"No environment is open with the id '{self.environment_id}'"
+
+
+class _EnvironmentSession:
+    def __init__(self, environment: dict):
+        self.symbols: dict[str, list[str]] = dict(environment.get("symbols", {}))
+        # value expressions by name expression, in the order they were last defined.
+        # name expressions defining the same symbol or function, e.g. f(x) and f(y), are separate entries,
+        # so the most recently defined one is always last, and thereby overrides the others.
+        self.definitions: dict[str, str] = {}
+        self.unit_system: str | None = environment.get("unit_system")
+        self.solve_domain: str | None = environment.get("solve_domain")
+        self._environment: dict | None = None
+
+        for definition in environment.get("definitions", []):
+            self._define(definition)
+
+    # The session as an environment dict, which is only rebuilt after the session has been updated.
+    def environment(self) -> dict:
+        if self._environment is None:
+            self._environment = dict(
+                symbols=self.symbols,
+                definitions=[
+                    dict(name_expr=name_expr, value_expr=value_expr)
+                    for name_expr, value_expr in self.definitions.items()
+                ],
+                unit_system=self.unit_system,
+                solve_domain=self.solve_domain,
+            )
+
+        return self._environment
+
+    def update(self, delta: dict):
+        for definition in delta.get("definitions", []):
+            self._define(definition)
+
+        for name_expr in delta.get("removed_definitions", []):
+            self.definitions.pop(name_expr, None)
+
+        if "symbols" in delta:
+            self.symbols = dict(delta["symbols"])
+
+        if "unit_system" in delta:
+            self.unit_system = delta["unit_system"]
+
+        if "solve_domain" in delta:
+            self.solve_domain = delta["solve_domain"]
+
+        self._environment = None
+
+    def _define(self, definition: dict):
+        # popped first, so the redefined name expression moves to the end.
+        self.definitions.pop(definition["name_expr"], None)
+        self.definitions[definition["name_expr"]] = definition["value_expr"]
+
+
+class EnvironmentSessions:
+    """
+    Environments the plugin has opened, by their environment id.
+
+    Instead of sending the full environment with every command, the plugin may open an environment once,
+    send deltas of single definitions as the note changes, and have commands refer to the environment by its id.
+
+    Environments are kept as plain dicts, so they can be sent to any execution backend,
+    which builds definition stores from them, reusing the compiled definitions which did not change.
+    """
+
+    def __init__(self):
+        self._sessions: dict[str, _EnvironmentSession] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, environment_id: str) -> bool:
+        return environment_id in self._sessions
+
+    def open(self, environment_id: str, environment: dict):
+        """
+        Open a session with the given environment, replacing any session with the same id.
+        """
+        self._sessions[environment_id] = _EnvironmentSession(environment)
+
+    def update(self, environment_id: str, delta: dict):
+        """
+        Apply the given delta to the environment with the given id.
+
+        Definitions in the definitions field of the delta replace the definition with the same name expression,
+        or are appended if there is none, and the name expressions in its removed_definitions field are removed.
+        The symbols, unit_system and solve_domain fields replace the current ones, if present.
+
+        Raises:
+            UnknownEnvironmentError: no environment is open with the given id.
+        """
+        self._get_session(environment_id).update(delta)
+
+    def close(self, environment_id: str):
+        self._sessions.pop(environment_id, None)
+
+    def environment(self, environment_id: str) -> dict:
+        """
+        Retreive the current environment with the given id, the returned dict must not be modified.
+
+        Raises:
+            UnknownEnvironmentError: no environment is open with the given id.
+        """
+        return self._get_session(environment_id).environment()
+
+    def resolve(self, start_args: dict) -> dict:
+        """
+        Replace the environment_id of the given start args with the environment it refers to.
+        Start args without an environment_id are returned as is.
+
+        Raises:
+            UnknownEnvironmentError: no environment is open with the referred id.
+        """
+        if "environment_id" not in start_args:
+            return start_args
+
+        start_args = dict(start_args)
+        start_args["environment"] = self.environment(start_args.pop("environment_id"))
+
+        return start_args
+
+    def _get_session(self, environment_id: str) -> _EnvironmentSession:
+        session = self._sessions.get(environment_id)
+
+        if session is None:
+            raise UnknownEnvironmentError(environment_id)
+
+        return session
@@ -1,7 +1,12 @@
-from typing import Optional, Self
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import ClassVar, Optional, Self
 
+from lark import Tree
 from pydantic import BaseModel, Field
-from sympy import Symbol
+from sympy import Expr, Symbol
 from sympy.core.function import AppliedUndef
 
 from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
@@ -11,6 +16,7 @@ from lmat_cas_client.compiling.Definitions import (
     AstFunctionDefinition,
 )
 from lmat_cas_client.compiling.DefinitionStore import (
+    Definition,
     DefinitionStore,
 )
 from lmat_cas_client.compiling.parsing.LatexParser import latex_parser
@@ -20,6 +26,7 @@ from lmat_cas_client.compiling.transforming.DependenciesTransformer import (
 from lmat_cas_client.compiling.transforming.SympyTransformer import (
     sympy_transformer_runner,
 )
+from lmat_cas_client.execution.DefinitionCompilerPool import get_compiler_pool
 from lmat_cas_client.math_lib.StandardDefinitionStore import StandardDefinitionStore
 
 
@@ -39,11 +46,90 @@ class LmatEnvironment(BaseModel):
 
     solve_domain: Optional[str] = None
 
+    # number of recently created definition stores kept around for reuse.
+    DEFINITION_STORE_CACHE_SIZE: ClassVar[int] = 16
+
+    # definition stores by the json dump of the environment they were created from.
+    _definition_store_cache: ClassVar[OrderedDict[str, DefinitionStore]] = OrderedDict()
+    # definition stores currently being built, by the json dump of their environment.
+    _definition_store_builds: ClassVar[dict[str, Future[DefinitionStore]]] = {}
+    _definition_store_cache_lock: ClassVar[Lock] = Lock()
+
+    # number of recently compiled definitions kept around for reuse.
+    COMPILED_DEFINITION_CACHE_SIZE: ClassVar[int] = 1024
+
+    # compiled definitions, as (definition name, definition) pairs, by the name and value expressions they were compiled from.
+    # definitions are never modified once compiled, so environments which only differ by a few definitions,
+    # e.g. the environment of a note before and after a keystroke, only compile the definitions which changed.
+    _compiled_definition_cache: ClassVar[
+        OrderedDict[tuple[str, str], tuple[str, Optional[Definition]] | None]
+    ] = OrderedDict()
+    _compiled_definition_cache_lock: ClassVar[Lock] = Lock()
+
     # Create a definition store populated with definitions based on the environments symbols, variables and functions fields.
+    # Definition stores are never modified once created, so commands sharing an environment, e.g. the items of a batch,
+    # share a single definition store, which is only built once.
     @staticmethod
     def create_definition_store(environment: Self) -> DefinitionStore:
         environment = LmatEnvironment.model_validate(environment)
+        environment_key = environment.model_dump_json()
+        cache = LmatEnvironment._definition_store_cache
+        builds = LmatEnvironment._definition_store_builds
+
+        while True:
+            # the lock is only held for lookups, so a long build never blocks commands with other environments.
+            with LmatEnvironment._definition_store_cache_lock:
+                definition_store = cache.get(environment_key)
+
+                if definition_store is not None:
+                    cache.move_to_end(environment_key)
+                    return definition_store
+
+                build = builds.get(environment_key)
+
+                if build is None:
+                    build = Future()
+                    builds[environment_key] = build
+                    break
+
+            # concurrent commands with the same environment wait for a single build.
+            try:
+                return build.result()
+            except Exception:
+                # the building command failed, or was interrupted, so build it again in this command.
+                continue
+
+        try:
+            definition_store = LmatEnvironment._build_definition_store(environment)
+        except BaseException as e:
+            with LmatEnvironment._definition_store_cache_lock:
+                del builds[environment_key]
+
+            build.set_exception(e)
+            raise
+
+        with LmatEnvironment._definition_store_cache_lock:
+            del builds[environment_key]
+            cache[environment_key] = definition_store
+
+            if len(cache) > LmatEnvironment.DEFINITION_STORE_CACHE_SIZE:
+                cache.popitem(last=False)
+
+        build.set_result(definition_store)
 
+        return definition_store
+
+    # Forget every cached definition store and compiled definition, stores already in use are unaffected.
+    @staticmethod
+    def clear_definition_store_cache():
+        with LmatEnvironment._definition_store_cache_lock:
+            LmatEnvironment._definition_store_cache.clear()
+
+        with LmatEnvironment._compiled_definition_cache_lock:
+            LmatEnvironment._compiled_definition_cache.clear()
+
+    @staticmethod
+    def _build_definition_store(environment: Self) -> DefinitionStore:
         definitions = {}
 
         for symbol_name, assumption_expr in environment.symbols.items():
@@ -53,35 +139,155 @@ class LmatEnvironment(BaseModel):
                 )
             )
 
-        latex_to_sympy_compiler = LatexToSympyCompiler()
+        LmatEnvironment._precompile_definitions(environment.definitions)
 
         for definition in environment.definitions:
-            definition_id = latex_to_sympy_compiler.compile(
-                definition.name_expr, DefinitionStore()
-            )
+            compiled_definition = LmatEnvironment._compile_cached_definition(definition)
 
-            match definition_id:
-                case Symbol() as def_symbol:
-                    if definition.value_expr == "":
-                        definitions[def_symbol.name] = None
-                    else:
-                        definitions[def_symbol.name] = AstDefinition(
-                            expr_transformer=sympy_transformer_runner,
-                            dependencies_transformer=dependencies_transformer_runner,
-                            ast_definition=latex_parser.parse(definition.value_expr),
-                        )
-                case AppliedUndef() as def_function:
-                    if definition.value_expr == "":
-                        definitions[def_function.name] = None
-                    else:
-                        definitions[def_function.name] = AstFunctionDefinition(
-                            expr_transformer=sympy_transformer_runner,
-                            dependencies_transformer=dependencies_transformer_runner,
-                            func_name=def_function.name,
-                            ast_body=latex_parser.parse(definition.value_expr),
-                            variables=[arg.name for arg in def_function.args],
-                        )
-                case _:
-                    pass
+            if compiled_definition is not None:
+                definition_name, definition_value = compiled_definition
+                definitions[definition_name] = definition_value
 
         return StandardDefinitionStore.override(definitions)
+
+    # Compile the definitions missing from the compiled definition cache in the compiler pool, if one is set,
+    # and there are enough of them to be worth it. Definitions which fail to compile are left to _compile_cached_definition,
+    # so their errors are raised in the command which compiles them.
+    @staticmethod
+    def _precompile_definitions(definitions: list[EnvDefinition]):
+        compiler_pool = get_compiler_pool()
+
+        if compiler_pool is None:
+            return
+
+        cache = LmatEnvironment._compiled_definition_cache
+
+        with LmatEnvironment._compiled_definition_cache_lock:
+            # dict preserves order, and drops duplicates.
+            uncompiled_keys = list(
+                dict.fromkeys(
+                    (definition.name_expr, definition.value_expr)
+                    for definition in definitions
+                    if (definition.name_expr, definition.value_expr) not in cache
+                )
+            )
+
+        if len(uncompiled_keys) < compiler_pool.min_definitions:
+            return
+
+        # only the parse step runs in the pool, as the definitions themselves hold transformers local to this process.
+        try:
+            parsed_definitions = compiler_pool.map(
+                _try_parse_definition,
+                [
+                    EnvDefinition(name_expr=name_expr, value_expr=value_expr)
+                    for name_expr, value_expr in uncompiled_keys
+                ],
+            )
+        except BrokenProcessPool:
+            # the definitions are compiled serially instead.
+            return
+
+        for definition_key, parsed_definition in zip(
+            uncompiled_keys, parsed_definitions
+        ):
+            if parsed_definition is None:
+                continue
+
+            compiled_definition = LmatEnvironment._create_definition(parsed_definition)
+
+            with LmatEnvironment._compiled_definition_cache_lock:
+                cache[definition_key] = compiled_definition
+
+                if len(cache) > LmatEnvironment.COMPILED_DEFINITION_CACHE_SIZE:
+                    cache.popitem(last=False)
+
+    @staticmethod
+    def _compile_cached_definition(
+        definition: EnvDefinition,
+    ) -> tuple[str, Optional[Definition]] | None:
+        definition_key = (definition.name_expr, definition.value_expr)
+        cache = LmatEnvironment._compiled_definition_cache
+
+        with LmatEnvironment._compiled_definition_cache_lock:
+            if definition_key in cache:
+                cache.move_to_end(definition_key)
+                return cache[definition_key]
+
+        # compile without holding the lock, so commands with different environments compile their definitions in parallel,
+        # at worst a definition is compiled twice by concurrent commands.
+        compiled_definition = LmatEnvironment._compile_definition(definition)
+
+        with LmatEnvironment._compiled_definition_cache_lock:
+            cache[definition_key] = compiled_definition
+
+            if len(cache) > LmatEnvironment.COMPILED_DEFINITION_CACHE_SIZE:
+                cache.popitem(last=False)
+
+        return compiled_definition
+
+    # Compile the given definition into its definition name and definition, the definition is None if its value is empty.
+    # None is returned if the definition does not define a symbol or a function.
+    @staticmethod
+    def _compile_definition(
+        definition: EnvDefinition,
+    ) -> tuple[str, Optional[Definition]] | None:
+        return LmatEnvironment._create_definition(
+            LmatEnvironment._parse_definition(definition)
+        )
+
+    # Parse the given definition into the symbol or applied function it defines, and the AST of its value.
+    # The AST is None if the value is empty, the parsed definition is picklable, so it may be parsed in another process.
+    @staticmethod
+    def _parse_definition(definition: EnvDefinition) -> tuple[Expr, Optional[Tree]]:
+        definition_id = LatexToSympyCompiler().compile(
+            definition.name_expr, DefinitionStore()
+        )
+
+        if definition.value_expr == "" or not isinstance(
+            definition_id, (Symbol, AppliedUndef)
+        ):
+            return definition_id, None
+
+        return definition_id, latex_parser.parse(definition.value_expr)
+
+    @staticmethod
+    def _create_definition(
+        parsed_definition: tuple[Expr, Optional[Tree]],
+    ) -> tuple[str, Optional[Definition]] | None:
+        definition_id, value_ast = parsed_definition
+
+        match definition_id:
+            case Symbol() as def_symbol:
+                if value_ast is None:
+                    return def_symbol.name, None
+
+                return def_symbol.name, AstDefinition(
+                    expr_transformer=sympy_transformer_runner,
+                    dependencies_transformer=dependencies_transformer_runner,
+                    ast_definition=value_ast,
+                )
+            case AppliedUndef() as def_function:
+                if value_ast is None:
+                    return def_function.name, None
+
+                return def_function.name, AstFunctionDefinition(
+                    expr_transformer=sympy_transformer_runner,
+                    dependencies_transformer=dependencies_transformer_runner,
+                    func_name=def_function.name,
+                    ast_body=value_ast,
+                    variables=[arg.name for arg in def_function.args],
+                )
+            case _:
+                return None
+
+
+# runs in the worker processes of the compiler pool, None is returned in place of definitions which could not be parsed,
+# as not every exception raised by the parser can be pickled.
+def _try_parse_definition(
+    definition: EnvDefinition,
+) -> tuple[Expr, Optional[Tree]] | None:
+    try:
+        return LmatEnvironment._parse_definition(definition)
+    except Exception:
+        return None
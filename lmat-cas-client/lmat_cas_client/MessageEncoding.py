@@ -0,0 +1,54 @@
+import json
+from abc import ABC, abstractmethod
+from typing import override
+
+import msgpack
+
+
+# A MessageEncoding converts messages to and from websocket frames.
+# Text frames are always json, and binary frames are always msgpack,
+# so received frames can be decoded without knowing which encoding the sender has chosen.
+class MessageEncoding(ABC):
+    name: str
+
+    @abstractmethod
+    def encode(self, message: dict) -> str | bytes:
+        pass
+
+
+class JsonEncoding(MessageEncoding):
+    name = "json"
+
+    @override
+    def encode(self, message: dict) -> str:
+        return json.dumps(message, separators=(",", ":"))
+
+
+class MsgpackEncoding(MessageEncoding):
+    name = "msgpack"
+
+    @override
+    def encode(self, message: dict) -> bytes:
+        return msgpack.packb(message)
+
+
+# supported encodings by their name, json is always supported, as it is used before an encoding has been negotiated.
+ENCODINGS: dict[str, MessageEncoding] = {
+    encoding.name: encoding for encoding in (MsgpackEncoding(), JsonEncoding())
+}
+
+
+def decode_frame(frame: str | bytes) -> dict:
+    if isinstance(frame, str):
+        return json.loads(frame)
+
+    return msgpack.unpackb(frame)
+
+
+# Choose the first of the given encodings, in order of preference, which is supported.
+def negotiate_encoding(encoding_names: list[str]) -> MessageEncoding:
+    for name in encoding_names:
+        if name in ENCODINGS:
+            return ENCODINGS[name]
+
+    return ENCODINGS[JsonEncoding.name]
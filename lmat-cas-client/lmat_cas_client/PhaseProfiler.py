@@ -0,0 +1,87 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+
+class PhaseProfile:
+    """
+    Per phase timings and size stats collected while handling a single command.
+    Phases nested in other phases are named by the path of phases they are nested in, e.g. compile/parse,
+    and phases entered multiple times accumulate their time.
+    """
+
+    def __init__(self):
+        self.phase_times: dict[str, float] = {}
+        self.stats: dict[str, int] = {}
+        self._phase_stack: list[str] = []
+
+    def to_metadata(self) -> dict:
+        return dict(
+            phases_ms={
+                phase: round(phase_time * 1000, 3)
+                for phase, phase_time in self.phase_times.items()
+            },
+            stats=dict(self.stats),
+        )
+
+
+# profile of the command being handled in the current context, None if it is not being profiled.
+_active_profile: ContextVar[PhaseProfile | None] = ContextVar(
+    "active_profile", default=None
+)
+
+
+# Collect phases and stats recorded in the current context into the given profile, if it is not None.
+@contextmanager
+def profiling(profile: PhaseProfile | None) -> Iterator[PhaseProfile | None]:
+    token = _active_profile.set(profile)
+
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+# Time the enclosed code as the given phase of the active profile, does nothing if nothing is being profiled.
+@contextmanager
+def profile_phase(name: str) -> Iterator[None]:
+    profile = _active_profile.get()
+
+    if profile is None:
+        yield
+        return
+
+    profile._phase_stack.append(name)
+    phase = "/".join(profile._phase_stack)
+    start_time = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        profile.phase_times[phase] = (
+            profile.phase_times.get(phase, 0) + time.perf_counter() - start_time
+        )
+        profile._phase_stack.pop()
+
+
+# returns whether the current context is being profiled,
+# stats which are expensive to compute should only be recorded if this is the case.
+def is_profiling() -> bool:
+    return _active_profile.get() is not None
+
+
+# Record a size stat in the active profile, does nothing if nothing is being profiled.
+def record_stat(name: str, value: int):
+    profile = _active_profile.get()
+
+    if profile is not None:
+        profile.stats[name] = value
+
+
+# Add the given amount to a counting stat in the active profile, does nothing if nothing is being profiled.
+def increment_stat(name: str, amount: int = 1):
+    profile = _active_profile.get()
+
+    if profile is not None:
+        profile.stats[name] = profile.stats.get(name, 0) + amount
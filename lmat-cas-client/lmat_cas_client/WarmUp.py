@@ -0,0 +1,106 @@
+import sys
+import time
+import traceback
+
+from lmat_cas_client.command_handlers.CommandHandler import CommandHandler
+
+# representative commands exercising the parser, transformer, unit conversion and printer,
+# as (name, command type, start args). commands of types without a registered handler are skipped.
+WARM_UP_CORPUS: list[tuple[str, str, dict]] = [
+    (
+        "arithmetic",
+        "eval",
+        {"expression": r"\frac{1}{2} + \sqrt{8} \cdot 3^{2}", "environment": {}},
+    ),
+    (
+        "definitions",
+        "eval",
+        {
+            "expression": r"f(a) + b",
+            "environment": {
+                "symbols": {"x": ["real"]},
+                "definitions": [
+                    {"name_expr": "a", "value_expr": r"\sin(x)^{2} + \cos(x)^{2}"},
+                    {"name_expr": "f(x)", "value_expr": r"x^{2} + 2 x"},
+                    {"name_expr": "b", "value_expr": r"\int_{0}^{1} x \dd x"},
+                ],
+            },
+        },
+    ),
+    (
+        "calculus",
+        "eval",
+        {
+            "expression": r"\frac{d}{dx} e^{x} \ln(x) + \sum_{n=1}^{10} n^{2} + \lim_{x \to 0} \frac{\sin(x)}{x}",
+            "environment": {},
+        },
+    ),
+    (
+        "matrix",
+        "eval",
+        {
+            "expression": r"\det \begin{bmatrix} 1 & 2 \\ 3 & 4 \end{bmatrix} \begin{pmatrix} x & 0 \\ 0 & 1 \end{pmatrix}^{T}",
+            "environment": {},
+        },
+    ),
+    (
+        "units",
+        "eval",
+        {
+            "expression": r"2 {kg} \cdot 9.82 {m} / {s}^{2}",
+            "environment": {"unit_system": "SI"},
+        },
+    ),
+    (
+        "unit conversion",
+        "convert-units",
+        {
+            "expression": r"7.2 {km} / {h}",
+            "target_units": ["m", "s"],
+            "environment": {},
+        },
+    ),
+    (
+        "evalf",
+        "evalf",
+        {"expression": r"\pi \cdot e^{2}", "environment": {}},
+    ),
+    (
+        "solve",
+        "solve",
+        {"expression": r"x^{2} - 4 = 0", "symbols": ["x"], "environment": {}},
+    ),
+]
+
+
+def run_warm_up(command_handlers: dict[str, CommandHandler]) -> dict:
+    """
+    Run the warm-up corpus with the given command handlers, so lazy imports, parser loading and sympy caches are
+    taken care of before the first real command arrives. Results are discarded, and failing commands are only logged,
+    a failed warm-up should never prevent the client from starting.
+
+    Returns:
+        dict: total warm-up time, and time of each command in the corpus, in milliseconds.
+    """
+    command_times = {}
+    start_time = time.perf_counter()
+
+    for name, command_type, start_args in WARM_UP_CORPUS:
+        if command_type not in command_handlers:
+            continue
+
+        command_start_time = time.perf_counter()
+
+        try:
+            command_handlers[command_type].handle(start_args).getResponsePayload()
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+
+        command_times[name] = round(
+            (time.perf_counter() - command_start_time) * 1000, 3
+        )
+
+    return dict(
+        total_ms=round((time.perf_counter() - start_time) * 1000, 3),
+        commands_ms=command_times,
+    )
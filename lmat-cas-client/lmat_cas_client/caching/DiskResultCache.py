@@ -0,0 +1,134 @@
+import json
+import queue
+import sqlite3
+import sys
+import time
+import traceback
+from threading import Thread
+
+
+class DiskResultCache:
+    """
+    SQLite backed store of command response payloads, which persists cached results between client restarts.
+    Entries are keyed by ResultCache keys and a version string, entries of any other version are discarded on startup,
+    so results computed by an older version of the plugin are never reused.
+
+    Entries are read once on startup with load(), and written by a background thread,
+    so storing an entry never blocks the caller on disk io.
+    """
+
+    _CREATE_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            version TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            stored_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, version: str, max_entries: int = 16384):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+
+        self._write_queue: queue.Queue[tuple[str, tuple[str, dict], float] | None] = (
+            queue.Queue()
+        )
+
+        connection = self._connect()
+
+        try:
+            with connection:
+                connection.execute(
+                    "DELETE FROM results WHERE version != ?", (self.version,)
+                )
+                connection.execute(
+                    """
+                    DELETE FROM results WHERE key NOT IN (
+                        SELECT key FROM results ORDER BY stored_at DESC, rowid DESC LIMIT ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+        finally:
+            connection.close()
+
+        self._writer_thread = Thread(target=self._write_loop, daemon=True)
+        self._writer_thread.start()
+
+    def load(self, limit: int | None = None) -> list[tuple[str, tuple[str, dict]]]:
+        """
+        Read stored entries, ordered from least to most recently stored.
+
+        Args:
+            limit (int | None, optional): only read the given number of most recently stored entries. Defaults to None.
+
+        Returns:
+            list[tuple[str, tuple[str, dict]]]: list of keys and their payloads.
+        """
+        connection = self._connect()
+
+        try:
+            rows = connection.execute(
+                "SELECT key, payload FROM results WHERE version = ? ORDER BY stored_at DESC, rowid DESC LIMIT ?",
+                (self.version, -1 if limit is None else limit),
+            ).fetchall()
+        finally:
+            connection.close()
+
+        entries = []
+
+        for key, payload in reversed(rows):
+            response_type, response_value = json.loads(payload)
+            entries.append((key, (response_type, response_value)))
+
+        return entries
+
+    def store(self, key: str, payload: tuple[str, dict]):
+        """
+        Queue the given payload to be written to disk under the given key.
+        """
+        self._write_queue.put((key, payload, time.time()))
+
+    def close(self):
+        """
+        Write all queued entries and stop the writer thread.
+        """
+        self._write_queue.put(None)
+        self._writer_thread.join()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute(self._CREATE_TABLE_SQL)
+        return connection
+
+    def _write_loop(self):
+        connection = self._connect()
+
+        try:
+            running = True
+
+            while running:
+                entries = [self._write_queue.get()]
+
+                # write everything queued up in a single transaction.
+                while not self._write_queue.empty():
+                    entries.append(self._write_queue.get_nowait())
+
+                if None in entries:
+                    running = False
+                    entries = [entry for entry in entries if entry is not None]
+
+                try:
+                    with connection:
+                        connection.executemany(
+                            "INSERT OR REPLACE INTO results (key, version, payload, stored_at) VALUES (?, ?, ?, ?)",
+                            [
+                                (key, self.version, json.dumps(payload), stored_at)
+                                for key, payload, stored_at in entries
+                            ],
+                        )
+                except (sqlite3.Error, TypeError, ValueError):
+                    traceback.print_exc(file=sys.stderr)
+        finally:
+            connection.close()
@@ -0,0 +1,147 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+import regex
+
+from .DiskResultCache import DiskResultCache
+
+# trailing whitespace on a line, which is not part of an escaped space (\ ).
+_TRAILING_WHITESPACE_REGEX = regex.compile(r"(?<!\\)[ \t]+$", regex.MULTILINE)
+
+
+def normalize_expression(expression: str) -> str:
+    """
+    Normalize whitespace in a latex expression, which never changes the result of evaluating it.
+    Line structure is preserved, as results may refer to the lines of the expression.
+    """
+    return _TRAILING_WHITESPACE_REGEX.sub(
+        "", expression.replace("\r\n", "\n").replace("\r", "\n")
+    )
+
+
+def _fingerprint(value) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+class ResultCache:
+    """
+    Least recently used cache of command response payloads, keyed by the command type and the command start args.
+    Entries are evicted when either the number of entries or their estimated memory usage exceeds the given limits.
+
+    If a DiskResultCache is given, the cache is populated with its entries on construction,
+    and every new entry is also written to it.
+
+    The cache is not thread safe, and should only be accessed from the client message loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_cache: DiskResultCache | None = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_cache = disk_cache
+
+        self._entries: OrderedDict[str, tuple[tuple[str, dict], int]] = OrderedDict()
+        self._size_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_cache is not None:
+            for key, payload in self.disk_cache.load(limit=self.max_entries):
+                self._insert(key, payload)
+
+    @staticmethod
+    def create_key(command_type: str, start_args: dict) -> str:
+        """
+        Create a cache key identifying a command with the given start args.
+        The expression is normalized, and the environment is fingerprinted separately from the remaining args,
+        so identical commands resent by the plugin map to the same key.
+        Deadlines do not change the result of a command, so they are not part of the key.
+        """
+        start_args = dict(start_args)
+
+        expression = start_args.pop("expression", None)
+        environment = start_args.pop("environment", None)
+        start_args.pop("deadline_ms", None)
+
+        return _fingerprint([
+            command_type,
+            None if expression is None else normalize_expression(expression),
+            _fingerprint(environment),
+            start_args,
+        ])
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> tuple[str, dict] | None:
+        """
+        Retreive the response payload cached for the given key, or None if nothing is cached.
+        """
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+
+        return entry[0]
+
+    def put(self, key: str, payload: tuple[str, dict]):
+        """
+        Cache the given response payload under the given key, evicting least recently used entries if needed.
+        Payloads larger than the entire memory budget are not cached.
+        """
+        if self._insert(key, payload) and self.disk_cache is not None:
+            self.disk_cache.store(key, payload)
+
+    def clear(self):
+        self._entries.clear()
+        self._size_bytes = 0
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    # insert an entry into the in memory cache, returns whether it was cached.
+    def _insert(self, key: str, payload: tuple[str, dict]) -> bool:
+        entry_size = len(key) + len(json.dumps(payload, default=str))
+
+        if entry_size > self.max_bytes:
+            return False
+
+        self._remove(key)
+
+        self._entries[key] = (payload, entry_size)
+        self._size_bytes += entry_size
+
+        while (
+            len(self._entries) > self.max_entries or self._size_bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+        return True
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._size_bytes -= entry[1]
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
 
 
 # The CommandResult represents an arbitrary result returned by a CommandHandler.
@@ -22,3 +24,57 @@ class CommandHandler(ABC):
     @abstractmethod
     def handle(self, message: Any) -> CommandResult:
         pass
+
+
+# kinds of results a running CommandHandler can report before returning its final result.
+# fallback results are responded with instead of an error if the command runs past its deadline,
+# and partial results are streamed to the plugin as they are reported.
+FALLBACK_RESULT = "fallback"
+PARTIAL_RESULT = "partial"
+
+# receives results reported by the command handler running in the current context, by their kind.
+_result_reporters: ContextVar[dict[str, Callable[[CommandResult], None]]] = ContextVar(
+    "result_reporters", default={}
+)
+
+
+def _report_result(kind: str, result: CommandResult):
+    reporter = _result_reporters.get().get(kind)
+
+    if reporter is not None:
+        reporter(result)
+
+
+# Report the best result a running CommandHandler has produced so far.
+# If the command runs past its deadline, the last reported result is responded with instead of an error.
+def report_fallback_result(result: CommandResult):
+    _report_result(FALLBACK_RESULT, result)
+
+
+# Report a part of the final result, e.g. a page of rows, which the plugin may show before the command has finished.
+def report_partial_result(result: CommandResult):
+    _report_result(PARTIAL_RESULT, result)
+
+
+# returns whether anyone receives fallback results in the current context,
+# handlers can use this to skip producing fallback results no one will use.
+def fallback_results_requested() -> bool:
+    return FALLBACK_RESULT in _result_reporters.get()
+
+
+# returns whether anyone receives partial results in the current context.
+def partial_results_requested() -> bool:
+    return PARTIAL_RESULT in _result_reporters.get()
+
+
+# Pass results reported by command handlers in the current context to the reporter of their kind.
+@contextmanager
+def result_reporters(
+    reporters: dict[str, Callable[[CommandResult], None]],
+) -> Iterator[None]:
+    token = _result_reporters.set(reporters)
+
+    try:
+        yield
+    finally:
+        _result_reporters.reset(token)
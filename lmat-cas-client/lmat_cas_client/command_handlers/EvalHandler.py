@@ -2,10 +2,19 @@ from typing import override
 
 from sympy import *
 
+from lmat_cas_client.PhaseProfiler import profile_phase
+
 from .EvalHandlerBase import EvalHandlerBase, EvaluateMessage
 
 
 class EvalHandler(EvalHandlerBase):
     @override
     def evaluate(self, sympy_expr: Expr, _message: EvaluateMessage) -> Expr:
-        return simplify(sympy_expr.doit())
+        with profile_phase("doit"):
+            evaluated_expr = sympy_expr.doit()
+
+        # simplifying may take a long time, so the unsimplified result is better than nothing.
+        self.report_fallback(evaluated_expr)
+
+        with profile_phase("simplify"):
+            return simplify(evaluated_expr)
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import override
+from contextvars import ContextVar
+from typing import Callable, override
 
 from pydantic import BaseModel
 from sympy import *
@@ -15,39 +16,86 @@ from lmat_cas_client.compiling.transforming.PropositionsTransformer import (
 from lmat_cas_client.compiling.transforming.SystemOfExpr import SystemOfExpr
 from lmat_cas_client.LmatEnvironment import LmatEnvironment
 from lmat_cas_client.LmatLatexPrinter import lmat_latex
+from lmat_cas_client.PhaseProfiler import (
+    PhaseProfile,
+    is_profiling,
+    profile_phase,
+    profiling,
+    record_stat,
+)
 
-from .CommandHandler import CommandHandler, CommandResult
+from .CommandHandler import (
+    CommandHandler,
+    CommandResult,
+    fallback_results_requested,
+    report_fallback_result,
+)
 
 
 class EvaluateMessage(BaseModel):
     expression: str
     environment: LmatEnvironment
+    # include per phase timings and expression size stats in the result metadata.
+    profile: bool = False
+
+
+# number of nodes in the given expressions tree.
+def _expr_size(sympy_expr: Expr) -> int:
+    if not isinstance(sympy_expr, Basic):
+        return 0
+
+    return sum(1 for _ in preorder_traversal(sympy_expr))
 
 
 class EvaluateResult(CommandResult, ABC):
     def __init__(
-        self, sympy_expr: Expr, expr_separator: str, expr_lines: list[int] | None
+        self,
+        sympy_expr: Expr,
+        expr_separator: str,
+        expr_lines: list[int] | None,
+        is_fallback: bool = False,
     ):
         super().__init__()
         self.sympy_expr = sympy_expr
         self.expr_separator = expr_separator
         self.expr_lines = expr_lines
+        # fallback results are not fully evaluated, as the deadline of the command was exceeded.
+        self.is_fallback = is_fallback
+        # profile of the command producing this result, included in the metadata if set.
+        self.profile: PhaseProfile | None = None
 
     @override
     def getResponsePayload(self):
         metadata = dict(separator=self.expr_separator)
 
+        if self.is_fallback:
+            metadata["fallback"] = True
+
         if self.expr_lines is not None and self.expr_lines[0] != self.expr_lines[1]:
             metadata = dict(
                 **metadata, start_line=self.expr_lines[0], end_line=self.expr_lines[1]
             )
 
+        with profiling(self.profile):
+            with profile_phase("latex"):
+                evaluated_expression = lmat_latex(self.sympy_expr)
+
+            record_stat("result_latex_chars", len(evaluated_expression))
+
+        if self.profile is not None:
+            metadata["profile"] = self.profile.to_metadata()
+
         return CommandResult.result(
-            dict(evaluated_expression=lmat_latex(self.sympy_expr), metadata=metadata)
+            dict(evaluated_expression=evaluated_expression, metadata=metadata)
         )
 
 
 class EvalHandlerBase(CommandHandler, ABC):
+    # creates a fallback result from an expression, for the message currently being handled in this context.
+    _fallback_result_factory: ContextVar[Callable[[Expr], EvaluateResult] | None] = (
+        ContextVar("fallback_result_factory", default=None)
+    )
+
     def __init__(self, compiler: Compiler[[DefinitionStore], Expr]):
         super().__init__()
         self._compiler = compiler
@@ -56,12 +104,39 @@ class EvalHandlerBase(CommandHandler, ABC):
     def evaluate(self, sympy_expr: Expr, message: EvaluateMessage) -> Expr:
         pass
 
+    # Report a partially evaluated expression from evaluate,
+    # which is responded with if the deadline of the command is exceeded before evaluate returns.
+    def report_fallback(self, sympy_expr: Expr):
+        result_factory = self._fallback_result_factory.get()
+
+        if result_factory is not None and fallback_results_requested():
+            report_fallback_result(result_factory(sympy_expr))
+
     @override
     def handle(self, message: EvaluateMessage) -> EvaluateResult:
         message = EvaluateMessage.model_validate(message)
+        profile = PhaseProfile() if message.profile else None
+
+        with profiling(profile):
+            result = self._handle(message)
+
+            if profile is not None:
+                record_stat("expression_chars", len(message.expression))
+                record_stat("result_nodes", _expr_size(result.sympy_expr))
+
+        result.profile = profile
+
+        return result
+
+    def _handle(self, message: EvaluateMessage) -> EvaluateResult:
+        with profile_phase("definition_store"):
+            definitions_store = LmatEnvironment.create_definition_store(
+                message.environment
+            )
+
+        with profile_phase("compile"):
+            sympy_expr = self._compiler.compile(message.expression, definitions_store)
 
-        definitions_store = LmatEnvironment.create_definition_store(message.environment)
-        sympy_expr = self._compiler.compile(message.expression, definitions_store)
         expr_lines = None
 
         # choose bottom / right most evaluatable expression.
@@ -89,15 +164,31 @@ class EvalHandlerBase(CommandHandler, ABC):
         else:
             separator = "="
 
-        sympy_expr = self.evaluate(sympify(sympy_expr), message)
-
         unit_system = message.environment.unit_system
 
         if unit_system is not None:
-            sympy_expr = UnitUtils.auto_convert(
-                sympy_expr, UnitSystem.get_unit_system(unit_system)
-            )
-        else:
-            sympy_expr = UnitUtils.auto_convert(sympy_expr)
+            unit_system = UnitSystem.get_unit_system(unit_system)
+
+        def create_result(sympy_expr: Expr, is_fallback: bool) -> EvaluateResult:
+            with profile_phase("unit_conversion"):
+                if unit_system is not None:
+                    sympy_expr = UnitUtils.auto_convert(sympy_expr, unit_system)
+                else:
+                    sympy_expr = UnitUtils.auto_convert(sympy_expr)
+
+            return EvaluateResult(sympy_expr, separator, expr_lines, is_fallback)
+
+        if is_profiling():
+            record_stat("compiled_nodes", _expr_size(sympy_expr))
+
+        token = self._fallback_result_factory.set(
+            lambda sympy_expr: create_result(sympy_expr, True)
+        )
+
+        try:
+            with profile_phase("evaluate"):
+                sympy_expr = self.evaluate(sympify(sympy_expr), message)
+        finally:
+            self._fallback_result_factory.reset(token)
 
-        return EvaluateResult(sympy_expr, separator, expr_lines)
+        return create_result(sympy_expr, False)
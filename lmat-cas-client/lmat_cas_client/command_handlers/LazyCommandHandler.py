@@ -0,0 +1,53 @@
+import importlib
+from threading import Lock
+from typing import Any, override
+
+from .CommandHandler import CommandHandler, CommandResult
+
+
+def _import_path(path: str) -> Any:
+    module_name, attribute_name = path.split(":")
+    return getattr(importlib.import_module(module_name), attribute_name)
+
+
+class LazyCommandHandler(CommandHandler):
+    """
+    CommandHandler delegating to a handler which is only imported and constructed once the first command is handled,
+    so the modules it depends on are not imported before they are needed.
+
+    The handler is the class at handler_path, given as "module:attribute", constructed with an instance of the class
+    at each of the argument_paths, e.g. LazyCommandHandler("package.EvalHandler:EvalHandler", "package.Compiler:LatexToSympyCompiler").
+
+    Only the paths are pickled, so lazy handlers are cheap to send to worker processes,
+    which load the handler themselves on first use.
+    """
+
+    def __init__(self, handler_path: str, *argument_paths: str):
+        super().__init__()
+        self.handler_path = handler_path
+        self.argument_paths = argument_paths
+        self._handler: CommandHandler | None = None
+        # commands running in separate threads may load the handler at the same time.
+        self._load_lock = Lock()
+
+    @property
+    def handler(self) -> CommandHandler:
+        if self._handler is None:
+            with self._load_lock:
+                if self._handler is None:
+                    self._handler = _import_path(self.handler_path)(*[
+                        _import_path(argument_path)()
+                        for argument_path in self.argument_paths
+                    ])
+
+        return self._handler
+
+    @override
+    def handle(self, message: Any) -> CommandResult:
+        return self.handler.handle(message)
+
+    def __getstate__(self) -> dict:
+        return dict(handler_path=self.handler_path, argument_paths=self.argument_paths)
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["handler_path"], *state["argument_paths"])
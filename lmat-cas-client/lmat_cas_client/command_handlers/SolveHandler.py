@@ -123,21 +123,22 @@ class SolveHandler(CommandHandler):
         unit_system = message.environment.unit_system
 
         # if there is a finite number of solutions, go through each solution, simplify it, and convert units in it.
+        # each solution is reported as a partial result as soon as it is ready.
         if isinstance(solution_set, FiniteSet):
-            if unit_system is not None:
-                solution_set = FiniteSet(
-                    *(
-                        UnitUtils.auto_convert(simplify(sol.doit()), unit_system)
-                        for sol in solution_set.args
-                    )
-                )
-            else:
-                solution_set = FiniteSet(
-                    *(
-                        UnitUtils.auto_convert(simplify(sol.doit()))
-                        for sol in solution_set.args
-                    )
-                )
+            solutions = []
+
+            for sol in solution_set.args:
+                if unit_system is not None:
+                    sol = UnitUtils.auto_convert(simplify(sol.doit()), unit_system)
+                else:
+                    sol = UnitUtils.auto_convert(simplify(sol.doit()))
+
+                solutions.append(sol)
+
+                if partial_results_requested():
+                    report_partial_result(SolveResult(FiniteSet(sol), symbols))
+
+            solution_set = FiniteSet(*solutions)
 
         return SolveResult(solution_set, symbols)
 
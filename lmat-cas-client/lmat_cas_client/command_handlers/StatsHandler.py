@@ -0,0 +1,28 @@
+from typing import TYPE_CHECKING, Any, override
+
+from .CommandHandler import CommandHandler, CommandResult
+
+if TYPE_CHECKING:
+    from lmat_cas_client.Client import LmatCasClient
+
+
+class StatsResult(CommandResult):
+    def __init__(self, stats: dict):
+        super().__init__()
+        self.stats = stats
+
+    @override
+    def getResponsePayload(self) -> tuple[str, dict]:
+        return CommandResult.result(self.stats)
+
+
+# StatsHandler responds with a snapshot of the stats of the given client,
+# it must be registered as a local handler, as the stats are only available in the client process.
+class StatsHandler(CommandHandler):
+    def __init__(self, client: "LmatCasClient"):
+        super().__init__()
+        self._client = client
+
+    @override
+    def handle(self, _message: Any) -> StatsResult:
+        return StatsResult(self._client.get_stats())
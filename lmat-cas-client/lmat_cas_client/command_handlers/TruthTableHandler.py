@@ -1,9 +1,10 @@
+import itertools
 from enum import Enum
 from typing import override
 
 from pydantic import BaseModel
 from sympy import *
-from sympy.logic.boolalg import Boolean, as_Boolean, truth_table
+from sympy.logic.boolalg import Boolean, BooleanFunction, as_Boolean, is_literal
 from tabulate import tabulate
 
 from lmat_cas_client.Client import HandlerError
@@ -88,9 +89,30 @@ class TruthTableResultLatex(TruthTableResult):
         })
 
 
+# partial result containing a page of rows of a truth table, starting at first_row.
+class TruthTableRowsResult(CommandResult):
+    def __init__(self, first_row: int, rows: list[list[Boolean]]):
+        super().__init__()
+        self.first_row = first_row
+        self.rows = rows
+
+    @override
+    def getResponsePayload(self) -> tuple[str, dict]:
+        return (
+            "truth-table-rows",
+            dict(
+                first_row=self.first_row,
+                rows=[["T" if elem else "F" for elem in row] for row in self.rows],
+            ),
+        )
+
+
 # TruthTableHandler attempts to generate a truth table from the given expression.
 # Expects a PropositionExpr so will fail if it is not.
 class TruthTableHandler(CommandHandler):
+    # number of rows in each partial result.
+    PAGE_SIZE = 64
+
     def __init__(self, compiler: Compiler[[DefinitionStore], Expr]):
         super().__init__()
         self._compiler = compiler
@@ -113,10 +135,21 @@ class TruthTableHandler(CommandHandler):
 
         truth_table_data = []
 
-        # Sympy by defaults starts with all False, but truth tables usually start with all True,
-        # so the result is reversed here to achieve this.
-        for row in reversed(tuple(truth_table(sympy_expr, columns))):
-            truth_table_data.append([*map(as_Boolean, row[0]), row[1]])
+        # this is sympy's truth_table, except it starts with all True instead of all False,
+        # as truth tables usually do, and rows are produced in order so they can be reported as they are computed.
+        if isinstance(sympy_expr, BooleanFunction) or is_literal(sympy_expr):
+            for term in itertools.product((1, 0), repeat=len(columns)):
+                value = sympy_expr.xreplace(dict(zip(columns, term)))
+                truth_table_data.append([*map(as_Boolean, term), value])
+
+                if (
+                    len(truth_table_data) % self.PAGE_SIZE == 0
+                    and partial_results_requested()
+                ):
+                    first_row = len(truth_table_data) - self.PAGE_SIZE
+                    report_partial_result(
+                        TruthTableRowsResult(first_row, truth_table_data[first_row:])
+                    )
 
         result_cls = None
 
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable
+
+from sympy import Expr
+
+
+class AppliedValueCache:
+    """
+    Least recently used cache of the applied values of a function definition,
+    keyed by the generation of the definition store it was applied in, and the values of its arguments.
+    Entries are evicted once the number of entries exceeds max_entries.
+
+    Definitions are shared between concurrently running commands, so the cache is thread safe.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[Hashable, Expr] = OrderedDict()
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Expr | None:
+        """
+        Retreive the applied value with the given key, None if it is not cached.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+
+            if value is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+            return value
+
+    def put(self, key: Hashable, value: Expr):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
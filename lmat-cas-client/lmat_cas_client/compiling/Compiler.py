@@ -12,6 +12,7 @@ from lmat_cas_client.compiling.transforming.DependenciesTransformer import (
 from lmat_cas_client.compiling.transforming.SympyTransformer import (
     sympy_transformer_runner,
 )
+from lmat_cas_client.PhaseProfiler import profile_phase
 
 
 class Compiler[**PTransform, TRes](ABC):
@@ -44,10 +45,14 @@ class LatexToSympyCompiler(Compiler[[DefinitionStore], Expr]):
         Returns:
             Expr: compiled sympy expression.
         """
-        ast = latex_parser.parse(latex_str)
+        with profile_phase("parse"):
+            ast = latex_parser.parse(latex_str)
 
-        dependencies = dependencies_transformer_runner.transform(ast)
+        with profile_phase("dependencies"):
+            dependencies = dependencies_transformer_runner.transform(ast)
 
-        def_store.assert_acyclic_dependencies(dependencies)
+        with profile_phase("acyclic_check"):
+            def_store.assert_acyclic_dependencies(dependencies)
 
-        return sympy_transformer_runner.transform(ast, def_store)
+        with profile_phase("transform"):
+            return sympy_transformer_runner.transform(ast, def_store)
@@ -1,9 +1,27 @@
 from abc import ABC, abstractmethod
 from collections import deque
 from copy import copy
-from typing import Iterable, Optional, Self
+from itertools import count
+from threading import Lock
+from typing import Callable, Iterable, Optional, Self
 
 from sympy import Expr
+from sympy.matrices import MutableDenseMatrix
+
+from lmat_cas_client.PhaseProfiler import increment_stat
+
+from .AppliedValueCache import AppliedValueCache
+
+# generations are unique across all definition stores, so a generation identifies both a store and the state of its definitions.
+_store_generations = count()
+
+
+# memoized values are shared, sympy expressions are immutable, but matrices are not, so callers get their own copy.
+def _copy_if_mutable(value: Expr) -> Expr:
+    if isinstance(value, MutableDenseMatrix):
+        return value.copy()
+
+    return value
 
 
 class Definition(ABC):
@@ -20,6 +38,7 @@ class Definition(ABC):
     def dependencies(self) -> set[str]:
         """
         return a list of definition names which the current definition depends on.
+        the definition store asks for these every time it resolves dependencies, so they should be cheap to retreive.
         """
         pass
 
@@ -38,11 +57,17 @@ class FunctionDefinition(Definition):
     which allows a definition to define some variables, which arguemnts may be applied to, producing unique values.
     defined_value should in this case return a value representing the unapplied function itself,
     and applied_value should produce the output of the applied function.
+
+    Applied values may be memoized in the applied_value_cache of the definition, see memoized_applied_value.
     """
 
+    # number of applied values memoized per function definition.
+    APPLIED_VALUE_CACHE_SIZE = 256
+
     def __init__(self, variables: Iterable[str] = []):
         super().__init__()
         self._variables = tuple(variables)
+        self.applied_value_cache = AppliedValueCache(self.APPLIED_VALUE_CACHE_SIZE)
 
     @property
     def variables(self) -> tuple[str]:
@@ -71,6 +96,43 @@ class FunctionDefinition(Definition):
         """
         pass
 
+    def memoized_applied_value(
+        self,
+        definition_store: "DefinitionStore",
+        arg_values: tuple[Expr, ...],
+        compute_value: Callable[[], Expr],
+    ) -> Expr:
+        """
+        Retreive the applied value of this function for the given argument values in the given store,
+        computing it with compute_value, if it has not been computed for the current generation of the store.
+        Hits and misses are recorded in the stats of the active profile.
+
+        Args:
+            definition_store (DefinitionStore): DefinitionStore the function is applied in
+            arg_values (tuple[Expr, ...]): values of the arguments the function is applied to
+            compute_value (Callable[[], Expr]): computes the applied value
+
+        Returns:
+            Expr: applied value
+        """
+        key = (definition_store.generation, arg_values)
+
+        try:
+            value = self.applied_value_cache.get(key)
+        except TypeError:
+            # some arguments cannot be hashed, e.g. mutable matrices.
+            return compute_value()
+
+        if value is not None:
+            increment_stat("applied_value_cache_hits")
+            return _copy_if_mutable(value)
+
+        increment_stat("applied_value_cache_misses")
+        value = compute_value()
+        self.applied_value_cache.put(key, value)
+
+        return _copy_if_mutable(value)
+
 
 class CyclicDependencyError(Exception):
     """
@@ -86,29 +148,69 @@ class CyclicDependencyError(Exception):
 class DefinitionStore:
     """
     The DefinitionStore is responsible for storing a series of definitions, identifying them by a string key, known as a 'definition name'.
+
+    Defined values may be memoized in the store they were computed from, see memoized_value.
+    Memoized values are forgotten whenever a definition of the store changes, as any of them may depend on it.
+
+    The dependencies resolved for each definition name are cached as well,
+    and only forgotten when a definition visited while resolving them changes.
+
+    Overriding a store does not copy it, instead the new definitions are layered on top of it,
+    so a store must not be modified once it has been overridden.
     """
 
-    def __init__(self, definitions: Optional[dict[str, Definition]] = None):
+    # number of layers a store may have on top of its bottom store, before overriding it merges the layers.
+    MAX_LAYER_DEPTH = 8
+
+    def __init__(
+        self,
+        definitions: Optional[dict[str, Definition]] = None,
+        *,
+        parent: Optional["DefinitionStore"] = None,
+    ):
         """
         Construct a DefinitionStore from the given map of definition names to their corresponding Definition objects
 
         Args:
             definitions (dict[str, Definition], optional): Defaults to { }.
+            parent (DefinitionStore, optional): store the definitions are layered on top of, definitions not in this store are retreived from it.
+                Defaults to None.
         """
         if definitions is None:
             definitions = {}
 
-        self._definitions = dict()
+        self._parent = parent
+        self._layer_depth = 0 if parent is None else parent._layer_depth + 1
+        self._generation = next(_store_generations)
+        # definitions of this layer, None if the definition of the parent is deleted in this layer.
+        self._definitions: dict[str, Optional[Definition]] = dict()
+        # memoized defined values by the definition they are the value of.
+        self._memoized_values: dict[Definition, Expr] = {}
+        # results of resolve_dependencies for single definition names,
+        # along with the names visited while resolving them, which the result is invalidated by.
+        self._resolved_dependencies: dict[
+            str, tuple[bool, tuple[str], frozenset[str]]
+        ] = {}
+        # stores are shared between concurrently running commands, so the caches are guarded by a lock.
+        self._cache_lock = Lock()
 
         for def_key, def_value in definitions.items():
             self.set_definition(def_key, def_value)
 
     def clone(self) -> Self:
-        return DefinitionStore(self.get_definitions())
+        new_def_store = DefinitionStore(self.get_definitions())
+
+        # the clone has the exact same definitions, so it may reuse the resolved dependencies.
+        with self._cache_lock:
+            new_def_store._resolved_dependencies = copy(self._resolved_dependencies)
+
+        return new_def_store
 
     def override(self, new_definitions: dict[str, Definition]) -> Self:
         """_summary_
-        clone the current DefinitionStore and add the new definitions to the existing definitions in the old DefinitionStore.
+        create a new DefinitionStore with the new definitions layered on top of the definitions of the current DefinitionStore.
+        this only costs as much as the number of new definitions, as long as the current store has less than MAX_LAYER_DEPTH layers,
+        otherwise its layers are merged into a single layer on top of its bottom store first.
 
         Args:
             new_definitions (dict[str, Definition]): definitions to override / add in the new DefinitionStore
@@ -116,12 +218,25 @@ class DefinitionStore:
         Returns:
             DefinitionStore
         """
-        new_def_store = self.clone()
+        if self._layer_depth < self.MAX_LAYER_DEPTH:
+            return DefinitionStore(new_definitions, parent=self)
 
-        for new_def_name, new_def in new_definitions.items():
-            new_def_store.set_definition(new_def_name, new_def)
+        # keep lookups fast, by never having to look through more than MAX_LAYER_DEPTH layers.
+        layers = []
+        bottom_store = self
 
-        return new_def_store
+        while bottom_store._parent is not None:
+            layers.append(bottom_store._definitions)
+            bottom_store = bottom_store._parent
+
+        merged_definitions = {}
+
+        for layer in reversed(layers):
+            merged_definitions.update(layer)
+
+        merged_definitions.update(new_definitions)
+
+        return DefinitionStore(merged_definitions, parent=bottom_store)
 
     def set_definition(self, definition_name: str, definition: Optional[Definition]):
         """
@@ -133,15 +248,70 @@ class DefinitionStore:
                 Value to substituted when definition name has been matched.
                 If `None`, any definition tied to `definition_name` is deleted.
         """
-        if definition is None:
+        if definition is None and self._parent is None:
             self._definitions.pop(definition_name, None)
         else:
             self._definitions[definition_name] = definition
 
+        self._generation = next(_store_generations)
+
+        with self._cache_lock:
+            self._memoized_values.clear()
+
+            self._resolved_dependencies = {
+                resolved_name: resolved
+                for resolved_name, resolved in self._resolved_dependencies.items()
+                if definition_name not in resolved[2]
+            }
+
+    @property
+    def generation(self) -> int:
+        """
+        number identifying this store and the current state of its definitions,
+        a new number is assigned every time a definition is set.
+        """
+        return self._generation
+
+    def memoized_value(
+        self, definition: Definition, compute_value: Callable[[], Expr]
+    ) -> Expr:
+        """
+        Retreive the defined value of the given definition in this store, computing it with compute_value,
+        if it has not been computed since the definitions of the store last changed.
+
+        Concurrent callers may compute the same value twice, so compute_value should not have any side effects.
+
+        Args:
+            definition (Definition): definition the value is the defined value of
+            compute_value (Callable[[], Expr]): computes the defined value of the definition in this store
+
+        Returns:
+            Expr: defined value
+        """
+        with self._cache_lock:
+            value = self._memoized_values.get(definition)
+
+        if value is None:
+            value = compute_value()
+
+            with self._cache_lock:
+                value = self._memoized_values.setdefault(definition, value)
+
+        return _copy_if_mutable(value)
+
     def get_definition(
         self, definition_name: str, *, default: Optional[Definition] = None
     ) -> Optional[Definition]:
-        return self._definitions.get(definition_name, default)
+        def_store = self
+
+        while def_store is not None:
+            if definition_name in def_store._definitions:
+                definition = def_store._definitions[definition_name]
+                return default if definition is None else definition
+
+            def_store = def_store._parent
+
+        return default
 
     def get_definitions(self) -> dict[str, Definition]:
         """
@@ -150,7 +320,18 @@ class DefinitionStore:
         Returns:
             dict[str, Definition]
         """
-        return copy(self._definitions)
+        if self._parent is None:
+            return copy(self._definitions)
+
+        definitions = self._parent.get_definitions()
+
+        for definition_name, definition in self._definitions.items():
+            if definition is None:
+                definitions.pop(definition_name, None)
+            else:
+                definitions[definition_name] = definition
+
+        return definitions
 
     def get_definition_names(self) -> set[str]:
         """
@@ -159,7 +340,7 @@ class DefinitionStore:
         Returns:
             set[str]
         """
-        return set(self._definitions.keys())
+        return set(self.get_definitions().keys())
 
     def resolve_dependencies(
         self, definition_names: Iterable[str]
@@ -185,6 +366,68 @@ class DefinitionStore:
             tuple[bool, tuple[str]]
         """
 
+        # the dependencies of each name are resolved separately, so they can be cached.
+        # a dependency of a name always comes before it in its resolved dependencies,
+        # so concatenating them, skipping names already present, preserves this for every name.
+        resolved_names = {}
+
+        for definition_name in definition_names:
+            success, result = self._resolve_definition_dependencies(definition_name)
+
+            if not success:
+                return False, result
+
+            resolved_names.update(dict.fromkeys(result))
+
+        return True, tuple(resolved_names)
+
+    def _resolve_definition_dependencies(
+        self, definition_name: str
+    ) -> tuple[bool, tuple[str]]:
+        # names without a definition have no dependencies, so there is no point in caching them.
+        if self.get_definition(definition_name) is None:
+            return True, (definition_name,)
+
+        resolved = self._cached_resolved_dependencies(definition_name)
+
+        if resolved is None:
+            resolved = self._resolve_dependency_graph((definition_name,))
+
+            with self._cache_lock:
+                self._resolved_dependencies[definition_name] = resolved
+
+        success, result, _visited_names = resolved
+
+        return success, result
+
+    # Retreive the cached resolved dependencies of the given name from this store or the stores below it,
+    # results cached in a lower store are only valid, if they did not visit any name defined in the layers above it.
+    def _cached_resolved_dependencies(
+        self, definition_name: str
+    ) -> tuple[bool, tuple[str], frozenset[str]] | None:
+        overridden_names = set()
+        def_store = self
+
+        while def_store is not None:
+            with def_store._cache_lock:
+                resolved = def_store._resolved_dependencies.get(definition_name)
+
+            if resolved is not None and overridden_names.isdisjoint(resolved[2]):
+                return resolved
+
+            if def_store._parent is None:
+                break
+
+            overridden_names.update(def_store._definitions)
+            def_store = def_store._parent
+
+        return None
+
+    # resolve_dependencies without any caching,
+    # also returns the names visited while resolving, as these are the only names the result depends on.
+    def _resolve_dependency_graph(
+        self, definition_names: Iterable[str]
+    ) -> tuple[bool, tuple[str], frozenset[str]]:
         # The general strategy here is to first build a digraph 'G = (N, D)', where each node 'n E N' is a definition,
         # and each directed edge 'd E D', between two nodes, represents a dependency between those nodes.
         # 'G' is a subgraph of the entire digraph representing all definitions in the DefinitionStore.
@@ -265,9 +508,9 @@ class DefinitionStore:
 
         if in_deg_table != {}:
             # in_deg_table is not empty <==> graph is not a DAG <==> there is a cyclic dependency in the remaining vertices in the graph.
-            return False, tuple(in_deg_table.keys())
+            return False, tuple(in_deg_table.keys()), frozenset(marked_definitions)
 
-        return True, tuple(topological_ordering)
+        return True, tuple(topological_ordering), frozenset(marked_definitions)
 
     def assert_acyclic_dependencies(
         self, definition_names: Iterable[str]
@@ -1,7 +1,7 @@
 from typing import Iterable, override
 
 from lark import Tree
-from sympy import Expr, Function, Symbol
+from sympy import Dummy, Expr, Function, MatrixBase, Symbol
 from sympy.core.function import AppliedUndef
 
 from lmat_cas_client.compiling.transforming.TransformerRunner import TransformerRunner
@@ -83,20 +83,40 @@ class AstDefinition(Definition):
         self._ast_definition = ast_definition
         self._transformer = expr_transformer
         self._dependencies_transformer = dependencies_transformer
+        # the AST never changes, so its dependencies are only transformed once, when first needed.
+        self._dependencies: frozenset[str] | None = None
 
+    # the value is memoized in the definition store, as every occurrence of the definition asks for it,
+    # and otherwise chained definitions would be transformed an exponential number of times.
     @override
     def defined_value(self, definition_store: DefinitionStore):
-        return self._transformer.transform(self._ast_definition, definition_store)
+        return definition_store.memoized_value(
+            self,
+            lambda: self._transformer.transform(self._ast_definition, definition_store),
+        )
 
     @override
-    def dependencies(self) -> set[str]:
-        return self._dependencies_transformer.transform(self._ast_definition)
+    def dependencies(self) -> frozenset[str]:
+        if self._dependencies is None:
+            self._dependencies = frozenset(
+                self._dependencies_transformer.transform(self._ast_definition)
+            )
+
+        return self._dependencies
+
+
+# memoized in place of the compiled body of a function, whose body could not be compiled without its arguments.
+_NO_COMPILED_BODY = object()
 
 
 #
 class AstFunctionDefinition(FunctionDefinition):
     """
     Like SerializedDefinition, but with FunctionDefinition as a base
+
+    Applications to distinct plain symbols share a body compiled once per definition store,
+    with placeholder symbols in place of the variables, which are then replaced by the arguments.
+    Any other application transforms the body with its arguments bound.
     """
 
     def __init__(
@@ -112,6 +132,8 @@ class AstFunctionDefinition(FunctionDefinition):
         self._ast_body = ast_body
         self._transformer = expr_transformer
         self._dependencies_transformer = dependencies_transformer
+        self._dependencies: frozenset[str] | None = None
+        self._placeholders = tuple(Dummy(variable) for variable in self.variables)
 
     @override
     def defined_value(self, _definition_store: DefinitionStore) -> Function:
@@ -133,6 +155,39 @@ class AstFunctionDefinition(FunctionDefinition):
                     f"Incorrect number of function args provided.\nExpected {len(self.variables)} ({', '.join(self.variables)}) got {len(self.args)}"
                 )
 
+        arg_values = tuple(arg.defined_value(definition_store) for arg in args)
+
+        return self.memoized_applied_value(
+            definition_store,
+            arg_values,
+            lambda: self._apply(definition_store, args, arg_values),
+        )
+
+    @override
+    def dependencies(self) -> frozenset[str]:
+        if self._dependencies is None:
+            self._dependencies = frozenset(
+                self._dependencies_transformer.transform(self._ast_body).difference(
+                    self._variables
+                )
+            )
+
+        return self._dependencies
+
+    def _apply(
+        self,
+        definition_store: DefinitionStore,
+        args: tuple[Definition, ...],
+        arg_values: tuple[Expr, ...],
+    ) -> Expr:
+        if len(args) > 0 and self._can_substitute(definition_store, arg_values):
+            body = definition_store.memoized_value(
+                self, lambda: self._compile_body(definition_store)
+            )
+
+            if body is not _NO_COMPILED_BODY:
+                return body.xreplace(dict(zip(self._placeholders, arg_values)))
+
         args_definitions = {}
 
         for variable_name, argument_definition in zip(self.variables, args):
@@ -142,8 +197,49 @@ class AstFunctionDefinition(FunctionDefinition):
             self._ast_body, definition_store.override(args_definitions)
         )
 
-    @override
-    def dependencies(self) -> set[str]:
-        return self._dependencies_transformer.transform(self._ast_body).difference(
-            self._variables
+    # check if the given argument values can be substituted into the compiled body,
+    # without changing the result compared to transforming the body with them.
+    # sympy evaluates expressions as they are built, so this only holds for arguments it treats exactly like the placeholders,
+    # e.g. gcd(x, 6) evaluates to 1 for a placeholder x, but not for x = 3, and x / x evaluates to 1, but not for x = 0.
+    def _can_substitute(
+        self, definition_store: DefinitionStore, arg_values: tuple[Expr, ...]
+    ) -> bool:
+        if any(
+            not isinstance(arg_value, Symbol)
+            or arg_value.assumptions0 != placeholder.assumptions0
+            for arg_value, placeholder in zip(arg_values, self._placeholders)
+        ):
+            return False
+
+        # the same symbol passed for two variables could evaluate differently than two distinct placeholders, e.g. in x - y.
+        if len(set(arg_values)) != len(arg_values):
+            return False
+
+        # names in the body, or in the bodies of the definitions it depends on.
+        success, dependency_names = definition_store.resolve_dependencies(
+            self.dependencies()
         )
+
+        if not success:
+            return False
+
+        # the body might bind the symbols, e.g. as a derivative, integral or sum variable.
+        return not any(arg_value.name in dependency_names for arg_value in arg_values)
+
+    def _compile_body(self, definition_store: DefinitionStore) -> Expr | object:
+        try:
+            body = self._transformer.transform(
+                self._ast_body,
+                definition_store.override({
+                    variable: SympyDefinition(placeholder)
+                    for variable, placeholder in zip(self.variables, self._placeholders)
+                }),
+            )
+        except Exception:
+            # transforming the body with the arguments reports the error instead.
+            return _NO_COMPILED_BODY
+
+        if not isinstance(body, (Expr, MatrixBase)):
+            return _NO_COMPILED_BODY
+
+        return body
@@ -1,8 +1,12 @@
+from collections import OrderedDict
+from threading import Lock
 from typing import Callable, Optional
 
 import regex
 from lark import Lark, LarkError, ParseTree, UnexpectedInput, UnexpectedToken
 
+from lmat_cas_client.PhaseProfiler import increment_stat
+
 
 class PrettyParserError(LarkError):
     pass
@@ -14,11 +18,25 @@ class Parser:
     provides a parse method which rethrows any UnexpectedInput exception, produced by the Lark parser,
     as an PrettyParserError with a more user friendly exception message.
     Additionally, this also adds a pre processor which perform broad transformations on the input before it is parsed by lark.
+
+    Parse trees are cached by their pre processed text, in a least recently used cache of at most parse_tree_cache_size trees,
+    as the same definitions and equations are parsed again for every command which uses them.
+    Cached trees are shared between every parse of the same text, so they must never be modified,
+    transformers produce new trees and values, which leaves the parsed tree as is.
     """
 
     def __init__(
-        self, lark_parser: Lark, pre_processor: Optional[Callable[[str], str]]
+        self,
+        lark_parser: Lark,
+        pre_processor: Optional[Callable[[str], str]],
+        parse_tree_cache_size: int = 512,
     ):
+        """
+        Args:
+            lark_parser (Lark): parser to parse the pre processed text with.
+            pre_processor (Optional[Callable[[str], str]]): transformation applied to the text before it is parsed.
+            parse_tree_cache_size (int, optional): maximum number of cached parse trees, 0 disables the cache. Defaults to 512.
+        """
         if pre_processor is None:
 
             def pre_processor(t):
@@ -27,6 +45,14 @@ class Parser:
         self._pre_processor = pre_processor
         self._lark_parser = lark_parser
 
+        self.parse_tree_cache_size = parse_tree_cache_size
+        self._parse_tree_cache: OrderedDict[str, ParseTree] = OrderedDict()
+        # parses are shared by concurrently running commands.
+        self._parse_tree_cache_lock = Lock()
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     @property
     def parser(self) -> Lark:
         return self._lark_parser
@@ -34,6 +60,7 @@ class Parser:
     def parse(self, text: str, *args, **kwargs) -> ParseTree:
         """
         parse the given piece of text with the lark parser instance.
+        The returned tree may be shared with other parses of the same text, and must not be modified.
 
         Args:
             text (str)
@@ -47,6 +74,45 @@ class Parser:
 
         pre_processed_text = self._pre_processor(text)
 
+        # extra arguments may change the resulting tree, e.g. the start rule, so those parses are not cached.
+        if len(args) > 0 or len(kwargs) > 0 or self.parse_tree_cache_size <= 0:
+            return self._parse_pre_processed(pre_processed_text, *args, **kwargs)
+
+        with self._parse_tree_cache_lock:
+            parse_tree = self._parse_tree_cache.get(pre_processed_text)
+
+            if parse_tree is not None:
+                self._parse_tree_cache.move_to_end(pre_processed_text)
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+        if parse_tree is not None:
+            increment_stat("parse_tree_cache_hits")
+            return parse_tree
+
+        increment_stat("parse_tree_cache_misses")
+
+        # parse without holding the lock, so different texts are parsed concurrently.
+        parse_tree = self._parse_pre_processed(pre_processed_text)
+
+        with self._parse_tree_cache_lock:
+            self._parse_tree_cache[pre_processed_text] = parse_tree
+
+            while len(self._parse_tree_cache) > self.parse_tree_cache_size:
+                self._parse_tree_cache.popitem(last=False)
+
+        return parse_tree
+
+    def clear_cache(self):
+        with self._parse_tree_cache_lock:
+            self._parse_tree_cache.clear()
+
+    def cache_hit_ratio(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups > 0 else 0.0
+
+    def _parse_pre_processed(self, pre_processed_text: str, *args, **kwargs):
         try:
             return self._lark_parser.parse(pre_processed_text, *args, **kwargs)
         except UnexpectedInput as e:
@@ -0,0 +1,153 @@
+import asyncio
+import bisect
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from lmat_cas_client.execution.ExecutionBackend import CommandError
+
+
+class _PendingCommand:
+    def __init__(self, priority: int, sequence: int, command_type: str):
+        self.priority = priority
+        self.sequence = sequence
+        self.command_type = command_type
+        self.future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    # higher priorities are ordered first, commands of equal priority are ordered by arrival.
+    def sort_key(self) -> tuple[int, int]:
+        return (-self.priority, self.sequence)
+
+
+class CommandScheduler:
+    """
+    Decides when commands are allowed to run, based on their priority and concurrency limits.
+
+    Each command type can be given a priority and a maximum number of concurrently running commands,
+    additionally the total number of running commands can be limited.
+    Commands which cannot run yet wait in a bounded pending queue,
+    and are started in order of priority, then arrival, as soon as the limits allow.
+
+    The scheduler is not thread safe, and should only be used from the client event loop.
+    """
+
+    def __init__(self, max_running: int | None = None, max_pending: int = 256):
+        self.max_running = max_running
+        self.max_pending = max_pending
+
+        self._priorities: dict[str, int] = {}
+        self._concurrency_limits: dict[str, int] = {}
+
+        self._pending: list[_PendingCommand] = []
+        self._running: Counter[str] = Counter()
+        self._running_count = 0
+        self._sequence = itertools.count()
+
+    def configure(
+        self, command_type: str, priority: int = 0, max_concurrency: int | None = None
+    ):
+        """
+        Set the priority and the maximum number of concurrently running commands of the given command type.
+        """
+        self._priorities[command_type] = priority
+
+        if max_concurrency is None:
+            self._concurrency_limits.pop(command_type, None)
+        else:
+            self._concurrency_limits[command_type] = max_concurrency
+
+        self._dispatch()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running_count(self) -> int:
+        return self._running_count
+
+    def queue_depths(self) -> dict[str, int]:
+        """
+        Number of pending commands of each command type with any pending commands.
+        """
+        return dict(Counter(pending.command_type for pending in self._pending))
+
+    @asynccontextmanager
+    async def schedule(self, command_type: str) -> AsyncIterator[None]:
+        """
+        Wait until a command of the given type is allowed to run, and keep it counted as running for the duration of the context.
+        Cancelling the waiting task removes the command from the pending queue.
+
+        Raises:
+            CommandError: the pending queue is full.
+        """
+        await self._acquire(command_type)
+
+        try:
+            yield
+        finally:
+            self._release(command_type)
+
+    async def _acquire(self, command_type: str):
+        # pending commands are always blocked by a limit, as they are started as soon as they are not,
+        # so a command which is not blocked itself never needs to wait behind them.
+        if self._can_run(command_type):
+            self._start(command_type)
+            return
+
+        if len(self._pending) >= self.max_pending:
+            raise CommandError(
+                f"Pending command queue is full ({self.max_pending} commands)",
+                "Too many commands are waiting to run, please wait for some to finish.",
+            )
+
+        pending = _PendingCommand(
+            self._priorities.get(command_type, 0), next(self._sequence), command_type
+        )
+        bisect.insort(self._pending, pending, key=_PendingCommand.sort_key)
+
+        try:
+            await pending.future
+        except asyncio.CancelledError:
+            if pending.future.cancelled():
+                self._pending.remove(pending)
+            else:
+                # the command was started, but got cancelled before it could run.
+                self._release(command_type)
+            raise
+
+    def _release(self, command_type: str):
+        self._running[command_type] -= 1
+        self._running_count -= 1
+        self._dispatch()
+
+    def _can_run(self, command_type: str) -> bool:
+        if self.max_running is not None and self._running_count >= self.max_running:
+            return False
+
+        limit = self._concurrency_limits.get(command_type)
+
+        return limit is None or self._running[command_type] < limit
+
+    def _start(self, command_type: str):
+        self._running[command_type] += 1
+        self._running_count += 1
+
+    # start pending commands, highest priority first, until no more are allowed to run.
+    def _dispatch(self):
+        i = 0
+
+        while i < len(self._pending):
+            if self.max_running is not None and self._running_count >= self.max_running:
+                break
+
+            pending = self._pending[i]
+
+            if not self._can_run(pending.command_type):
+                i += 1
+                continue
+
+            del self._pending[i]
+            self._start(pending.command_type)
+            pending.future.set_result(None)
@@ -0,0 +1,81 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Callable, Iterable
+
+
+class DefinitionCompilerPool:
+    """
+    Pool of worker processes compiling the definitions of large environments in parallel.
+    Parsing is pure python, so threads would only take turns holding the GIL, hence the separate processes.
+
+    Workers are only spawned once the pool is first used, i.e. by the first environment with at least min_definitions
+    uncompiled definitions, so clients which never see such an environment never pay for the processes.
+    Compiled definitions are pickled back to the process using the pool.
+
+    Daemonic processes cannot have child processes, so the pool cannot be used in the workers of a ProcessPoolBackend,
+    which already compile definitions in parallel by handling separate commands anyways.
+    """
+
+    def __init__(self, worker_count: int, min_definitions: int = 32):
+        """
+        Args:
+            worker_count (int): number of worker processes.
+            min_definitions (int, optional): least number of definitions worth compiling in the pool,
+                fewer definitions are cheaper to compile in the process itself, than sending them to the pool. Defaults to 32.
+        """
+        self.worker_count = worker_count
+        self.min_definitions = min_definitions
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_lock = Lock()
+
+    def map[T, R](self, function: Callable[[T], R], items: Iterable[T]) -> list[R]:
+        """
+        Apply the given function to every item in the pool, and return the results in the order of the items.
+        The function, items and results must be picklable.
+
+        Raises:
+            BrokenProcessPool: if a worker died, e.g. by running out of memory. The workers are replaced on the next call.
+        """
+        items = list(items)
+        # a few chunks per worker, so the items are spread evenly, without sending each of them separately.
+        chunk_size = max(1, len(items) // (self.worker_count * 4))
+        executor = self._get_executor()
+
+        try:
+            return list(executor.map(function, items, chunksize=chunk_size))
+        except BrokenProcessPool:
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+
+            raise
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.worker_count, mp_context=multiprocessing.get_context("spawn")
+                )
+
+            return self._executor
+
+
+# pool used to compile the definitions of environments, None if they are compiled serially.
+_compiler_pool: DefinitionCompilerPool | None = None
+
+
+def set_compiler_pool(compiler_pool: DefinitionCompilerPool | None):
+    global _compiler_pool
+    _compiler_pool = compiler_pool
+
+
+def get_compiler_pool() -> DefinitionCompilerPool | None:
+    return _compiler_pool
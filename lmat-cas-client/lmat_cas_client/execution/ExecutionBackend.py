@@ -0,0 +1,84 @@
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from lmat_cas_client.command_handlers.CommandHandler import CommandHandler
+from lmat_cas_client.monitoring.MemoryWatchdog import MemoryWatchdog
+
+
+class CommandError(Exception):
+    """
+    Error raised by an ExecutionBackend when a command failed while being executed.
+    Holds the developer and user messages which should be reported back to the plugin.
+    """
+
+    def __init__(self, dev_message: str, usr_message: str | None = None):
+        super().__init__(usr_message if usr_message is not None else dev_message)
+        self.dev_message = dev_message
+        self.usr_message = usr_message if usr_message is not None else dev_message
+
+
+class ExecutionBackend(ABC):
+    """
+    An ExecutionBackend is responsible for running commands on behalf of an LmatCasClient.
+    Commands are identified by a job id, and are executed with the execute coroutine.
+    Cancelling the task awaiting execute must stop the running command.
+    """
+
+    @abstractmethod
+    def start(
+        self,
+        command_handlers: dict[str, CommandHandler],
+        warm_up: bool = False,
+        memory_watchdog: MemoryWatchdog | None = None,
+    ):
+        """
+        Start the backend, making it ready to execute commands handled by the given command handlers.
+        If warm_up is set, the backend runs the warm-up corpus in the background, wherever it executes commands.
+        If a memory watchdog is given, the backend checks the memory usage of its workers after every command.
+        """
+        pass
+
+    @abstractmethod
+    async def wait_until_ready(self) -> dict:
+        """
+        Wait until the backend has finished warming up, if it was started with warm_up set.
+
+        Returns:
+            dict: warm-up timings, as returned by run_warm_up, empty if the backend did not warm up.
+        """
+        pass
+
+    @abstractmethod
+    async def execute(
+        self,
+        job_id: str,
+        command_type: str,
+        start_args: dict,
+        reporters: dict[str, Callable[[tuple[str, dict]], None]] | None = None,
+    ) -> tuple[str, dict]:
+        """
+        Execute the command_type handler with the given start args.
+        Results reported by the handler, of a kind in reporters, are passed as payloads to its reporter on the event loop.
+
+        Raises:
+            CommandError: the command handler failed.
+
+        Returns:
+            tuple[str, dict]: response payload type and value, as returned by CommandResult.getResponsePayload.
+        """
+        pass
+
+    @abstractmethod
+    def memory_stats(self) -> dict:
+        """
+        Retreive a json serializable snapshot of the memory usage of the workers of the backend,
+        along with the number of times the memory watchdog cleared caches and recycled workers.
+        """
+        pass
+
+    @abstractmethod
+    def shutdown(self):
+        """
+        Stop any running commands, and release all resources held by the backend.
+        """
+        pass
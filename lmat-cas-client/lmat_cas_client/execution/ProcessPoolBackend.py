@@ -0,0 +1,390 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from multiprocessing.connection import Connection
+from typing import Callable, override
+
+from lmat_cas_client.command_handlers.CommandHandler import (
+    CommandHandler,
+    CommandResult,
+    result_reporters,
+)
+from lmat_cas_client.math_lib.setup import setup_mathlib
+from lmat_cas_client.monitoring.MemoryWatchdog import (
+    MemoryWatchdog,
+    WatchdogAction,
+    clear_caches,
+)
+from lmat_cas_client.monitoring.ProcessMemory import process_rss_bytes
+from lmat_cas_client.WarmUp import run_warm_up
+
+from .ExecutionBackend import CommandError, ExecutionBackend
+
+
+def _worker_main(
+    connection: Connection,
+    command_handlers: dict[str, CommandHandler],
+    warm_up: bool,
+    memory_watchdog: MemoryWatchdog | None,
+    stdout_to_stderr: bool,
+):
+    """
+    Entry point of a worker process.
+    If stdout_to_stderr is set, anything written to stdout by the worker is written to stderr instead.
+    Once the worker has been set up, and warmed up if warm_up is set, a ("ready", warm_up_timings, rss_bytes) message is sent.
+    Afterwards it receives (job_id, command_type, start_args, report_kinds) requests on the given connection,
+    and sends back a ("success", job_id, payload) or ("error", job_id, dev_message, usr_message) response for each of them.
+    Before the response, a ("report", job_id, kind, payload) message is sent for every reported result of a kind in report_kinds,
+    followed by a ("memory", job_id, rss_bytes, request_count, watchdog_action) message,
+    with the action the worker took, or wants the backend to take, according to the memory watchdog.
+    """
+    if stdout_to_stderr:
+        # redirect the file descriptor, so output of C extensions is redirected as well.
+        sys.stdout.flush()
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    setup_mathlib()
+
+    connection.send((
+        "ready",
+        run_warm_up(command_handlers) if warm_up else {},
+        process_rss_bytes(),
+    ))
+
+    request_count = 0
+    # memory usage right after the caches were last cleared.
+    cleared_rss_bytes: int | None = None
+
+    def send_report(job_id: str, kind: str, result: CommandResult):
+        connection.send(("report", job_id, kind, result.getResponsePayload()))
+
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+
+        job_id, command_type, start_args, report_kinds = request
+
+        try:
+            with result_reporters({
+                kind: partial(send_report, job_id, kind) for kind in report_kinds
+            }):
+                result = command_handlers[command_type].handle(start_args)
+
+            response = ("success", job_id, result.getResponsePayload())
+        except Exception as e:
+            response = (
+                "error",
+                job_id,
+                str(e) + "\n" + traceback.format_exc(),
+                str(e),
+            )
+
+        request_count += 1
+        watchdog_action = WatchdogAction.NONE
+
+        if memory_watchdog is not None:
+            watchdog_action = memory_watchdog.check_process(
+                request_count, cleared_rss_bytes
+            )
+
+        if watchdog_action is WatchdogAction.CLEAR_CACHES:
+            clear_caches()
+            cleared_rss_bytes = process_rss_bytes()
+
+        connection.send((
+            "memory",
+            job_id,
+            process_rss_bytes(),
+            request_count,
+            watchdog_action.value,
+        ))
+        connection.send(response)
+
+
+class _Worker:
+    def __init__(
+        self,
+        context: multiprocessing.context.BaseContext,
+        command_handlers: dict[str, CommandHandler],
+        warm_up: bool,
+        memory_watchdog: MemoryWatchdog | None,
+        stdout_to_stderr: bool,
+    ):
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(
+                worker_connection,
+                command_handlers,
+                warm_up,
+                memory_watchdog,
+                stdout_to_stderr,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+        worker_connection.close()
+        # memory usage last reported by the worker.
+        self.rss_bytes: int | None = None
+        self.request_count = 0
+        self.watchdog_action = WatchdogAction.NONE
+
+
+class ProcessPoolBackend(ExecutionBackend):
+    """
+    ExecutionBackend running each command in one of a fixed number of worker processes.
+    Commands therefore run in parallel on separate cores, without competing for the GIL.
+
+    Interrupting a command terminates the worker process running it,
+    and replaces it with a fresh worker, so even commands stuck in C code can be stopped.
+
+    Workers only start receiving commands once they are ready, so when warming up,
+    replacement workers are warmed up before they are handed any commands as well.
+    Workers which fail to start are replaced at most MAX_SPAWN_ATTEMPTS times in a row,
+    once no worker is left, pending and future commands fail, instead of waiting for a worker forever.
+
+    If a memory watchdog is given, workers clear their caches once they exceed its soft limit,
+    and are replaced once they exceed its hard limit or request limit, after responding to their current command.
+
+    If stdout_to_stderr is set, workers write their stdout to stderr, so it never mixes with output of the client process,
+    e.g. a report written to stdout in batch mode.
+    """
+
+    # number of workers started in a row, before giving up on replacing a worker which failed to start.
+    MAX_SPAWN_ATTEMPTS = 3
+    # seconds to wait before replacing a worker which failed to start, doubled for every failed attempt.
+    SPAWN_RETRY_DELAY = 0.5
+
+    def __init__(self, worker_count: int | None = None, stdout_to_stderr: bool = False):
+        self._worker_count = worker_count or os.cpu_count() or 1
+        self._stdout_to_stderr = stdout_to_stderr
+        # always spawn workers, forking a process with a running event loop and threads is unsafe,
+        # and spawn is the only method available on windows anyways.
+        self._context = multiprocessing.get_context("spawn")
+        self._command_handlers: dict[str, CommandHandler] = {}
+        self._workers: set[_Worker] = set()
+        # idle workers, None is put once the backend is broken, to wake up commands waiting on a worker.
+        self._idle_workers: asyncio.Queue[_Worker | None] | None = None
+        # workers which failed to start, waiting to be replaced.
+        self._pending_replacements = 0
+        # set once every worker failed to start too many times in a row, commands then fail with it instead of waiting forever.
+        self._broken_error: CommandError | None = None
+        self._warm_up = False
+        self._memory_watchdog: MemoryWatchdog | None = None
+        self._cache_clears = 0
+        self._watchdog_recycles = 0
+        # tasks waiting for spawned workers to become ready, and the ones of the initial workers.
+        self._ready_tasks: set[asyncio.Task[dict]] = set()
+        self._initial_ready_tasks: list[asyncio.Task[dict]] = []
+        # worker connections are blocking, so all communication with workers happens in this executor.
+        # twice the worker count leaves room for threads still waiting on recently terminated workers.
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=self._worker_count * 2, thread_name_prefix="lmat-worker-io"
+        )
+
+    @property
+    def worker_count(self) -> int:
+        return self._worker_count
+
+    @override
+    def start(
+        self,
+        command_handlers: dict[str, CommandHandler],
+        warm_up: bool = False,
+        memory_watchdog: MemoryWatchdog | None = None,
+    ):
+        self._command_handlers = command_handlers
+        self._warm_up = warm_up
+        self._memory_watchdog = memory_watchdog
+        self._idle_workers = asyncio.Queue()
+
+        self._initial_ready_tasks = [
+            self._spawn_worker() for _ in range(self._worker_count)
+        ]
+
+    @override
+    async def wait_until_ready(self) -> dict:
+        warm_up_timings = await asyncio.shield(
+            asyncio.gather(*self._initial_ready_tasks)
+        )
+
+        # workers warm up in parallel, so the slowest worker determines when the backend is ready.
+        return max(
+            warm_up_timings, key=lambda timings: timings.get("total_ms", 0), default={}
+        )
+
+    @override
+    async def execute(
+        self,
+        job_id: str,
+        command_type: str,
+        start_args: dict,
+        reporters: dict[str, Callable[[tuple[str, dict]], None]] | None = None,
+    ) -> tuple[str, dict]:
+        loop = asyncio.get_running_loop()
+        reporters = reporters or {}
+
+        if self._broken_error is not None:
+            raise self._backend_broken()
+
+        worker = await self._idle_workers.get()
+
+        if worker is None:
+            # pass the wake up on to the next waiting command.
+            self._idle_workers.put_nowait(None)
+            raise self._backend_broken()
+
+        try:
+            await loop.run_in_executor(
+                self._io_executor,
+                worker.connection.send,
+                (job_id, command_type, start_args, list(reporters)),
+            )
+
+            while True:
+                response = await loop.run_in_executor(
+                    self._io_executor, worker.connection.recv
+                )
+
+                match response:
+                    case ("report", _, kind, payload):
+                        reporters[kind](payload)
+                    case ("memory", _, rss_bytes, request_count, watchdog_action):
+                        worker.rss_bytes = rss_bytes
+                        worker.request_count = request_count
+                        worker.watchdog_action = WatchdogAction(watchdog_action)
+                    case _:
+                        break
+        except asyncio.CancelledError:
+            # the command was interrupted, the worker may be stuck anywhere,
+            # so the only safe option is to replace it entirely.
+            self._recycle_worker(worker)
+            raise
+        except (EOFError, OSError) as e:
+            self._recycle_worker(worker)
+            raise CommandError(
+                f"Worker process exited unexpectedly while handling {command_type} ({e!r})",
+                "The CAS worker process crashed, please try again.",
+            ) from e
+
+        match worker.watchdog_action:
+            case WatchdogAction.RECYCLE:
+                self._watchdog_recycles += 1
+                self._recycle_worker(worker)
+            case WatchdogAction.CLEAR_CACHES:
+                self._cache_clears += 1
+                self._idle_workers.put_nowait(worker)
+            case _:
+                self._idle_workers.put_nowait(worker)
+
+        match response:
+            case ("success", _, payload):
+                return payload
+            case ("error", _, dev_message, usr_message):
+                raise CommandError(dev_message, usr_message)
+            case _:
+                raise CommandError(f"Unexpected worker response: {response}")
+
+    @override
+    def memory_stats(self) -> dict:
+        return dict(
+            workers=[
+                dict(
+                    pid=worker.process.pid,
+                    rss_bytes=worker.rss_bytes,
+                    requests=worker.request_count,
+                )
+                for worker in self._workers
+            ],
+            cache_clears=self._cache_clears,
+            recycles=self._watchdog_recycles,
+        )
+
+    @override
+    def shutdown(self):
+        for ready_task in self._ready_tasks:
+            ready_task.cancel()
+
+        for worker in self._workers:
+            worker.process.terminate()
+
+        for worker in self._workers:
+            worker.process.join()
+
+        self._workers.clear()
+        self._io_executor.shutdown(wait=False, cancel_futures=True)
+
+    # spawn a new worker, which is added to the idle workers once it is ready.
+    # attempt is the number of workers which already failed to start in its place.
+    def _spawn_worker(self, attempt: int = 0) -> asyncio.Task[dict]:
+        worker = _Worker(
+            self._context,
+            self._command_handlers,
+            self._warm_up,
+            self._memory_watchdog,
+            self._stdout_to_stderr,
+        )
+        self._workers.add(worker)
+
+        ready_task = asyncio.create_task(self._wait_for_worker(worker, attempt))
+        self._ready_tasks.add(ready_task)
+        ready_task.add_done_callback(self._ready_tasks.discard)
+        # only the ready tasks of the initial workers are awaited, start failures are reported to commands instead.
+        ready_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+        return ready_task
+
+    async def _wait_for_worker(self, worker: _Worker, attempt: int) -> dict:
+        try:
+            ready_message = await asyncio.get_running_loop().run_in_executor(
+                self._io_executor, worker.connection.recv
+            )
+        except (EOFError, OSError) as e:
+            traceback.print_exc(file=sys.stderr)
+            self._workers.discard(worker)
+
+            # a worker failing to start repeatedly, e.g. because of a broken import, would otherwise be replaced forever.
+            if attempt + 1 >= ProcessPoolBackend.MAX_SPAWN_ATTEMPTS:
+                start_error = CommandError(
+                    f"Worker process failed to start {attempt + 1} times in a row ({e!r})",
+                    "The CAS worker process failed to start.",
+                )
+
+                if len(self._workers) == 0 and self._pending_replacements == 0:
+                    self._broken_error = start_error
+                    self._idle_workers.put_nowait(None)
+
+                raise start_error from e
+
+            # the worker died while starting up, it is replaced so the pool keeps its size.
+            self._pending_replacements += 1
+
+            try:
+                await asyncio.sleep(ProcessPoolBackend.SPAWN_RETRY_DELAY * 2**attempt)
+            finally:
+                self._pending_replacements -= 1
+
+            return await self._spawn_worker(attempt + 1)
+
+        _, warm_up_timings, worker.rss_bytes = ready_message
+
+        self._idle_workers.put_nowait(worker)
+        return warm_up_timings
+
+    # error raised by commands once no worker is left to run them.
+    def _backend_broken(self) -> CommandError:
+        return CommandError(
+            self._broken_error.dev_message, self._broken_error.usr_message
+        )
+
+    def _recycle_worker(self, worker: _Worker):
+        self._workers.discard(worker)
+        worker.process.terminate()
+        self._io_executor.submit(worker.process.join)
+        self._spawn_worker()
@@ -0,0 +1,192 @@
+import asyncio
+import ctypes
+import os
+import traceback
+from threading import Lock, Thread
+from typing import Callable, override
+
+from lmat_cas_client.command_handlers.CommandHandler import (
+    CommandHandler,
+    result_reporters,
+)
+from lmat_cas_client.math_lib.setup import setup_mathlib
+from lmat_cas_client.monitoring.MemoryWatchdog import (
+    MemoryWatchdog,
+    WatchdogAction,
+    clear_caches,
+)
+from lmat_cas_client.monitoring.ProcessMemory import process_rss_bytes
+from lmat_cas_client.WarmUp import run_warm_up
+
+from .ExecutionBackend import CommandError, ExecutionBackend
+
+
+class ThreadKill(Exception):
+    pass
+
+
+class KillableThread(Thread):
+    def kill(self):
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(
+            ctypes.c_long(self.ident), ctypes.py_object(ThreadKill)
+        )
+
+
+class ThreadBackend(ExecutionBackend):
+    """
+    ExecutionBackend running each command in its own thread of the client process.
+    The command result is handed back to the event loop awaiting it, so no event loop is needed in the thread itself.
+
+    Interrupting a command raises a ThreadKill exception in its thread,
+    this only takes effect once the thread executes python bytecode again.
+
+    The mathlib is set up in a background thread on start, as it imports sympy,
+    commands wait for it to finish, but the event loop is free to respond to other messages in the meantime.
+
+    Threads cannot be recycled, so if a memory watchdog is given, caches are cleared when it asks for either.
+    """
+
+    def __init__(self):
+        self._command_handlers: dict[str, CommandHandler] = {}
+        self._threads: dict[str, KillableThread] = {}
+        self._setup_task: asyncio.Task[None] | None = None
+        self._warm_up_task: asyncio.Task[dict] | None = None
+        self._memory_watchdog: MemoryWatchdog | None = None
+        # commands handled since caches were last cleared, commands finish in separate threads so this is guarded by a lock.
+        self._request_count = 0
+        self._request_count_lock = Lock()
+        self._cache_clears = 0
+        # memory usage right after the caches were last cleared.
+        self._cleared_rss_bytes: int | None = None
+
+    @override
+    def start(
+        self,
+        command_handlers: dict[str, CommandHandler],
+        warm_up: bool = False,
+        memory_watchdog: MemoryWatchdog | None = None,
+    ):
+        self._command_handlers = command_handlers
+        self._memory_watchdog = memory_watchdog
+        self._setup_task = asyncio.create_task(asyncio.to_thread(setup_mathlib))
+
+        if warm_up:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+
+    @override
+    async def wait_until_ready(self) -> dict:
+        if self._warm_up_task is None:
+            return {}
+
+        return await asyncio.shield(self._warm_up_task)
+
+    @override
+    async def execute(
+        self,
+        job_id: str,
+        command_type: str,
+        start_args: dict,
+        reporters: dict[str, Callable[[tuple[str, dict]], None]] | None = None,
+    ) -> tuple[str, dict]:
+        await asyncio.shield(self._setup_task)
+
+        loop = asyncio.get_running_loop()
+        result_future = loop.create_future()
+
+        def set_future(setter, value):
+            # the future is cancelled if the command was interrupted.
+            if not result_future.done():
+                setter(value)
+
+        def call_soon(callback, *args):
+            # threads outlive the backend if they are not killed in time, by which point the loop may be closed.
+            try:
+                loop.call_soon_threadsafe(callback, *args)
+            except RuntimeError:
+                pass
+
+        def forward_to(reporter: Callable[[tuple[str, dict]], None]):
+            return lambda result: call_soon(reporter, result.getResponsePayload())
+
+        def thread_target():
+            try:
+                with result_reporters({
+                    kind: forward_to(reporter)
+                    for kind, reporter in (reporters or {}).items()
+                }):
+                    result = self._command_handlers[command_type].handle(start_args)
+
+                payload = result.getResponsePayload()
+                self._check_memory()
+                call_soon(set_future, result_future.set_result, payload)
+            except ThreadKill:
+                # the thread was intentionally interrupted, so there is no one to report back to.
+                pass
+            except Exception as e:
+                self._check_memory()
+                call_soon(
+                    set_future,
+                    result_future.set_exception,
+                    CommandError(str(e) + "\n" + traceback.format_exc(), str(e)),
+                )
+
+        thread = KillableThread(target=thread_target, daemon=True)
+        self._threads[job_id] = thread
+
+        try:
+            thread.start()
+            return await result_future
+        except asyncio.CancelledError:
+            if thread.is_alive():
+                thread.kill()
+            raise
+        finally:
+            del self._threads[job_id]
+
+    def _check_memory(self):
+        with self._request_count_lock:
+            self._request_count += 1
+
+            if self._memory_watchdog is None:
+                return
+
+            watchdog_action = self._memory_watchdog.check_process(
+                self._request_count, self._cleared_rss_bytes, recyclable=False
+            )
+
+            if watchdog_action is WatchdogAction.NONE:
+                return
+
+            self._request_count = 0
+            self._cache_clears += 1
+
+        clear_caches()
+        self._cleared_rss_bytes = process_rss_bytes()
+
+    @override
+    def memory_stats(self) -> dict:
+        return dict(
+            workers=[
+                dict(
+                    pid=os.getpid(),
+                    rss_bytes=process_rss_bytes(),
+                    requests=self._request_count,
+                )
+            ],
+            cache_clears=self._cache_clears,
+            recycles=0,
+        )
+
+    async def _warm_up(self) -> dict:
+        await self._setup_task
+        # commands run in threads of this process, so warming up a single thread warms up all of them.
+        return await asyncio.to_thread(run_warm_up, self._command_handlers)
+
+    @override
+    def shutdown(self):
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+
+        for thread in self._threads.values():
+            if thread.is_alive():
+                thread.kill()
@@ -0,0 +1,101 @@
+import asyncio
+import time
+import tomllib
+
+from lmat_cas_client.command_handlers.CommandHandler import CommandHandler
+from lmat_cas_client.execution.ExecutionBackend import CommandError, ExecutionBackend
+
+from .MarkdownDocument import MarkdownEquation, extract_equations
+
+
+async def _evaluate_equation(
+    execution_backend: ExecutionBackend,
+    job_id: str,
+    command_type: str,
+    equation: MarkdownEquation,
+) -> dict:
+    result = dict(line=equation.line, expression=equation.expression)
+
+    try:
+        _, value = await execution_backend.execute(
+            job_id,
+            command_type,
+            dict(
+                expression=equation.expression,
+                environment=equation.environment.model_dump(),
+            ),
+        )
+    except CommandError as e:
+        return dict(result, status="error", error=e.usr_message)
+
+    return dict(
+        result,
+        status="success",
+        result=value["evaluated_expression"],
+        separator=value["metadata"]["separator"],
+    )
+
+
+async def evaluate_markdown_files(
+    file_paths: list[str],
+    command_handlers: dict[str, CommandHandler],
+    execution_backend: ExecutionBackend,
+    command_type: str = "eval",
+) -> dict:
+    """
+    Evaluate every equation in the given markdown files with the command_type handler,
+    like the plugin would if it was evaluated in obsidian. Equations of all files are evaluated concurrently
+    by the given execution backend, which is started and shut down by this function.
+
+    Returns:
+        dict: json serializable report, containing the results of each file by its path,
+        and a summary with the number of equations, errors and the evaluation throughput.
+    """
+    start_time = time.perf_counter()
+    file_results = {}
+    file_equations = {}
+
+    for file_path in file_paths:
+        try:
+            with open(file_path, encoding="utf-8") as markdown_file:
+                file_equations[file_path] = extract_equations(markdown_file.read())
+        except (OSError, UnicodeDecodeError, tomllib.TOMLDecodeError) as e:
+            file_results[file_path] = dict(error=str(e))
+
+    execution_backend.start(command_handlers)
+
+    try:
+        equation_results = await asyncio.gather(*[
+            asyncio.gather(*[
+                _evaluate_equation(
+                    execution_backend, f"{file_path}:{i}", command_type, equation
+                )
+                for i, equation in enumerate(equations)
+            ])
+            for file_path, equations in file_equations.items()
+        ])
+    finally:
+        execution_backend.shutdown()
+
+    for file_path, results in zip(file_equations, equation_results):
+        file_results[file_path] = dict(equations=results)
+
+    duration = time.perf_counter() - start_time
+    equation_count = sum(len(equations) for equations in file_equations.values())
+    error_count = sum(
+        result["status"] == "error"
+        for results in equation_results
+        for result in results
+    )
+
+    return dict(
+        summary=dict(
+            files=len(file_paths),
+            file_errors=len(file_paths) - len(file_equations),
+            equations=equation_count,
+            errors=error_count,
+            duration_s=round(duration, 3),
+            equations_per_s=round(equation_count / duration, 3),
+        ),
+        files={file_path: file_results[file_path] for file_path in file_paths},
+    )
@@ -0,0 +1,182 @@
+import re
+import tomllib
+from typing import Iterator
+
+from pydantic import BaseModel
+
+from lmat_cas_client.LmatEnvironment import EnvDefinition, LmatEnvironment
+
+# fenced code blocks, the language of lmat blocks is lmat.
+_CODE_FENCE_REGEX = re.compile(r"^ {0,3}(?P<fence>`{3,}|~{3,})\s*(?P<language>\S*)")
+_INLINE_CODE_REGEX = re.compile(r"(?P<ticks>`+)[\s\S]*?(?<!`)(?P=ticks)(?!`)")
+# trick used to prevent flickering in single line math blocks, see EquationExtractor.ts.
+_FLICKER_BRACES_REGEX = re.compile(r"^{} (?P<contents>.*) {}$", re.DOTALL)
+
+
+class MarkdownEquation(BaseModel):
+    """
+    Equation found in a markdown document, along with the environment it is evaluated in by the plugin.
+    """
+
+    line: int
+    expression: str
+    is_multiline: bool
+    environment: LmatEnvironment
+
+
+# Replace every character of the given span of text with a space, except newlines, so offsets and lines are preserved.
+def _blank(text: list[str], start: int, end: int):
+    for i in range(start, end):
+        if text[i] != "\n":
+            text[i] = " "
+
+
+# Split the document into its text outside of code, with code replaced by whitespace, and the lmat blocks in it,
+# as (offset, contents) pairs.
+def _split_code(markdown: str) -> tuple[str, list[tuple[int, str]]]:
+    text = list(markdown)
+    lmat_blocks = []
+
+    offset = 0
+    fence = None
+    block_start = 0
+    block_language = ""
+
+    for line in markdown.splitlines(keepends=True):
+        fence_match = _CODE_FENCE_REGEX.match(line)
+
+        if fence is None and fence_match is not None:
+            fence = fence_match["fence"]
+            block_start = offset
+            block_language = fence_match["language"]
+        elif (
+            fence is not None
+            and line.strip().startswith(fence)
+            and line.strip().strip(fence[0]) == ""
+        ):
+            if block_language == "lmat":
+                contents_start = markdown.index("\n", block_start) + 1
+                lmat_blocks.append((block_start, markdown[contents_start:offset]))
+
+            _blank(text, block_start, offset + len(line))
+            fence = None
+
+        offset += len(line)
+
+    # unclosed code blocks extend to the end of the document.
+    if fence is not None:
+        _blank(text, block_start, len(markdown))
+
+    for inline_code_match in _INLINE_CODE_REGEX.finditer("".join(text)):
+        _blank(text, inline_code_match.start(), inline_code_match.end())
+
+    return "".join(text), lmat_blocks
+
+
+def _find_unescaped(text: str, token: str, start: int) -> int:
+    i = start
+
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+        elif text.startswith(token, i):
+            return i
+        else:
+            i += 1
+
+    return -1
+
+
+# Find every math block in the given text, as (offset, contents, is_multiline) tuples.
+def _find_math_blocks(text: str) -> Iterator[tuple[int, str, bool]]:
+    i = 0
+
+    while (start := _find_unescaped(text, "$", i)) != -1:
+        delimiter = "$$" if text.startswith("$$", start) else "$"
+        end = _find_unescaped(text, delimiter, start + len(delimiter))
+
+        if end == -1:
+            return
+
+        yield start, text[start + len(delimiter) : end], delimiter == "$$"
+
+        i = end + len(delimiter)
+
+
+def _environment_from_lmat_block(lmat_block: str) -> LmatEnvironment:
+    parsed_lmat_block = tomllib.loads(lmat_block)
+
+    return LmatEnvironment(
+        symbols=parsed_lmat_block.get("symbols", {}),
+        unit_system=parsed_lmat_block.get("units", {}).get("system"),
+        solve_domain=parsed_lmat_block.get("solve", {}).get("domain"),
+    )
+
+
+def extract_equations(markdown: str) -> list[MarkdownEquation]:
+    """
+    Extract every equation in the given markdown document, in the same way the plugin would,
+    if the cursor was placed in the equation.
+
+    Equations are the contents of $...$ and $$...$$ blocks outside of code,
+    which are evaluated in the environment of the closest lmat code block before them,
+    along with the definitions ($name := value$ blocks) between that block and the equation.
+    Definitions are not equations themselves.
+
+    Raises:
+        tomllib.TOMLDecodeError: an lmat block is not valid toml.
+    """
+    text, lmat_blocks = _split_code(markdown)
+
+    events = [(offset, lmat_block, None) for offset, lmat_block in lmat_blocks] + [
+        (offset, contents, is_multiline)
+        for offset, contents, is_multiline in _find_math_blocks(text)
+    ]
+    events.sort(key=lambda event: event[0])
+
+    environment = LmatEnvironment()
+    equations = []
+
+    for offset, contents, is_multiline in events:
+        if is_multiline is None:
+            environment = _environment_from_lmat_block(contents)
+            continue
+
+        if ":=" in contents:
+            name_expr, value_expr = contents.split(":=", 1)
+
+            if name_expr.strip() != "":
+                environment = environment.model_copy(
+                    update=dict(
+                        definitions=[
+                            *environment.definitions,
+                            EnvDefinition(
+                                name_expr=name_expr.strip(),
+                                value_expr=value_expr.strip(),
+                            ),
+                        ]
+                    )
+                )
+
+            continue
+
+        expression = contents.strip()
+
+        if (
+            flicker_braces_match := _FLICKER_BRACES_REGEX.match(expression)
+        ) is not None:
+            expression = flicker_braces_match["contents"]
+
+        if expression == "":
+            continue
+
+        equations.append(
+            MarkdownEquation(
+                line=markdown.count("\n", 0, offset) + 1,
+                expression=expression,
+                is_multiline=is_multiline,
+                environment=environment,
+            )
+        )
+
+    return equations
@@ -12,6 +12,11 @@ from . import UnitDefinitions
 # Maps an alias to its corresponding Quantity object.
 UNIT_ALIAS_MAP = {}
 
+# copies of the Quantity objects of aliases, which are printed as the alias, by alias.
+# aliases are only ever copied once, otherwise every unit in every request would create a new Quantity,
+# which sympy caches keep alive indefinitely.
+__unit_alias_copies = {}
+
 __defined_units_quantities = {
     unit_name: getattr(UnitDefinitions, unit_name)
     for unit_name in dir(UnitDefinitions)
@@ -144,10 +149,14 @@ def str_to_unit(unit_str: str) -> Quantity | None:
     # attempt to replace the symbol with a corresponding unit.
     if unit_str not in UNIT_ALIAS_MAP:
         return None
-    else:
+
+    if unit_str not in __unit_alias_copies:
         unit = copy(UNIT_ALIAS_MAP[unit_str])
         unit._latex_repr = unit_str
-        return unit
+        # setdefault, so concurrent commands copying the same alias end up with the same copy.
+        __unit_alias_copies.setdefault(unit_str, unit)
+
+    return __unit_alias_copies[unit_str]
 
 
 #
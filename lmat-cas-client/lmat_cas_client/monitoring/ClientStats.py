@@ -0,0 +1,122 @@
+import bisect
+import time
+from collections import defaultdict
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies in exponentially growing buckets,
+    so recording a latency is cheap and uses constant memory, no matter how many latencies are recorded.
+    Percentiles are estimated as the upper bound of the bucket they fall in, which is at most 25% above the actual value.
+    """
+
+    # upper bounds of the buckets in seconds, from 0.1ms up to roughly 20 minutes.
+    BUCKET_BOUNDS: list[float] = [0.0001 * 1.25**i for i in range(74)]
+
+    def __init__(self):
+        # the last bucket counts latencies above every bound.
+        self.bucket_counts = [0] * (len(self.BUCKET_BOUNDS) + 1)
+        self.count = 0
+
+    def record(self, latency: float):
+        self.bucket_counts[bisect.bisect_left(self.BUCKET_BOUNDS, latency)] += 1
+        self.count += 1
+
+    def percentile(self, percentile: float) -> float | None:
+        """
+        Estimate the given percentile (0 - 100) of the recorded latencies in seconds, None if nothing has been recorded.
+        """
+        if self.count == 0:
+            return None
+
+        target_count = percentile / 100 * self.count
+        accumulated_count = 0
+
+        for i, bucket_count in enumerate(self.bucket_counts):
+            accumulated_count += bucket_count
+
+            if accumulated_count >= target_count and bucket_count > 0:
+                return self.BUCKET_BOUNDS[min(i, len(self.BUCKET_BOUNDS) - 1)]
+
+        return self.BUCKET_BOUNDS[-1]
+
+
+class CommandStats:
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.errors = 0
+        self.interrupts = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self) -> dict:
+        return dict(
+            requests=self.requests,
+            successes=self.successes,
+            errors=self.errors,
+            interrupts=self.interrupts,
+            latency_ms={f"p{p}": self._percentile_ms(p) for p in (50, 95, 99)},
+        )
+
+    def _percentile_ms(self, percentile: float) -> float | None:
+        latency = self.latency.percentile(percentile)
+        return None if latency is None else round(latency * 1000, 3)
+
+
+class ClientStats:
+    """
+    Counters and latency histograms of the commands handled by an LmatCasClient, per command type.
+    A command is counted when it is started, and its latency is recorded once it is responded to,
+    with the status of its response.
+
+    The stats are not thread safe, and should only be updated from the client message loop.
+    """
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.commands: defaultdict[str, CommandStats] = defaultdict(CommandStats)
+        # command type and start time of commands not yet responded to, by the uid of their start message.
+        self._in_flight: dict[str, tuple[str, float]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def command_started(self, uid: str, command_type: str):
+        self.commands[command_type].requests += 1
+        self._in_flight[uid] = (command_type, time.monotonic())
+
+    def command_responded(self, uid: str, status: str):
+        """
+        Record the response to the start message with the given uid, responses to other messages are ignored.
+        """
+        in_flight = self._in_flight.pop(uid, None)
+
+        if in_flight is None:
+            return
+
+        command_type, start_time = in_flight
+        command_stats = self.commands[command_type]
+
+        command_stats.latency.record(time.monotonic() - start_time)
+
+        match status:
+            case "success":
+                command_stats.successes += 1
+            case "error":
+                command_stats.errors += 1
+            case "interrupted":
+                command_stats.interrupts += 1
+
+    def to_dict(self) -> dict:
+        return dict(
+            uptime_s=round(time.monotonic() - self.start_time, 3),
+            in_flight=self.in_flight,
+            requests=sum(c.requests for c in self.commands.values()),
+            errors=sum(c.errors for c in self.commands.values()),
+            interrupts=sum(c.interrupts for c in self.commands.values()),
+            commands={
+                command_type: command_stats.to_dict()
+                for command_type, command_stats in self.commands.items()
+            },
+        )
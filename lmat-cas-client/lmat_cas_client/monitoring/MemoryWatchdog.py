@@ -0,0 +1,118 @@
+from enum import Enum
+
+from .ProcessMemory import process_rss_bytes
+
+
+class WatchdogAction(Enum):
+    NONE = "none"
+    # free memory held by caches, without losing any state.
+    CLEAR_CACHES = "clear-caches"
+    # replace the worker with a fresh one.
+    RECYCLE = "recycle"
+
+
+def clear_caches():
+    """
+    Clear the global caches of sympy, the cached definition stores and parse trees,
+    these only ever grow, and are responsible for most of the memory growth of a long running worker.
+    """
+    # imported here, so the watchdog can be imported without importing sympy and the compiler.
+    from sympy.core.cache import clear_cache
+
+    from lmat_cas_client.compiling.parsing.LatexParser import latex_parser
+    from lmat_cas_client.LmatEnvironment import LmatEnvironment
+
+    clear_cache()
+    LmatEnvironment.clear_definition_store_cache()
+    latex_parser.clear_cache()
+
+
+class MemoryWatchdog:
+    """
+    Decides what a worker should do about its memory usage, after it has handled a command.
+
+    Once the resident set size of the worker exceeds the soft limit, its caches should be cleared.
+    Once it exceeds the hard limit, or it has handled max_requests commands, it should be recycled.
+    Limits which are None are never exceeded.
+
+    Workers which cannot be recycled, e.g. threads of the client process, clear their caches instead.
+    The watchdog only holds its configuration, so it can be shared with worker processes.
+
+    Memory freed by clearing caches is rarely returned to the operating system,
+    so the resident set size often stays above the limit after a clear. Caches are therefore only cleared again,
+    once the resident set size has grown by clear_margin_bytes since the last clear,
+    instead of after every command, which would effectively disable the caches.
+    """
+
+    def __init__(
+        self,
+        soft_limit_bytes: int | None = None,
+        hard_limit_bytes: int | None = None,
+        max_requests: int | None = None,
+        clear_margin_bytes: int | None = None,
+    ):
+        """
+        Args:
+            clear_margin_bytes (int | None, optional): growth of the resident set size since the last clear,
+                before caches are cleared again. Defaults to a quarter of the lowest limit.
+        """
+        self.soft_limit_bytes = soft_limit_bytes
+        self.hard_limit_bytes = hard_limit_bytes
+        self.max_requests = max_requests
+
+        if clear_margin_bytes is None:
+            clear_margin_bytes = (soft_limit_bytes or hard_limit_bytes or 0) // 4
+
+        self.clear_margin_bytes = clear_margin_bytes
+
+    def check(
+        self,
+        rss_bytes: int | None,
+        request_count: int,
+        cleared_rss_bytes: int | None = None,
+        recyclable: bool = True,
+    ) -> WatchdogAction:
+        """
+        Check the memory usage of a worker with the given resident set size, which has handled request_count commands.
+        cleared_rss_bytes is the resident set size of the worker right after its caches were last cleared, None if they never were.
+        Workers which are not recyclable clear their caches once they exceed the hard limit instead.
+        """
+        if self.max_requests is not None and request_count >= self.max_requests:
+            return WatchdogAction.RECYCLE
+
+        if rss_bytes is None:
+            return WatchdogAction.NONE
+
+        if (
+            recyclable
+            and self.hard_limit_bytes is not None
+            and rss_bytes >= self.hard_limit_bytes
+        ):
+            return WatchdogAction.RECYCLE
+
+        if not any(
+            limit is not None and rss_bytes >= limit
+            for limit in (self.soft_limit_bytes, self.hard_limit_bytes)
+        ):
+            return WatchdogAction.NONE
+
+        if (
+            cleared_rss_bytes is not None
+            and rss_bytes < cleared_rss_bytes + self.clear_margin_bytes
+        ):
+            return WatchdogAction.NONE
+
+        return WatchdogAction.CLEAR_CACHES
+
+    def check_process(
+        self,
+        request_count: int,
+        cleared_rss_bytes: int | None = None,
+        recyclable: bool = True,
+    ) -> WatchdogAction:
+        """
+        Check the memory usage of the current process, which has handled request_count commands.
+        """
+        return self.check(
+            process_rss_bytes(), request_count, cleared_rss_bytes, recyclable
+        )
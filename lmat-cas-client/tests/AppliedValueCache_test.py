@@ -0,0 +1,33 @@
+from lmat_cas_client.compiling.AppliedValueCache import AppliedValueCache
+from sympy import Integer
+
+
+class TestAppliedValueCache:
+    def test_lru_eviction(self):
+        cache = AppliedValueCache(max_entries=2)
+
+        cache.put((0, (Integer(1),)), Integer(1))
+        cache.put((0, (Integer(2),)), Integer(4))
+
+        assert cache.get((0, (Integer(1),))) == 1
+
+        cache.put((0, (Integer(3),)), Integer(9))
+
+        assert cache.get((0, (Integer(2),))) is None
+        assert cache.get((0, (Integer(1),))) == 1
+        assert cache.get((0, (Integer(3),))) == 9
+        assert len(cache) == 2
+        assert cache.evictions == 1
+
+    def test_hit_ratio(self):
+        cache = AppliedValueCache()
+
+        assert cache.hit_ratio() == 0.0
+
+        cache.put((0, ()), Integer(1))
+        cache.get((0, ()))
+        cache.get((1, ()))
+
+        assert cache.hits == 1
+        assert cache.misses == 1
+        assert cache.hit_ratio() == 0.5
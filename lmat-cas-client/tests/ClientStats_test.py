@@ -0,0 +1,25 @@
+from lmat_cas_client.monitoring.ClientStats import LatencyHistogram
+
+
+class TestLatencyHistogram:
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+
+        assert histogram.percentile(50) is None
+
+        for i in range(1, 101):
+            histogram.record(i / 1000)
+
+        # percentiles are estimated within a bucket width of the actual value.
+        assert 0.050 <= histogram.percentile(50) <= 0.050 * 1.25
+        assert 0.095 <= histogram.percentile(95) <= 0.095 * 1.25
+        assert 0.099 <= histogram.percentile(99) <= 0.099 * 1.25
+
+    def test_out_of_range(self):
+        histogram = LatencyHistogram()
+
+        histogram.record(0)
+        histogram.record(10**6)
+
+        assert histogram.percentile(0) == LatencyHistogram.BUCKET_BOUNDS[0]
+        assert histogram.percentile(100) == LatencyHistogram.BUCKET_BOUNDS[-1]
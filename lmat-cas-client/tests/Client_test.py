@@ -0,0 +1,641 @@
+import asyncio
+import time
+
+from lmat_cas_client.caching.ResultCache import ResultCache
+from lmat_cas_client.Client import LmatCasClient
+from lmat_cas_client.command_handlers.CommandHandler import (
+    CommandHandler,
+    CommandResult,
+    report_fallback_result,
+    report_partial_result,
+)
+from lmat_cas_client.command_handlers.EvalHandler import EvalHandler
+from lmat_cas_client.command_handlers.StatsHandler import StatsHandler
+from lmat_cas_client.command_handlers.test_handlers.TestHangHandler import (
+    TestHangHandler,
+)
+from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
+from lmat_cas_client.LmatEnvironment import LmatEnvironment
+from lmat_cas_client.MessageEncoding import (
+    JsonEncoding,
+    MessageEncoding,
+    MsgpackEncoding,
+    decode_frame,
+)
+
+
+class SleepResult(CommandResult):
+    def __init__(self, execution: int):
+        self.execution = execution
+
+    def getResponsePayload(self):
+        return CommandResult.result(dict(execution=self.execution))
+
+
+# Sleeps for the given duration, and responds with how many times it has been executed.
+class SleepHandler(CommandHandler):
+    def __init__(self):
+        self.executions = 0
+
+    def handle(self, message: dict) -> SleepResult:
+        self.executions += 1
+        time.sleep(message["duration"])
+        return SleepResult(self.executions)
+
+
+# Reports a fallback result, and then sleeps for the given duration.
+class FallbackHandler(CommandHandler):
+    def handle(self, message: dict) -> SleepResult:
+        report_fallback_result(SleepResult(0))
+        time.sleep(message["duration"])
+        return SleepResult(1)
+
+
+# Reports a partial result for each of the given values, and then responds with all of them.
+class StreamHandler(CommandHandler):
+    class ValuesResult(CommandResult):
+        def __init__(self, values: list[int]):
+            self.values = values
+
+        def getResponsePayload(self):
+            return CommandResult.result(dict(values=self.values))
+
+    def handle(self, message: dict) -> ValuesResult:
+        for value in message["values"]:
+            report_partial_result(self.ValuesResult([value]))
+
+        return self.ValuesResult(message["values"])
+
+
+# Stands in for the websocket connection to the plugin.
+class FakeConnection:
+    def __init__(self):
+        self.received: asyncio.Queue[str | bytes] = asyncio.Queue()
+        self.responses: list[dict] = []
+        self._response_events: dict[str, asyncio.Event] = {}
+        self.frames: list[str | bytes] = []
+
+    async def recv(self) -> str | bytes:
+        return await self.received.get()
+
+    async def send(self, frame: str | bytes):
+        response = decode_frame(frame)
+        self.frames.append(frame)
+        self.responses.append(response)
+
+        if response["status"] != LmatCasClient.PARTIAL_STATUS:
+            self._response_event(response["uid"]).set()
+
+    def send_message(
+        self,
+        uid: str,
+        type: str,
+        payload: dict,
+        encoding: MessageEncoding = JsonEncoding(),
+    ):
+        self.received.put_nowait(
+            encoding.encode(dict(uid=uid, type=type, payload=payload))
+        )
+
+    async def wait_for_response(self, uid: str) -> dict:
+        await asyncio.wait_for(self._response_event(uid).wait(), timeout=30)
+        return next(
+            r
+            for r in self.responses
+            if r["uid"] == uid and r["status"] != LmatCasClient.PARTIAL_STATUS
+        )
+
+    def _response_event(self, uid: str) -> asyncio.Event:
+        return self._response_events.setdefault(uid, asyncio.Event())
+
+
+def create_client(**client_kwargs) -> tuple[LmatCasClient, FakeConnection]:
+    client = LmatCasClient(**client_kwargs)
+    client.connection = FakeConnection()
+
+    client.register_handler("eval", EvalHandler(LatexToSympyCompiler()))
+    client.register_handler("test-hang", TestHangHandler(), cacheable=False)
+    client.register_handler("sleep", SleepHandler())
+    client.register_handler("fallback", FallbackHandler())
+    client.register_handler("stream", StreamHandler())
+
+    return client, client.connection
+
+
+# run the client message loop while the given coroutine function interacts with the connection.
+def run_client(client: LmatCasClient, interaction):
+    async def run():
+        message_loop = asyncio.create_task(client.run_message_loop())
+
+        try:
+            await interaction()
+        finally:
+            client.connection.send_message("exit", "exit", {})
+            await asyncio.wait_for(message_loop, timeout=30)
+
+    asyncio.run(run())
+
+
+def sleep_payload(duration: float, **payload) -> dict:
+    return dict(command_type="sleep", start_args=dict(duration=duration), **payload)
+
+
+def eval_payload(expression: str) -> dict:
+    return dict(
+        command_type="eval",
+        start_args=dict(expression=expression, environment={}),
+    )
+
+
+class TestClient:
+    def test_burst(self):
+        client, connection = create_client()
+        responses = []
+
+        # the commands themselves are trivial, so only the handling of the burst of messages is tested,
+        # and not how fast 20 concurrent evaluations finish on a loaded machine.
+        async def interaction():
+            for i in range(20):
+                connection.send_message(
+                    str(i),
+                    "start",
+                    dict(command_type="stream", start_args=dict(values=[i])),
+                )
+
+            for i in range(20):
+                responses.append(await connection.wait_for_response(str(i)))
+
+        run_client(client, interaction)
+
+        for i, response in enumerate(responses):
+            assert response["status"] == LmatCasClient.SUCCESS_STATUS
+            assert response["payload"]["value"]["values"] == [i]
+
+        assert connection.responses[-1]["payload"]["type"] == "exit"
+
+    def test_interrupt(self):
+        client, connection = create_client()
+
+        async def interaction():
+            connection.send_message(
+                "hang",
+                "start",
+                dict(command_type="test-hang", start_args=dict(hang_time=60)),
+            )
+            connection.send_message(
+                "interrupt", "interrupt", dict(target_uids=["hang"])
+            )
+
+            await connection.wait_for_response("interrupt")
+
+        run_client(client, interaction)
+
+        statuses = [(r["uid"], r["status"]) for r in connection.responses]
+
+        assert statuses[:2] == [
+            ("hang", LmatCasClient.INTERRUPT_STATUS),
+            ("interrupt", LmatCasClient.SUCCESS_STATUS),
+        ]
+
+    def test_unsupported_command(self):
+        client, connection = create_client()
+
+        async def interaction():
+            connection.send_message(
+                "a", "start", dict(command_type="not-a-command", start_args={})
+            )
+            await connection.wait_for_response("a")
+
+        run_client(client, interaction)
+
+        assert connection.responses[0]["status"] == LmatCasClient.ERR_STATUS
+
+    def test_result_cache(self):
+        result_cache = ResultCache()
+        client, connection = create_client(result_cache=result_cache)
+
+        async def interaction():
+            connection.send_message("a", "start", eval_payload("x + x"))
+            await connection.wait_for_response("a")
+
+            connection.send_message("b", "start", eval_payload("x + x "))
+            await connection.wait_for_response("b")
+
+        run_client(client, interaction)
+
+        assert connection.responses[0]["payload"] == connection.responses[1]["payload"]
+        assert result_cache.hits == 1
+        assert result_cache.misses == 1
+
+    def test_coalescing(self):
+        client, connection = create_client()
+
+        async def interaction():
+            for uid in ("a", "b", "c"):
+                connection.send_message(uid, "start", sleep_payload(0.5))
+
+            for uid in ("a", "b", "c"):
+                await connection.wait_for_response(uid)
+
+        run_client(client, interaction)
+
+        assert client.command_handlers["sleep"].executions == 1
+        assert all(
+            r["payload"]["value"] == dict(execution=1) for r in connection.responses[:3]
+        )
+
+    def test_coalesced_interrupt(self):
+        client, connection = create_client()
+
+        async def interaction():
+            connection.send_message("a", "start", sleep_payload(0.5))
+            connection.send_message("b", "start", sleep_payload(0.5))
+            connection.send_message("interrupt", "interrupt", dict(target_uids=["a"]))
+
+            await connection.wait_for_response("b")
+
+            # once every subscriber has been interrupted, the job is gone.
+            connection.send_message("c", "start", sleep_payload(0.5))
+            connection.send_message("interrupt-c", "interrupt", dict(target_uids=["c"]))
+
+            await connection.wait_for_response("interrupt-c")
+
+        run_client(client, interaction)
+
+        statuses = {r["uid"]: r["status"] for r in connection.responses}
+
+        assert statuses["a"] == LmatCasClient.INTERRUPT_STATUS
+        assert statuses["b"] == LmatCasClient.SUCCESS_STATUS
+        assert statuses["c"] == LmatCasClient.INTERRUPT_STATUS
+        assert client.command_jobs == {}
+        assert client.coalesced_jobs == {}
+
+    def test_slot_supersede(self):
+        client, connection = create_client()
+
+        async def interaction():
+            connection.send_message("a", "start", sleep_payload(0.5, slot="x"))
+            connection.send_message("b", "start", sleep_payload(0.6, slot="x"))
+            connection.send_message("c", "start", sleep_payload(0.7, slot="x"))
+            connection.send_message("d", "start", sleep_payload(0.5, slot="y"))
+
+            await connection.wait_for_response("c")
+            await connection.wait_for_response("d")
+
+        run_client(client, interaction)
+
+        statuses = {r["uid"]: r["status"] for r in connection.responses}
+
+        assert statuses["a"] == LmatCasClient.INTERRUPT_STATUS
+        assert statuses["b"] == LmatCasClient.INTERRUPT_STATUS
+        assert statuses["c"] == LmatCasClient.SUCCESS_STATUS
+        assert statuses["d"] == LmatCasClient.SUCCESS_STATUS
+        assert client.slot_uids == {}
+        assert client.uid_slots == {}
+
+    def test_deadline(self):
+        result_cache = ResultCache()
+        client, connection = create_client(result_cache=result_cache)
+
+        async def interaction():
+            connection.send_message(
+                "fallback",
+                "start",
+                dict(
+                    command_type="fallback",
+                    start_args=dict(duration=5, deadline_ms=200),
+                ),
+            )
+            connection.send_message(
+                "sleep",
+                "start",
+                dict(
+                    command_type="sleep", start_args=dict(duration=5, deadline_ms=200)
+                ),
+            )
+            connection.send_message(
+                "in-time",
+                "start",
+                dict(
+                    command_type="fallback",
+                    start_args=dict(duration=0, deadline_ms=5000),
+                ),
+            )
+
+            for uid in ("fallback", "sleep", "in-time"):
+                await connection.wait_for_response(uid)
+
+        run_client(client, interaction)
+
+        responses = {r["uid"]: r for r in connection.responses}
+
+        assert responses["fallback"]["status"] == LmatCasClient.SUCCESS_STATUS
+        assert responses["fallback"]["payload"]["value"] == dict(execution=0)
+        assert responses["sleep"]["status"] == LmatCasClient.ERR_STATUS
+        assert responses["in-time"]["payload"]["value"] == dict(execution=1)
+        # only the complete result is cached.
+        assert len(result_cache) == 1
+
+    def test_deadline_coalescing(self):
+        client, connection = create_client()
+
+        async def interaction():
+            connection.send_message(
+                "deadline",
+                "start",
+                dict(
+                    command_type="fallback",
+                    start_args=dict(duration=0.5, deadline_ms=100),
+                ),
+            )
+            connection.send_message(
+                "no-deadline",
+                "start",
+                dict(command_type="fallback", start_args=dict(duration=0.5)),
+            )
+
+            for uid in ("deadline", "no-deadline"):
+                await connection.wait_for_response(uid)
+
+        run_client(client, interaction)
+
+        responses = {r["uid"]: r for r in connection.responses}
+
+        # the start message without a deadline is not subscribed to the job with one, so it gets the complete result.
+        assert responses["deadline"]["payload"]["value"] == dict(execution=0)
+        assert responses["no-deadline"]["payload"]["value"] == dict(execution=1)
+        assert client.coalesced_jobs == {}
+
+    def test_protocol_negotiation(self):
+        client, connection = create_client()
+
+        async def interaction():
+            connection.send_message(
+                "protocol", "protocol", dict(encodings=["unknown", "msgpack", "json"])
+            )
+            await connection.wait_for_response("protocol")
+
+            connection.send_message(
+                "a", "start", eval_payload("1 + 1"), encoding=MsgpackEncoding()
+            )
+            connection.send_message("b", "start", eval_payload("2 + 2"))
+
+            await connection.wait_for_response("a")
+            await connection.wait_for_response("b")
+
+        run_client(client, interaction)
+
+        responses = {r["uid"]: r for r in connection.responses}
+
+        assert responses["protocol"]["payload"]["value"] == dict(encoding="msgpack")
+        # only responses after the protocol response use the negotiated encoding.
+        assert isinstance(connection.frames[0], str)
+        assert all(isinstance(frame, bytes) for frame in connection.frames[1:])
+        assert responses["a"]["payload"]["value"]["evaluated_expression"] == "2"
+        assert responses["b"]["payload"]["value"]["evaluated_expression"] == "4"
+
+    def test_batch(self):
+        client, connection = create_client()
+        environment = dict(definitions=[dict(name_expr="a", value_expr="2")])
+
+        async def interaction():
+            connection.send_message(
+                "batch",
+                "start-batch",
+                dict(
+                    environment=environment,
+                    items=[
+                        dict(
+                            uid=str(i),
+                            command_type="eval",
+                            start_args=dict(expression=f"a \\cdot {i}"),
+                        )
+                        for i in range(5)
+                    ],
+                ),
+            )
+
+            for i in range(5):
+                await connection.wait_for_response(str(i))
+
+        run_client(client, interaction)
+
+        responses = {r["uid"]: r for r in connection.responses}
+
+        assert responses["batch"]["status"] == LmatCasClient.SUCCESS_STATUS
+
+        for i in range(5):
+            assert responses[str(i)]["payload"]["value"]["evaluated_expression"] == str(
+                2 * i
+            )
+
+        # every item was evaluated with the same definition store.
+        assert LmatEnvironment.create_definition_store(
+            environment
+        ) is LmatEnvironment.create_definition_store(dict(environment))
+
+    def test_batch_malformed_items(self):
+        client, connection = create_client()
+
+        async def interaction():
+            connection.send_message(
+                "batch",
+                "start-batch",
+                dict(
+                    environment=dict(),
+                    items=[
+                        dict(uid="a", command_type="eval"),
+                        dict(command_type="eval", start_args=dict(expression="1")),
+                        dict(
+                            uid="b",
+                            command_type="eval",
+                            start_args=dict(expression="2 + 2"),
+                        ),
+                    ],
+                ),
+            )
+
+            await connection.wait_for_response("batch")
+            await connection.wait_for_response("a")
+            await connection.wait_for_response("b")
+
+        run_client(client, interaction)
+
+        responses = {r["uid"]: r for r in connection.responses}
+
+        # the malformed items are reported in the batch response, while the valid item is still started.
+        assert responses["batch"]["status"] == LmatCasClient.ERR_STATUS
+        assert "2 of 3" in responses["batch"]["payload"]["dev_message"]
+        assert responses["a"]["status"] == LmatCasClient.ERR_STATUS
+        assert "start_args" in responses["a"]["payload"]["dev_message"]
+        assert responses["b"]["payload"]["value"]["evaluated_expression"] == "4"
+        assert client.pending_message_responses == set()
+
+    def test_batch_without_environment(self):
+        client, connection = create_client()
+
+        async def interaction():
+            connection.send_message(
+                "batch",
+                "start-batch",
+                dict(
+                    items=[
+                        dict(
+                            uid="a",
+                            command_type="eval",
+                            start_args=dict(expression="1"),
+                        )
+                    ]
+                ),
+            )
+
+            await connection.wait_for_response("batch")
+            await connection.wait_for_response("a")
+
+        run_client(client, interaction)
+
+        responses = {r["uid"]: r for r in connection.responses}
+
+        assert responses["batch"]["status"] == LmatCasClient.ERR_STATUS
+        assert responses["a"]["status"] == LmatCasClient.ERR_STATUS
+
+    def test_environment_sessions(self):
+        client, connection = create_client()
+
+        def eval_in_session(expression: str) -> dict:
+            return dict(
+                command_type="eval",
+                start_args=dict(expression=expression, environment_id="note"),
+            )
+
+        async def interaction():
+            connection.send_message(
+                "open",
+                "env-open",
+                dict(
+                    environment_id="note",
+                    environment=dict(
+                        definitions=[
+                            dict(name_expr="a", value_expr="2"),
+                            dict(name_expr="b", value_expr="3"),
+                        ]
+                    ),
+                ),
+            )
+            connection.send_message("a", "start", eval_in_session("a + b"))
+            await connection.wait_for_response("a")
+
+            connection.send_message(
+                "update",
+                "env-update",
+                dict(
+                    environment_id="note",
+                    definitions=[dict(name_expr="a", value_expr="5")],
+                ),
+            )
+            connection.send_message("b", "start", eval_in_session("a + b"))
+            await connection.wait_for_response("b")
+
+            connection.send_message("close", "env-close", dict(environment_id="note"))
+            connection.send_message("c", "start", eval_in_session("a + b"))
+            connection.send_message(
+                "update-closed", "env-update", dict(environment_id="note")
+            )
+            await connection.wait_for_response("update-closed")
+
+        run_client(client, interaction)
+
+        responses = {r["uid"]: r for r in connection.responses}
+
+        for uid in ("open", "update", "close"):
+            assert responses[uid]["status"] == LmatCasClient.SUCCESS_STATUS
+
+        assert responses["a"]["payload"]["value"]["evaluated_expression"] == "5"
+        assert responses["b"]["payload"]["value"]["evaluated_expression"] == "8"
+        assert responses["c"]["status"] == LmatCasClient.ERR_STATUS
+        assert responses["update-closed"]["status"] == LmatCasClient.ERR_STATUS
+
+    def test_streaming(self):
+        client, connection = create_client()
+        stream_payload = dict(command_type="stream", start_args=dict(values=[1, 2, 3]))
+
+        async def interaction():
+            connection.send_message("a", "start", dict(stream_payload, stream=True))
+            await connection.wait_for_response("a")
+
+            connection.send_message(
+                "b", "start", dict(stream_payload, start_args=dict(values=[4]))
+            )
+            await connection.wait_for_response("b")
+
+        run_client(client, interaction)
+
+        assert [
+            (r["uid"], r["status"], r["payload"]["value"])
+            for r in connection.responses[:-1]
+        ] == [
+            ("a", LmatCasClient.PARTIAL_STATUS, dict(values=[1])),
+            ("a", LmatCasClient.PARTIAL_STATUS, dict(values=[2])),
+            ("a", LmatCasClient.PARTIAL_STATUS, dict(values=[3])),
+            ("a", LmatCasClient.SUCCESS_STATUS, dict(values=[1, 2, 3])),
+            ("b", LmatCasClient.SUCCESS_STATUS, dict(values=[4])),
+        ]
+
+    def test_stats(self):
+        client, connection = create_client(result_cache=ResultCache())
+        client.register_handler("stats", StatsHandler(client), local=True)
+
+        async def interaction():
+            connection.send_message("a", "start", eval_payload("1 + 1"))
+            connection.send_message("b", "start", eval_payload("1 +"))
+            await connection.wait_for_response("a")
+            await connection.wait_for_response("b")
+
+            connection.send_message("c", "start", eval_payload("1 + 1"))
+            connection.send_message(
+                "hang",
+                "start",
+                dict(command_type="test-hang", start_args=dict(hang_time=60)),
+            )
+            connection.send_message(
+                "interrupt", "interrupt", dict(target_uids=["hang"])
+            )
+            connection.send_message(
+                "stats", "start", dict(command_type="stats", start_args={})
+            )
+            await connection.wait_for_response("stats")
+
+        run_client(client, interaction)
+
+        stats = next(r for r in connection.responses if r["uid"] == "stats")["payload"][
+            "value"
+        ]
+
+        assert stats["commands"]["eval"]["requests"] == 3
+        assert stats["commands"]["eval"]["successes"] == 2
+        assert stats["commands"]["eval"]["errors"] == 1
+        assert stats["commands"]["eval"]["latency_ms"]["p50"] is not None
+        assert stats["commands"]["test-hang"]["interrupts"] == 1
+        # only the stats command itself has not been responded to.
+        assert stats["in_flight"] == 1
+        assert stats["result_cache"]["hits"] == 1
+        assert stats["rss_bytes"] > 0
+        assert stats["memory"]["workers"][0]["rss_bytes"] > 0
+
+    def test_ready(self):
+        client, connection = create_client(warm_up=True)
+
+        async def interaction():
+            connection.send_message("ready", "ready", {})
+            # commands are accepted while warming up.
+            connection.send_message("a", "start", eval_payload("1 + 1"))
+            await connection.wait_for_response("a")
+            await connection.wait_for_response("ready")
+
+        run_client(client, interaction)
+
+        response = next(r for r in connection.responses if r["uid"] == "ready")
+
+        assert response["status"] == "success"
+        assert response["payload"]["type"] == "ready"
+        assert "arithmetic" in response["payload"]["value"]["warm_up"]["commands_ms"]
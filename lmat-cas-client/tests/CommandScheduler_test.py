@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from lmat_cas_client.execution.CommandScheduler import CommandScheduler
+from lmat_cas_client.execution.ExecutionBackend import CommandError
+
+
+# schedule a command of the given type, and record when it started running in the given list.
+async def run_command(
+    scheduler: CommandScheduler,
+    command_type: str,
+    started: list[str],
+    release: asyncio.Event,
+):
+    async with scheduler.schedule(command_type):
+        started.append(command_type)
+        await release.wait()
+
+
+class TestCommandScheduler:
+    def test_priority(self):
+        async def run():
+            scheduler = CommandScheduler(max_running=1)
+            scheduler.configure("eval", priority=1)
+            scheduler.configure("solve", priority=0)
+
+            started = []
+            release = asyncio.Event()
+
+            tasks = [
+                asyncio.create_task(run_command(scheduler, t, started, release))
+                for t in ("solve", "solve", "eval", "solve", "eval")
+            ]
+
+            await asyncio.sleep(0)
+
+            assert started == ["solve"]
+            assert scheduler.pending_count == 4
+            assert scheduler.queue_depths() == dict(solve=2, eval=2)
+
+            release.set()
+            await asyncio.gather(*tasks)
+
+            return started
+
+        assert asyncio.run(run()) == ["solve", "eval", "eval", "solve", "solve"]
+
+    def test_concurrency_limit(self):
+        async def run():
+            scheduler = CommandScheduler()
+            scheduler.configure("solve", max_concurrency=1)
+
+            started = []
+            release = asyncio.Event()
+
+            tasks = [
+                asyncio.create_task(run_command(scheduler, t, started, release))
+                for t in ("solve", "solve", "eval", "eval")
+            ]
+
+            await asyncio.sleep(0)
+
+            # the eval commands are not held back by the pending solve command.
+            assert started == ["solve", "eval", "eval"]
+            assert scheduler.running_count == 3
+
+            release.set()
+            await asyncio.gather(*tasks)
+
+            assert scheduler.running_count == 0
+
+        asyncio.run(run())
+
+    def test_cancel_pending(self):
+        async def run():
+            scheduler = CommandScheduler(max_running=1)
+
+            started = []
+            release = asyncio.Event()
+
+            first = asyncio.create_task(run_command(scheduler, "a", started, release))
+            second = asyncio.create_task(run_command(scheduler, "b", started, release))
+            await asyncio.sleep(0)
+
+            second.cancel()
+            await asyncio.sleep(0)
+
+            assert scheduler.pending_count == 0
+
+            release.set()
+            await first
+
+            assert started == ["a"]
+            assert scheduler.running_count == 0
+
+        asyncio.run(run())
+
+    def test_bounded_queue(self):
+        async def run():
+            scheduler = CommandScheduler(max_running=1, max_pending=1)
+
+            release = asyncio.Event()
+
+            tasks = [
+                asyncio.create_task(run_command(scheduler, "a", [], release))
+                for _ in range(3)
+            ]
+
+            await asyncio.sleep(0)
+
+            with pytest.raises(CommandError):
+                await tasks[2]
+
+            release.set()
+            await asyncio.gather(*tasks[:2])
+
+        asyncio.run(run())
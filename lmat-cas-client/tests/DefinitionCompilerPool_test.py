@@ -0,0 +1,75 @@
+import pytest
+from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
+from lmat_cas_client.execution.DefinitionCompilerPool import (
+    DefinitionCompilerPool,
+    set_compiler_pool,
+)
+from lmat_cas_client.LmatEnvironment import LmatEnvironment
+
+
+@pytest.fixture(scope="module")
+def compiler_pool():
+    compiler_pool = DefinitionCompilerPool(2, min_definitions=8)
+    yield compiler_pool
+    compiler_pool.shutdown()
+
+
+def large_environment(definition_count: int, offset: int = 0) -> dict:
+    return dict(
+        definitions=[
+            dict(name_expr=f"a_{{{i}}}", value_expr=f"a_{{{i - 1}}} + {i + offset}")
+            for i in range(1, definition_count)
+        ]
+        + [dict(name_expr=r"f(x)", value_expr=rf"x^2 + {offset}")]
+    )
+
+
+class TestDefinitionCompilerPool:
+    def test_matches_serial_compilation(self, compiler_pool):
+        environment = large_environment(20)
+        compiler = LatexToSympyCompiler()
+
+        LmatEnvironment.clear_definition_store_cache()
+        serial_value = compiler.compile(
+            "f(a_{19})", LmatEnvironment.create_definition_store(environment)
+        )
+
+        LmatEnvironment.clear_definition_store_cache()
+        set_compiler_pool(compiler_pool)
+
+        try:
+            parallel_value = compiler.compile(
+                "f(a_{19})", LmatEnvironment.create_definition_store(environment)
+            )
+        finally:
+            set_compiler_pool(None)
+
+        assert parallel_value == serial_value
+
+    def test_invalid_definition(self, compiler_pool):
+        environment = large_environment(20, offset=1)
+        environment["definitions"].append(dict(name_expr="b", value_expr=r"\frac{"))
+
+        LmatEnvironment.clear_definition_store_cache()
+        set_compiler_pool(compiler_pool)
+
+        # the invalid definition is compiled again outside the pool, so its error is raised as usual.
+        try:
+            with pytest.raises(Exception):
+                LmatEnvironment.create_definition_store(environment)
+        finally:
+            set_compiler_pool(None)
+
+    def test_started_lazily(self):
+        compiler_pool = DefinitionCompilerPool(2, min_definitions=8)
+
+        LmatEnvironment.clear_definition_store_cache()
+        set_compiler_pool(compiler_pool)
+
+        try:
+            # small environments are compiled serially, so no worker processes are spawned for them.
+            LmatEnvironment.create_definition_store(large_environment(4, offset=2))
+            assert compiler_pool._executor is None
+        finally:
+            set_compiler_pool(None)
+            compiler_pool.shutdown()
@@ -0,0 +1,294 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import pytest
+from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
+from lmat_cas_client.compiling.Definitions import AstFunctionDefinition, SympyDefinition
+from lmat_cas_client.compiling.DefinitionStore import (
+    CyclicDependencyError,
+    DefinitionStore,
+)
+from lmat_cas_client.compiling.parsing.LatexParser import latex_parser
+from lmat_cas_client.compiling.transforming.DependenciesTransformer import (
+    dependencies_transformer_runner,
+)
+from lmat_cas_client.compiling.transforming.SympyTransformer import (
+    sympy_transformer_runner,
+)
+from lmat_cas_client.compiling.transforming.TransformerRunner import TransformerRunner
+from lmat_cas_client.LmatEnvironment import EnvDefinition, LmatEnvironment
+from lmat_cas_client.PhaseProfiler import PhaseProfile, profiling
+from sympy import Integer, Matrix, Symbol, nan
+
+
+def create_definition_store(definitions: list[tuple[str, str]]):
+    return LmatEnvironment.create_definition_store(
+        LmatEnvironment(
+            definitions=[
+                EnvDefinition(name_expr=name_expr, value_expr=value_expr)
+                for name_expr, value_expr in definitions
+            ]
+        )
+    )
+
+
+# Counts the number of trees transformed by the given transformer runner.
+class CountingTransformerRunner(TransformerRunner):
+    def __init__(self, transformer_runner: TransformerRunner):
+        self._transformer_runner = transformer_runner
+        self.transforms = 0
+
+    def transform(self, tree, *args, **kwargs):
+        self.transforms += 1
+        return self._transformer_runner.transform(tree, *args, **kwargs)
+
+
+class TestDefinitionStore:
+    compiler = LatexToSympyCompiler()
+
+    def test_definition_chain(self):
+        # every definition refers to the previous one twice,
+        # so this only finishes if defined values are computed once per definition.
+        definition_store = create_definition_store([
+            ("a_{0}", "1"),
+            *((f"a_{{{i}}}", f"a_{{{i - 1}}} + a_{{{i - 1}}}") for i in range(1, 21)),
+        ])
+
+        assert self.compiler.compile("a_{20}", definition_store) == 2**20
+
+    def test_memoized_values_invalidated(self):
+        definition_store = create_definition_store([("b", "1"), ("a", "b + b")])
+
+        assert self.compiler.compile("a", definition_store) == 2
+
+        definition_store = definition_store.clone()
+        definition_store.set_definition("b", SympyDefinition(Integer(5)))
+
+        assert self.compiler.compile("a", definition_store) == 10
+
+    def test_memoized_matrix_copied(self):
+        definition_store = create_definition_store([
+            ("A", r"\begin{bmatrix} 1 & 2 \end{bmatrix}")
+        ])
+        definition = definition_store.get_definition("A")
+
+        matrix = definition.defined_value(definition_store)
+        matrix[0, 0] = 3
+
+        assert definition.defined_value(definition_store) == Matrix([[1, 2]])
+
+    def test_resolved_dependencies_invalidated(self):
+        definition_store = create_definition_store([
+            ("a", "b + c"),
+            ("b", "c"),
+            ("c", "1"),
+            ("d", "2"),
+        ]).clone()
+
+        success, ordering = definition_store.resolve_dependencies(("a", "d"))
+
+        assert success
+        assert set(ordering) == {"a", "b", "c", "d"}
+        assert ordering.index("c") < ordering.index("b") < ordering.index("a")
+
+        # changing a definition a has not visited keeps its resolved dependencies.
+        definition_store.set_definition("d", SympyDefinition(Integer(3)))
+        assert "a" in definition_store._resolved_dependencies
+
+        definition_store.set_definition("c", SympyDefinition(Symbol("a")))
+        assert "a" not in definition_store._resolved_dependencies
+
+        with pytest.raises(CyclicDependencyError):
+            self.compiler.compile("a", definition_store)
+
+    def test_dependencies_transformed_once(self):
+        definition = create_definition_store([("a", "b + c")]).get_definition("a")
+
+        assert definition.dependencies() == {"b", "c"}
+        assert definition.dependencies() is definition.dependencies()
+
+    def test_override_layers(self):
+        definition_store = DefinitionStore({
+            "a": SympyDefinition(Integer(1)),
+            "b": SympyDefinition(Integer(2)),
+        })
+
+        overridden_store = definition_store.override({
+            "a": SympyDefinition(Integer(3)),
+            "b": None,
+            "c": SympyDefinition(Integer(4)),
+        })
+
+        assert overridden_store._parent is definition_store
+        assert self.compiler.compile("a + c", overridden_store) == 7
+        assert overridden_store.get_definition("b") is None
+        assert overridden_store.get_definition_names() == {"a", "c"}
+        # the overridden store is unaffected.
+        assert self.compiler.compile("a + b", definition_store) == 3
+
+    def test_override_layers_merged(self):
+        bottom_store = DefinitionStore({"a": SympyDefinition(Integer(0))})
+        definition_store = bottom_store
+
+        for i in range(1, 3 * DefinitionStore.MAX_LAYER_DEPTH):
+            definition_store = definition_store.override({
+                f"a_{{{i}}}": SympyDefinition(Integer(i))
+            })
+
+            assert definition_store._layer_depth <= DefinitionStore.MAX_LAYER_DEPTH
+
+        assert self.compiler.compile("a_{1} + a_{5} + a_{20}", definition_store) == 26
+        assert (
+            len(definition_store.get_definitions())
+            == 3 * DefinitionStore.MAX_LAYER_DEPTH
+        )
+        assert bottom_store.get_definition_names() == {"a"}
+
+    def test_function_body_transforms(self):
+        body_transformer = CountingTransformerRunner(sympy_transformer_runner)
+        definition_store = DefinitionStore({
+            "f": AstFunctionDefinition(
+                expr_transformer=body_transformer,
+                dependencies_transformer=dependencies_transformer_runner,
+                func_name="f",
+                ast_body=latex_parser.parse("x^2 + x"),
+                variables=["x"],
+            )
+        })
+
+        assert self.compiler.compile("f(1) + f(2) + f(1)", definition_store) == 10
+        # the body is transformed with each distinct number, repeated applications are memoized.
+        assert body_transformer.transforms == 2
+
+        y, z, t = Symbol("y"), Symbol("z"), Symbol("t")
+        assert (
+            self.compiler.compile("f(y) + f(z) + f(t)", definition_store)
+            == y**2 + y + z**2 + z + t**2 + t
+        )
+        # applications to symbols share a single body compiled with a placeholder.
+        assert body_transformer.transforms == 3
+
+        assert self.compiler.compile(
+            r"f(\begin{bmatrix} 1 & 0 \\ 0 & 1 \end{bmatrix})", definition_store
+        ) == Matrix([[2, 0], [0, 2]])
+
+    # bodies which evaluate differently for a symbol than for the arguments substituted into it afterwards.
+    @pytest.mark.parametrize(
+        "body,application,expected_value",
+        [
+            (r"\gcd(x, 6)", "f(3)", Integer(3)),
+            (r"\operatorname{lcm}(x, 8)", "f(12)", Integer(24)),
+            (r"\lim_{y \to x} \frac{\sin y}{y}", "f(0)", Integer(1)),
+            (r"\frac{x}{x}", "f(0)", nan),
+            (r"\gcd(x, 6)", "f(y)", Integer(1)),
+            (r"\frac{x}{x}", "f(y)", Integer(1)),
+        ],
+    )
+    def test_function_body_evaluated_with_arguments(
+        self, body, application, expected_value
+    ):
+        definition_store = create_definition_store([("f(x)", body)])
+
+        assert self.compiler.compile(application, definition_store) == expected_value
+
+    def test_function_body_binding_argument(self):
+        definition_store = create_definition_store([("f(x)", r"\frac{\dd}{\dd y} x y")])
+
+        # y is bound by the derivative in the body, so it is not simply substituted for x.
+        assert self.compiler.compile("f(y)", definition_store) == 2 * Symbol("y")
+        assert self.compiler.compile(
+            r"f(\frac{\dd}{\dd x} x^2)", definition_store
+        ) == 2 * Symbol("x")
+
+    def test_function_body_binding_argument_in_dependency(self):
+        definition_store = create_definition_store([
+            ("f(x)", r"\frac{\dd}{\dd y} x y"),
+            ("g(x)", "f(x)"),
+        ])
+
+        # y is bound in the body of f, which the body of g depends on.
+        assert self.compiler.compile("g(y)", definition_store) == 2 * Symbol("y")
+        assert self.compiler.compile("g(z)", definition_store) == Symbol("z")
+
+    def test_function_body_repeated_arguments(self):
+        definition_store = create_definition_store([
+            ("f(x, y)", r"\lim_{t \to x} \frac{t - y}{t - y}"),
+            ("g(x, y)", "x - y"),
+        ])
+
+        assert self.compiler.compile("f(z, z)", definition_store) == 1
+        assert self.compiler.compile("g(z, z)", definition_store) == 0
+        assert self.compiler.compile("g(z, w)", definition_store) == Symbol(
+            "z"
+        ) - Symbol("w")
+
+    def test_applied_values_memoized(self):
+        definition_store = create_definition_store([("f(x)", "x^2"), ("a", "3")])
+        definition = definition_store.get_definition("f")
+        hits = definition.applied_value_cache.hits
+
+        profile = PhaseProfile()
+
+        with profiling(profile):
+            assert self.compiler.compile("f(a) + f(3) + f(2)", definition_store) == 22
+
+        assert definition.applied_value_cache.hits == hits + 1
+        assert profile.stats["applied_value_cache_hits"] == 1
+        assert profile.stats["applied_value_cache_misses"] == 2
+
+        # the generation of a store changes along with its definitions, so stale applied values are never used.
+        overridden_store = definition_store.override({"a": SympyDefinition(Integer(4))})
+
+        assert overridden_store.generation != definition_store.generation
+        assert self.compiler.compile("f(a)", overridden_store) == 16
+
+
+class TestDefinitionStoreCache:
+    def test_builds_do_not_block_other_environments(self, monkeypatch):
+        build_started = Event()
+        release_build = Event()
+        build_definition_store = LmatEnvironment._build_definition_store
+        build_count = 0
+
+        def blocking_build(environment):
+            nonlocal build_count
+            build_count += 1
+
+            if environment.definitions[0].value_expr == "blocked":
+                build_started.set()
+                release_build.wait(30)
+
+            return build_definition_store(environment)
+
+        cached_environment = dict(definitions=[dict(name_expr="a", value_expr="1")])
+        blocked_environment = dict(
+            definitions=[dict(name_expr="a", value_expr="blocked")]
+        )
+
+        LmatEnvironment.clear_definition_store_cache()
+        cached_store = LmatEnvironment.create_definition_store(cached_environment)
+        monkeypatch.setattr(
+            LmatEnvironment, "_build_definition_store", staticmethod(blocking_build)
+        )
+
+        with ThreadPoolExecutor(2) as executor:
+            blocked_stores = [
+                executor.submit(
+                    LmatEnvironment.create_definition_store, blocked_environment
+                )
+                for _ in range(2)
+            ]
+            assert build_started.wait(30)
+
+            # cache hits of other environments are not held up by the running build.
+            assert (
+                LmatEnvironment.create_definition_store(cached_environment)
+                is cached_store
+            )
+
+            release_build.set()
+
+            # identical environments wait for a single build.
+            assert blocked_stores[0].result(30) is blocked_stores[1].result(30)
+
+        assert build_count == 1
@@ -0,0 +1,58 @@
+import os
+
+from lmat_cas_client.caching.DiskResultCache import DiskResultCache
+from lmat_cas_client.caching.ResultCache import ResultCache
+
+
+class TestDiskResultCache:
+    def test_persist_between_runs(self, tmp_path):
+        cache_file = os.path.join(tmp_path, "result-cache.sqlite")
+
+        disk_cache = DiskResultCache(cache_file, "1.0.0")
+        result_cache = ResultCache(disk_cache=disk_cache)
+
+        result_cache.put("a", ("result", {"value": 1}))
+        result_cache.put("b", ("result", {"value": 2}))
+
+        disk_cache.close()
+
+        disk_cache = DiskResultCache(cache_file, "1.0.0")
+        result_cache = ResultCache(disk_cache=disk_cache)
+
+        assert result_cache.get("a") == ("result", {"value": 1})
+        assert result_cache.get("b") == ("result", {"value": 2})
+
+        disk_cache.close()
+
+    def test_discard_other_versions(self, tmp_path):
+        cache_file = os.path.join(tmp_path, "result-cache.sqlite")
+
+        disk_cache = DiskResultCache(cache_file, "1.0.0")
+        disk_cache.store("a", ("result", {"value": 1}))
+        disk_cache.close()
+
+        disk_cache = DiskResultCache(cache_file, "1.0.1")
+
+        assert disk_cache.load() == []
+
+        disk_cache.close()
+
+    def test_load_most_recent(self, tmp_path):
+        cache_file = os.path.join(tmp_path, "result-cache.sqlite")
+
+        disk_cache = DiskResultCache(cache_file, "1.0.0")
+
+        for i in range(10):
+            disk_cache.store(str(i), ("result", {"value": i}))
+
+        disk_cache.close()
+
+        disk_cache = DiskResultCache(cache_file, "1.0.0")
+        result_cache = ResultCache(max_entries=3, disk_cache=disk_cache)
+
+        assert [key for key, _ in disk_cache.load(limit=3)] == ["7", "8", "9"]
+        assert len(result_cache) == 3
+        assert "9" in result_cache
+        assert "6" not in result_cache
+
+        disk_cache.close()
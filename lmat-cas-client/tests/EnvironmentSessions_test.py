@@ -0,0 +1,155 @@
+import pytest
+from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
+from lmat_cas_client.EnvironmentSessions import (
+    EnvironmentSessions,
+    UnknownEnvironmentError,
+)
+from lmat_cas_client.LmatEnvironment import EnvDefinition, LmatEnvironment
+
+
+class TestEnvironmentSessions:
+    def test_update(self):
+        sessions = EnvironmentSessions()
+        sessions.open(
+            "note",
+            dict(
+                symbols=dict(x=["real"]),
+                definitions=[
+                    dict(name_expr="a", value_expr="1"),
+                    dict(name_expr="b", value_expr="2"),
+                    dict(name_expr="c", value_expr="3"),
+                ],
+            ),
+        )
+
+        sessions.update(
+            "note",
+            dict(
+                definitions=[
+                    dict(name_expr="b", value_expr="4"),
+                    dict(name_expr="d", value_expr="5"),
+                ],
+                removed_definitions=["a"],
+                unit_system="SI",
+            ),
+        )
+
+        environment = sessions.environment("note")
+
+        # changed and new definitions are moved to the end.
+        assert environment["definitions"] == [
+            dict(name_expr="c", value_expr="3"),
+            dict(name_expr="b", value_expr="4"),
+            dict(name_expr="d", value_expr="5"),
+        ]
+        assert environment["symbols"] == dict(x=["real"])
+        assert environment["unit_system"] == "SI"
+        # the environment is only rebuilt once it has been updated.
+        assert sessions.environment("note") is environment
+
+    def test_redefined_function(self):
+        sessions = EnvironmentSessions()
+        sessions.open(
+            "note",
+            dict(
+                definitions=[
+                    dict(name_expr="f(x)", value_expr="x^2"),
+                    dict(name_expr="f(y)", value_expr="y + 1"),
+                ]
+            ),
+        )
+        compiler = LatexToSympyCompiler()
+
+        def evaluate(expression: str):
+            return compiler.compile(
+                expression,
+                LmatEnvironment.create_definition_store(sessions.environment("note")),
+            )
+
+        assert evaluate("f(2)") == 3
+
+        # the most recently updated definition of f wins, regardless of its parameter name.
+        sessions.update(
+            "note", dict(definitions=[dict(name_expr="f(x)", value_expr="x^3")])
+        )
+        assert evaluate("f(2)") == 8
+
+        sessions.update(
+            "note", dict(definitions=[dict(name_expr="f(z)", value_expr="z - 1")])
+        )
+        assert evaluate("f(2)") == 1
+
+    def test_open_repeated_definition(self):
+        sessions = EnvironmentSessions()
+        sessions.open(
+            "note",
+            dict(
+                definitions=[
+                    dict(name_expr="f(x)", value_expr="x"),
+                    dict(name_expr="f(y)", value_expr="2y"),
+                    dict(name_expr="f(x)", value_expr="3x"),
+                ]
+            ),
+        )
+
+        # the repeated name expression is moved to the end, just as when it is updated.
+        assert sessions.environment("note")["definitions"] == [
+            dict(name_expr="f(y)", value_expr="2y"),
+            dict(name_expr="f(x)", value_expr="3x"),
+        ]
+        assert (
+            LatexToSympyCompiler().compile(
+                "f(2)",
+                LmatEnvironment.create_definition_store(sessions.environment("note")),
+            )
+            == 6
+        )
+
+    def test_resolve(self):
+        sessions = EnvironmentSessions()
+        sessions.open("note", dict(definitions=[dict(name_expr="a", value_expr="1")]))
+
+        start_args = sessions.resolve(dict(expression="a", environment_id="note"))
+
+        assert start_args == dict(
+            expression="a", environment=sessions.environment("note")
+        )
+        assert sessions.resolve(dict(expression="a")) == dict(expression="a")
+
+        sessions.close("note")
+
+        with pytest.raises(UnknownEnvironmentError):
+            sessions.resolve(dict(expression="a", environment_id="note"))
+
+        with pytest.raises(UnknownEnvironmentError):
+            sessions.update("note", dict())
+
+    def test_compiled_definitions_reused(self):
+        unchanged_definitions = [
+            EnvDefinition(name_expr=f"a_{{{i}}}", value_expr=f"{i}") for i in range(5)
+        ]
+
+        definition_store = LmatEnvironment.create_definition_store(
+            LmatEnvironment(
+                definitions=[
+                    *unchanged_definitions,
+                    EnvDefinition(name_expr="b", value_expr="1"),
+                ]
+            )
+        )
+        updated_definition_store = LmatEnvironment.create_definition_store(
+            LmatEnvironment(
+                definitions=[
+                    *unchanged_definitions,
+                    EnvDefinition(name_expr="b", value_expr="2"),
+                ]
+            )
+        )
+
+        assert definition_store is not updated_definition_store
+        assert definition_store.get_definition(
+            "a_{0}"
+        ) is updated_definition_store.get_definition("a_{0}")
+        assert definition_store.get_definition(
+            "b"
+        ) is not updated_definition_store.get_definition("b")
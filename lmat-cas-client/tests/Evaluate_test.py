@@ -1,6 +1,10 @@
 import lmat_cas_client.math_lib.units.UnitDefinitions as u
 import pytest
 from lmat_cas_client.command_handlers.ApartHandler import *
+from lmat_cas_client.command_handlers.CommandHandler import (
+    FALLBACK_RESULT,
+    result_reporters,
+)
 from lmat_cas_client.command_handlers.EvalfHandler import *
 from lmat_cas_client.command_handlers.EvalHandler import *
 from lmat_cas_client.command_handlers.ExpandHandler import *
@@ -690,3 +694,56 @@ class TestEvaluate:
             "environment": {},
         })
         assert result.sympy_expr == u.meter * E ** (u.meter * S("t"))
+
+    def test_fallback_result(self):
+        handler = EvalHandler(self.compiler)
+        fallback_results = []
+
+        with result_reporters({FALLBACK_RESULT: fallback_results.append}):
+            result = handler.handle({
+                "expression": r"\sin(x)^2 + \cos(x)^2",
+                "environment": {},
+            })
+
+        assert result.sympy_expr == 1
+        assert len(fallback_results) == 1
+        assert fallback_results[0].is_fallback
+        assert (
+            fallback_results[0].sympy_expr
+            == sin(Symbol("x")) ** 2 + cos(Symbol("x")) ** 2
+        )
+        assert fallback_results[0].getResponsePayload()[1]["metadata"]["fallback"]
+
+    def test_profile(self):
+        handler = EvalHandler(self.compiler)
+
+        _, value = handler.handle({
+            "expression": "x + x",
+            "environment": {},
+            "profile": True,
+        }).getResponsePayload()
+
+        profile = value["metadata"]["profile"]
+
+        for phase in (
+            "definition_store",
+            "compile/parse",
+            "compile/transform",
+            "evaluate/simplify",
+            "unit_conversion",
+            "latex",
+        ):
+            assert profile["phases_ms"][phase] >= 0
+
+        assert profile["stats"]["expression_chars"] == 5
+        assert profile["stats"]["result_latex_chars"] == len(
+            value["evaluated_expression"]
+        )
+
+        # profiling is opt in.
+        _, value = handler.handle({
+            "expression": "x + x",
+            "environment": {},
+        }).getResponsePayload()
+
+        assert "profile" not in value["metadata"]
@@ -0,0 +1,289 @@
+import asyncio
+
+import pytest
+from lmat_cas_client.command_handlers.CommandHandler import (
+    FALLBACK_RESULT,
+    CommandHandler,
+    CommandResult,
+)
+from lmat_cas_client.command_handlers.EvalHandler import EvalHandler
+from lmat_cas_client.command_handlers.test_handlers.TestHangHandler import (
+    TestHangHandler,
+)
+from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
+from lmat_cas_client.execution.ExecutionBackend import CommandError
+from lmat_cas_client.execution.ProcessPoolBackend import ProcessPoolBackend
+from lmat_cas_client.execution.ThreadBackend import ThreadBackend
+from lmat_cas_client.monitoring.MemoryWatchdog import MemoryWatchdog
+
+BACKEND_FACTORIES = [ThreadBackend, lambda: ProcessPoolBackend(1)]
+
+
+@pytest.mark.parametrize("backend_factory", BACKEND_FACTORIES)
+class TestExecutionBackend:
+    command_handlers = {
+        "eval": EvalHandler(LatexToSympyCompiler()),
+        "test-hang": TestHangHandler(),
+    }
+
+    def test_execute(self, backend_factory):
+        async def execute():
+            backend = backend_factory()
+            backend.start(self.command_handlers)
+
+            try:
+                return await asyncio.gather(
+                    backend.execute(
+                        "a", "eval", {"expression": "1+1", "environment": {}}
+                    ),
+                    backend.execute(
+                        "b", "eval", {"expression": "x+x", "environment": {}}
+                    ),
+                )
+            finally:
+                backend.shutdown()
+
+        (type_a, value_a), (type_b, value_b) = asyncio.run(execute())
+
+        assert type_a == type_b == "result"
+        assert value_a["evaluated_expression"] == "2"
+        assert value_b["evaluated_expression"] == r"2 \, x"
+
+    def test_error(self, backend_factory):
+        async def execute():
+            backend = backend_factory()
+            backend.start(self.command_handlers)
+
+            try:
+                return await backend.execute(
+                    "a", "eval", {"expression": "1+", "environment": {}}
+                )
+            finally:
+                backend.shutdown()
+
+        with pytest.raises(CommandError):
+            asyncio.run(execute())
+
+    def test_interrupt(self, backend_factory):
+        async def execute():
+            backend = backend_factory()
+            backend.start(self.command_handlers)
+
+            try:
+                hang_task = asyncio.create_task(
+                    backend.execute("hang", "test-hang", {"hang_time": 60})
+                )
+
+                await asyncio.sleep(1)
+                hang_task.cancel()
+
+                with pytest.raises(asyncio.CancelledError):
+                    await hang_task
+
+                # for the process pool, the only worker was stuck,
+                # so this can only succeed if it was replaced.
+                return await asyncio.wait_for(
+                    backend.execute(
+                        "a", "eval", {"expression": "1+1", "environment": {}}
+                    ),
+                    timeout=30,
+                )
+            finally:
+                backend.shutdown()
+
+        _, value = asyncio.run(execute())
+
+        assert value["evaluated_expression"] == "2"
+
+    def test_fallback(self, backend_factory):
+        fallback_payloads = []
+
+        async def execute():
+            backend = backend_factory()
+            backend.start(self.command_handlers)
+
+            try:
+                return await backend.execute(
+                    "a",
+                    "eval",
+                    {"expression": "2 x - x", "environment": {}},
+                    {FALLBACK_RESULT: fallback_payloads.append},
+                )
+            finally:
+                backend.shutdown()
+
+        _, value = asyncio.run(execute())
+
+        assert value["evaluated_expression"] == "x"
+        assert len(fallback_payloads) == 1
+        assert fallback_payloads[0][1]["metadata"]["fallback"]
+
+    def test_warm_up(self, backend_factory):
+        async def execute():
+            backend = backend_factory()
+            backend.start(self.command_handlers, warm_up=True)
+
+            try:
+                warm_up_timings = await backend.wait_until_ready()
+                _, value = await backend.execute(
+                    "a", "eval", {"expression": "1+1", "environment": {}}
+                )
+                return warm_up_timings, value
+            finally:
+                backend.shutdown()
+
+        warm_up_timings, value = asyncio.run(execute())
+
+        # only commands with a registered handler are warmed up.
+        assert "arithmetic" in warm_up_timings["commands_ms"]
+        assert "solve" not in warm_up_timings["commands_ms"]
+        assert warm_up_timings["total_ms"] > 0
+        assert value["evaluated_expression"] == "2"
+
+    def test_no_warm_up(self, backend_factory):
+        async def execute():
+            backend = backend_factory()
+            backend.start(self.command_handlers)
+
+            try:
+                return await backend.wait_until_ready()
+            finally:
+                backend.shutdown()
+
+        assert asyncio.run(execute()) == {}
+
+    def test_memory_watchdog(self, backend_factory):
+        async def execute():
+            backend = backend_factory()
+            backend.start(
+                self.command_handlers, memory_watchdog=MemoryWatchdog(max_requests=2)
+            )
+
+            try:
+                values = []
+
+                for i in range(3):
+                    _, value = await backend.execute(
+                        str(i), "eval", {"expression": f"{i} + {i}", "environment": {}}
+                    )
+                    values.append(value["evaluated_expression"])
+
+                return values, backend.memory_stats()
+            finally:
+                backend.shutdown()
+
+        values, memory_stats = asyncio.run(execute())
+
+        # workers are recycled transparently, without affecting any commands.
+        assert values == ["0", "2", "4"]
+        # process workers are recycled, while threads can only clear their caches.
+        assert memory_stats["recycles"] + memory_stats["cache_clears"] == 1
+        assert len(memory_stats["workers"]) == 1
+        assert memory_stats["workers"][0]["requests"] == 1
+
+    def test_memory_watchdog_clears_once(self, backend_factory):
+        async def execute():
+            backend = backend_factory()
+            # every worker exceeds the soft limit, and never grows by the margin.
+            backend.start(
+                self.command_handlers,
+                memory_watchdog=MemoryWatchdog(
+                    soft_limit_bytes=1, clear_margin_bytes=2**50
+                ),
+            )
+
+            try:
+                for i in range(3):
+                    await backend.execute(
+                        str(i), "eval", {"expression": "1 + 1", "environment": {}}
+                    )
+
+                return backend.memory_stats()
+            finally:
+                backend.shutdown()
+
+        assert asyncio.run(execute())["cache_clears"] == 1
+
+
+# command handler which cannot be unpickled, so workers it is sent to exit before they are ready.
+class UnstartableHandler(EvalHandler):
+    def __setstate__(self, _state):
+        raise ImportError("broken worker import")
+
+
+class EmptyResult(CommandResult):
+    def getResponsePayload(self):
+        return CommandResult.result({})
+
+
+# prints the given text, and responds with an empty result.
+class PrintHandler(CommandHandler):
+    def handle(self, message: dict) -> EmptyResult:
+        print(message["text"], flush=True)
+        return EmptyResult()
+
+
+class TestProcessPoolBackend:
+    def test_worker_start_failure(self, monkeypatch):
+        monkeypatch.setattr(ProcessPoolBackend, "SPAWN_RETRY_DELAY", 0)
+
+        async def execute():
+            backend = ProcessPoolBackend(1)
+            backend.start({"eval": UnstartableHandler(LatexToSympyCompiler())})
+
+            try:
+                return await asyncio.wait_for(backend.wait_until_ready(), 60)
+            finally:
+                backend.shutdown()
+
+        # workers are not replaced forever, waiting on them fails instead.
+        with pytest.raises(CommandError) as error:
+            asyncio.run(execute())
+
+        assert "failed to start 3 times" in error.value.dev_message
+
+    def test_execute_without_workers(self, monkeypatch):
+        monkeypatch.setattr(ProcessPoolBackend, "SPAWN_RETRY_DELAY", 0)
+
+        async def execute():
+            backend = ProcessPoolBackend(1)
+            backend.start({"eval": UnstartableHandler(LatexToSympyCompiler())})
+            errors = []
+
+            try:
+                # the first command waits for a worker, which never starts, the second starts once the backend is broken.
+                for _ in range(2):
+                    with pytest.raises(CommandError) as error:
+                        await asyncio.wait_for(
+                            backend.execute(
+                                "a", "eval", {"expression": "1", "environment": {}}
+                            ),
+                            60,
+                        )
+
+                    errors.append(error.value)
+            finally:
+                backend.shutdown()
+
+            return errors
+
+        errors = asyncio.run(execute())
+
+        assert all("failed to start 3 times" in e.dev_message for e in errors)
+
+    def test_stdout_to_stderr(self, capfd):
+        async def execute():
+            backend = ProcessPoolBackend(1, stdout_to_stderr=True)
+            backend.start({"print": PrintHandler()})
+
+            try:
+                await backend.execute("a", "print", {"text": "printed by worker"})
+            finally:
+                backend.shutdown()
+
+        asyncio.run(execute())
+
+        output = capfd.readouterr()
+
+        assert "printed by worker" not in output.out
+        assert "printed by worker" in output.err
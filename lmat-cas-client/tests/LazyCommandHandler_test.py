@@ -0,0 +1,42 @@
+import pickle
+
+from lmat_cas_client.command_handlers.EvalHandler import EvalHandler
+from lmat_cas_client.command_handlers.LazyCommandHandler import LazyCommandHandler
+from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
+
+
+def lazy_eval_handler() -> LazyCommandHandler:
+    return LazyCommandHandler(
+        "lmat_cas_client.command_handlers.EvalHandler:EvalHandler",
+        "lmat_cas_client.compiling.Compiler:LatexToSympyCompiler",
+    )
+
+
+class TestLazyCommandHandler:
+    def test_load_on_first_use(self):
+        handler = lazy_eval_handler()
+
+        assert handler._handler is None
+
+        result = handler.handle({"expression": "1 + 1", "environment": {}})
+
+        assert result.getResponsePayload()[1]["evaluated_expression"] == "2"
+        assert isinstance(handler.handler, EvalHandler)
+        assert isinstance(handler.handler._compiler, LatexToSympyCompiler)
+        # the handler is only constructed once.
+        assert handler.handler is handler.handler
+
+    def test_pickle(self):
+        handler = lazy_eval_handler()
+        handler.handle({"expression": "1 + 1", "environment": {}})
+
+        unpickled_handler = pickle.loads(pickle.dumps(handler))
+
+        # the loaded handler is not pickled, only the paths needed to load it again.
+        assert unpickled_handler._handler is None
+        assert unpickled_handler.handler_path == handler.handler_path
+        assert unpickled_handler.argument_paths == handler.argument_paths
+
+        result = unpickled_handler.handle({"expression": "x + x", "environment": {}})
+
+        assert result.getResponsePayload()[1]["evaluated_expression"] == r"2 \, x"
@@ -0,0 +1,95 @@
+import asyncio
+
+from lmat_cas_client.command_handlers.EvalHandler import EvalHandler
+from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
+from lmat_cas_client.execution.ThreadBackend import ThreadBackend
+from lmat_cas_client.headless.BatchEvaluator import evaluate_markdown_files
+from lmat_cas_client.headless.MarkdownDocument import extract_equations
+
+DOCUMENT = r"""# Title
+
+Inline $1 + 1$, and an escaped \$5 price.
+
+$a := 2$
+
+```lmat
+[symbols]
+x = ["real"]
+
+[units]
+system = "SI"
+```
+
+$b := 3$
+
+$$
+b^{2}
+$$
+
+`$inline code$`
+
+```python
+x = "$code block$"
+```
+
+${} x + b {}$ $$f(y) := y^{2}$$ $f(x)$
+"""
+
+
+class TestMarkdownDocument:
+    def test_extract_equations(self):
+        equations = extract_equations(DOCUMENT)
+
+        assert [equation.expression for equation in equations] == [
+            "1 + 1",
+            "b^{2}",
+            "x + b",
+            "f(x)",
+        ]
+        assert [equation.line for equation in equations] == [3, 17, 27, 27]
+        assert [equation.is_multiline for equation in equations] == [
+            False,
+            True,
+            False,
+            False,
+        ]
+
+    def test_environments(self):
+        equations = extract_equations(DOCUMENT)
+
+        # definitions before the lmat block are not part of the environment of equations after it.
+        assert equations[0].environment.definitions == []
+        assert equations[1].environment.symbols == {"x": ["real"]}
+        assert equations[1].environment.unit_system == "SI"
+        assert [
+            (definition.name_expr, definition.value_expr)
+            for definition in equations[3].environment.definitions
+        ] == [("b", "3"), ("f(y)", "y^{2}")]
+
+    def test_evaluate_markdown_files(self, tmp_path):
+        markdown_file = tmp_path / "document.md"
+        markdown_file.write_text(DOCUMENT + "\n$1 +$\n", encoding="utf-8")
+        missing_file = tmp_path / "missing.md"
+
+        report = asyncio.run(
+            evaluate_markdown_files(
+                [str(markdown_file), str(missing_file)],
+                {"eval": EvalHandler(LatexToSympyCompiler())},
+                ThreadBackend(),
+            )
+        )
+
+        results = report["files"][str(markdown_file)]["equations"]
+
+        assert [result.get("result") for result in results] == [
+            "2",
+            "9",
+            "x + 3",
+            "x^{2}",
+            None,
+        ]
+        assert results[-1]["status"] == "error"
+        assert "error" in report["files"][str(missing_file)]
+        assert report["summary"]["equations"] == 5
+        assert report["summary"]["errors"] == 1
+        assert report["summary"]["file_errors"] == 1
@@ -0,0 +1,56 @@
+from lmat_cas_client.monitoring.MemoryWatchdog import MemoryWatchdog, WatchdogAction
+
+
+class TestMemoryWatchdog:
+    def test_limits(self):
+        watchdog = MemoryWatchdog(soft_limit_bytes=100, hard_limit_bytes=200)
+
+        assert watchdog.check(99, 1) is WatchdogAction.NONE
+        assert watchdog.check(100, 1) is WatchdogAction.CLEAR_CACHES
+        assert watchdog.check(200, 1) is WatchdogAction.RECYCLE
+        # unknown memory usage never exceeds a limit.
+        assert watchdog.check(None, 1) is WatchdogAction.NONE
+
+    def test_max_requests(self):
+        watchdog = MemoryWatchdog(max_requests=3)
+
+        assert watchdog.check(10**12, 2) is WatchdogAction.NONE
+        assert watchdog.check(None, 3) is WatchdogAction.RECYCLE
+
+    def test_process(self):
+        assert MemoryWatchdog(soft_limit_bytes=1).check_process(1) in (
+            WatchdogAction.CLEAR_CACHES,
+            # the memory usage of the process cannot be determined on every platform.
+            WatchdogAction.NONE,
+        )
+
+    def test_repeated_checks_above_soft_limit(self):
+        watchdog = MemoryWatchdog(soft_limit_bytes=100, hard_limit_bytes=200)
+        cleared_rss_bytes = None
+        actions = []
+
+        # memory freed by clearing caches is not returned to the os, so the usage stays above the soft limit.
+        for rss_bytes in (120, 120, 120, 140, 150):
+            action = watchdog.check(rss_bytes, 1, cleared_rss_bytes)
+            actions.append(action)
+
+            if action is WatchdogAction.CLEAR_CACHES:
+                cleared_rss_bytes = rss_bytes
+
+        # caches are cleared once per crossing, and again once usage has grown by the margin since.
+        assert watchdog.clear_margin_bytes == 25
+        assert actions == [
+            WatchdogAction.CLEAR_CACHES,
+            WatchdogAction.NONE,
+            WatchdogAction.NONE,
+            WatchdogAction.NONE,
+            WatchdogAction.CLEAR_CACHES,
+        ]
+        # the hard limit always recycles recyclable workers.
+        assert watchdog.check(200, 1, 190) is WatchdogAction.RECYCLE
+
+    def test_not_recyclable(self):
+        watchdog = MemoryWatchdog(soft_limit_bytes=100, hard_limit_bytes=200)
+
+        assert watchdog.check(250, 1, recyclable=False) is WatchdogAction.CLEAR_CACHES
+        assert watchdog.check(250, 1, 250, recyclable=False) is WatchdogAction.NONE
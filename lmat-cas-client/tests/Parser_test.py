@@ -1,8 +1,18 @@
+from copy import deepcopy
+
 import pytest
 from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
 from lmat_cas_client.compiling.DefinitionStore import CyclicDependencyError
 from lmat_cas_client.compiling.parsing import PrettyParserError
+from lmat_cas_client.compiling.parsing.LatexParser import latex_parser
+from lmat_cas_client.compiling.parsing.Parser import Parser
+from lmat_cas_client.compiling.transforming.DependenciesTransformer import (
+    dependencies_transformer_runner,
+)
 from lmat_cas_client.compiling.transforming.LatexMatrix import LatexMatrix
+from lmat_cas_client.compiling.transforming.SympyTransformer import (
+    sympy_transformer_runner,
+)
 from lmat_cas_client.compiling.transforming.SystemOfExpr import SystemOfExpr
 from lmat_cas_client.LmatEnvironment import EnvDefinition, LmatEnvironment
 from sympy import *
@@ -613,3 +623,54 @@ class TestParse:
     )
     def test_regression_192(self, latex, expected_expr):
         assert self._parse_expr(latex) == simplify(expected_expr)
+
+
+class TestParseTreeCache:
+    def _parser(self, parse_tree_cache_size: int) -> Parser:
+        return Parser(
+            latex_parser.parser, latex_parser._pre_processor, parse_tree_cache_size
+        )
+
+    def test_cached_trees(self):
+        parser = self._parser(2)
+
+        tree = parser.parse(r"\frac{a}{b}")
+
+        assert parser.parse(r"\frac{a}{b}") is tree
+        assert parser.cache_hits == 1
+        assert parser.cache_misses == 1
+        assert parser.cache_hit_ratio() == 0.5
+
+        # the least recently used tree is evicted.
+        parser.parse("a")
+        parser.parse(r"\frac{a}{b}")
+        parser.parse("b")
+
+        assert parser.parse(r"\frac{a}{b}") is tree
+        assert parser.parse("a") is not None
+        assert parser.cache_misses == 4
+
+    def test_shared_tree_unmodified(self):
+        parser = self._parser(2)
+        tree = parser.parse(r"\sum_{n=1}^{3} x n + \frac{\dd}{\dd x} x^2")
+        tree_copy = deepcopy(tree)
+
+        dependencies_transformer_runner.transform(tree)
+        sympy_transformer_runner.transform(
+            tree, LmatEnvironment.create_definition_store({})
+        )
+
+        assert tree == tree_copy
+
+    def test_disabled_and_invalid(self):
+        parser = self._parser(0)
+
+        assert parser.parse("a") is not parser.parse("a")
+
+        parser = self._parser(2)
+
+        for _ in range(2):
+            with pytest.raises(PrettyParserError):
+                parser.parse(r"\frac{")
+
+        assert parser.cache_misses == 2
@@ -0,0 +1,73 @@
+from lmat_cas_client.caching.ResultCache import ResultCache
+
+
+class TestResultCache:
+    def test_key_normalization(self):
+        environment = {"symbols": {"x": ["real"]}}
+
+        key = ResultCache.create_key(
+            "eval", {"expression": "x + 1", "environment": environment}
+        )
+
+        assert key == ResultCache.create_key(
+            "eval", {"expression": "x + 1  \t", "environment": environment}
+        )
+        assert key == ResultCache.create_key(
+            "eval", {"environment": environment, "expression": "x + 1"}
+        )
+        assert key != ResultCache.create_key(
+            "evalf", {"expression": "x + 1", "environment": environment}
+        )
+        assert key != ResultCache.create_key(
+            "eval", {"expression": "x + 1", "environment": {}}
+        )
+        # escaped spaces and line structure are significant.
+        assert ResultCache.create_key(
+            "eval", {"expression": "x\\ ", "environment": {}}
+        ) != ResultCache.create_key("eval", {"expression": "x\\", "environment": {}})
+        assert ResultCache.create_key(
+            "eval", {"expression": "\nx", "environment": {}}
+        ) != ResultCache.create_key("eval", {"expression": "x", "environment": {}})
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+
+        cache.put("a", ("result", {"value": 1}))
+        cache.put("b", ("result", {"value": 2}))
+
+        assert cache.get("a") == ("result", {"value": 1})
+
+        cache.put("c", ("result", {"value": 3}))
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.evictions == 1
+
+    def test_memory_budget(self):
+        cache = ResultCache(max_bytes=200)
+
+        cache.put("a", ("result", {"value": "a" * 50}))
+        cache.put("b", ("result", {"value": "b" * 50}))
+        cache.put("c", ("result", {"value": "c" * 50}))
+
+        assert cache.size_bytes <= 200
+        assert "a" not in cache
+        assert "c" in cache
+
+        cache.put("d", ("result", {"value": "d" * 500}))
+
+        assert "d" not in cache
+
+    def test_counters(self):
+        cache = ResultCache()
+
+        cache.put("a", ("result", {}))
+
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+
+        assert cache.hits == 2
+        assert cache.misses == 1
+        assert cache.hit_ratio() == 2 / 3
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+CLIENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStartup:
+    def test_client_script_imports_no_compiler(self):
+        # imported in a fresh interpreter, as the test process has long since imported sympy.
+        # the client script is imported without running it, as it is only run if it is the main module.
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import runpy, sys; runpy.run_path('lmat-cas-client.py'); "
+                "print(sorted(module for module in ('sympy', 'lark') if module in sys.modules))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=CLIENT_DIR,
+        )
+
+        assert process.stdout.strip() == "[]"
@@ -1,3 +1,7 @@
+from lmat_cas_client.command_handlers.CommandHandler import (
+    PARTIAL_RESULT,
+    result_reporters,
+)
 from lmat_cas_client.command_handlers.TruthTableHandler import TruthTableHandler
 from lmat_cas_client.compiling.Compiler import LatexToSympyCompiler
 from sympy import *
@@ -22,3 +26,18 @@ class TestTruthTable:
             [False, True, False],
             [False, False, False],
         ]
+
+    def test_partial_rows(self):
+        partial_results = []
+
+        with result_reporters({PARTIAL_RESULT: partial_results.append}):
+            result = self.handler.handle({
+                "expression": r"A \wedge B \wedge C \wedge D \wedge E \wedge F \wedge G",
+                "environment": {},
+                "truth_table_format": "md",
+            })
+
+        assert len(result.truth_table) == 128
+        assert [r.first_row for r in partial_results] == [0, 64]
+        assert [row for r in partial_results for row in r.rows] == result.truth_table
+        assert partial_results[0].getResponsePayload()[1]["rows"][0] == ["T"] * 8
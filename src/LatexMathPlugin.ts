@@ -110,6 +110,7 @@ export default class LatexMathPlugin extends Plugin {
     private static readonly CAS_CLIENT_SHUTDOWN_TIMEOUT = 30;
     private static readonly STATUS_BAR_UPDATE_FREQ: UnixTimestampMillis = 500;
     private static readonly STATUS_BAR_MESSAGE_HANG_TIME: UnixTimestampMillis = 1000;
+    private static readonly RESULT_CACHE_FILE = "result-cache.sqlite";
 
     private cas_server: CasServer;
     private spawn_cas_client_promise: Promise<void>;
@@ -166,7 +167,11 @@ export default class LatexMathPlugin extends Plugin {
         const full_plugin_dir = path.join(file_system_adapter.getBasePath(), plugin_dir);
         const asset_extractor = new CasClientExtractor(full_plugin_dir);
 
-        const cas_client_spawner = this.settings.dev_mode ? new SourceCodeSpawner(full_plugin_dir) : new ExecutableSpawner(asset_extractor);
+        // results are only persisted for release builds, as the source code may change between runs in developer mode.
+        const cas_client_spawner = this.settings.dev_mode ? new SourceCodeSpawner(full_plugin_dir) : new ExecutableSpawner(asset_extractor, [
+            "--result-cache-file", path.join(full_plugin_dir, LatexMathPlugin.RESULT_CACHE_FILE),
+            "--result-cache-version", this.manifest.version
+        ]);
 
         await this.cas_server.initializeAsync(cas_client_spawner);
     }
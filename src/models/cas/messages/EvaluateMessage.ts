@@ -37,7 +37,14 @@ export class EvaluateMessage extends StartCommandMessage {
 export interface EvaluateResponse {
     metadata: {
         separator: string,
-        end_line: number
+        end_line: number,
+        // set if the result is not fully evaluated, as the command exceeded its deadline.
+        fallback?: boolean,
+        // per phase timings and expression size stats, set if the command was started with profile set.
+        profile?: {
+            phases_ms: Record<string, number>,
+            stats: Record<string, number>
+        }
     },
     evaluated_expression: string
 }
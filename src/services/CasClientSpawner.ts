@@ -8,24 +8,26 @@ export interface CasClientSpawner {
 }
 
 // Spawns a cas client process with python source files in the given virtual environment, with the given python executable.
+// client_args are passed as additional command line arguments to the cas client.
 export class SourceCodeSpawner implements CasClientSpawner {
-    constructor(protected plugin_dir: string, protected python_exe = "python", protected venv = ".venv") { }
+    constructor(protected plugin_dir: string, protected python_exe = "python", protected venv = ".venv", protected client_args: string[] = []) { }
 
     public async spawnClient(port: number): Promise<ChildProcessWithoutNullStreams> {
 
-        return spawn(join(this.plugin_dir, this.venv, process.platform === "win32" ? "Scripts" : "bin", this.python_exe), [join(this.plugin_dir, "lmat-cas-client/lmat-cas-client.py"), port.toString()]);
+        return spawn(join(this.plugin_dir, this.venv, process.platform === "win32" ? "Scripts" : "bin", this.python_exe), [join(this.plugin_dir, "lmat-cas-client/lmat-cas-client.py"), port.toString(), ...this.client_args]);
     }
 }
 
 // Spawns a cas client through a pyinstalled executable.
+// client_args are passed as additional command line arguments to the cas client.
 export class ExecutableSpawner implements CasClientSpawner {
-    constructor(private asset_extractor: CasClientExtractor) { }
+    constructor(private asset_extractor: CasClientExtractor, private client_args: string[] = []) { }
 
     public async spawnClient(port: number): Promise<ChildProcessWithoutNullStreams> {
         if (!(await this.asset_extractor.hasBundledClients())) {
             await this.asset_extractor.extractClients();
         }
 
-        return spawn(this.asset_extractor.getCurrentOsClientPath(), [port.toString()]);
+        return spawn(this.asset_extractor.getCurrentOsClientPath(), [port.toString(), ...this.client_args]);
     }
 }
@@ -1,3 +1,4 @@
+import { decode, encode } from '@msgpack/msgpack';
 import { ChildProcessWithoutNullStreams } from 'child_process';
 import { assert } from 'console';
 import getPort from 'get-port';
@@ -7,13 +8,26 @@ import { CasClientSpawner } from './CasClientSpawner';
 enum MessageType {
     EXIT = "exit",
     START = "start",
-    INTERRUPT = "interrupt"
+    START_BATCH = "start-batch",
+    INTERRUPT = "interrupt",
+    PROTOCOL = "protocol",
+    READY = "ready",
+    ENV_OPEN = "env-open",
+    ENV_UPDATE = "env-update",
+    ENV_CLOSE = "env-close"
+}
+
+// Encodings messages can be sent with, text frames are always json and binary frames are always msgpack.
+export enum MessageEncoding {
+    JSON = "json",
+    MSGPACK = "msgpack"
 }
 
 enum MessageStatus {
     SUCCESS = "success",
     ERROR = "error",
-    INTERRUPTED = "interrupted"
+    INTERRUPTED = "interrupted",
+    PARTIAL = "partial"
 }
 
 export type GenericPayload = Record<string, unknown>;
@@ -38,6 +52,10 @@ interface ServerMessageUID extends ServerMessage {
 export interface StartCommandPayload extends ServerPayload {
     command_type: string;
     start_args: GenericPayload;
+    // a newer command started in the same slot interrupts this command, if it is still running.
+    slot?: string;
+    // send partial results reported by the command, before its final response.
+    stream?: boolean;
 }
 
 export class StartCommandMessage implements ServerMessage {
@@ -46,6 +64,24 @@ export class StartCommandMessage implements ServerMessage {
     constructor(public readonly payload: StartCommandPayload) { }
 }
 
+export interface BatchItemPayload extends StartCommandPayload {
+    uid: string;
+}
+
+// Start multiple commands sharing a single environment, every item is responded to separately.
+// The environment is either given in full, or as the environment_id of an open environment session.
+export interface StartBatchPayload extends ServerPayload {
+    environment?: GenericPayload;
+    environment_id?: string;
+    items: BatchItemPayload[];
+}
+
+export class StartBatchMessage implements ServerMessage {
+    public readonly type: MessageType = MessageType.START_BATCH;
+
+    constructor(public readonly payload: StartBatchPayload) { }
+}
+
 export interface InterruptHandlerPayload extends ServerPayload {
     target_uids: string[]
 }
@@ -56,6 +92,69 @@ export class InterruptHandlerMessage implements ServerMessage {
     constructor(public payload: InterruptHandlerPayload) { }
 }
 
+export interface ProtocolPayload extends ServerPayload {
+    // supported encodings, in order of preference.
+    encodings: MessageEncoding[]
+}
+
+export class ProtocolMessage implements ServerMessage {
+    public readonly type: MessageType = MessageType.PROTOCOL;
+
+    constructor(public readonly payload: ProtocolPayload) { }
+}
+
+// Open an environment session, commands may then pass its environment_id in their start args,
+// instead of the full environment.
+export interface EnvOpenPayload extends ServerPayload {
+    environment_id: string;
+    environment: GenericPayload;
+}
+
+export class EnvOpenMessage implements ServerMessage {
+    public readonly type: MessageType = MessageType.ENV_OPEN;
+
+    constructor(public readonly payload: EnvOpenPayload) { }
+}
+
+export interface EnvDefinitionPayload extends ServerPayload {
+    name_expr: string;
+    value_expr: string;
+}
+
+// Update an open environment session with the changes since the last open or update message.
+export interface EnvUpdatePayload extends ServerPayload {
+    environment_id: string;
+    // added or changed definitions, replacing any definition with the same name_expr.
+    definitions?: EnvDefinitionPayload[];
+    // name_exprs of removed definitions.
+    removed_definitions?: string[];
+    symbols?: Record<string, string[]>;
+    unit_system?: string | null;
+    solve_domain?: string | null;
+}
+
+export class EnvUpdateMessage implements ServerMessage {
+    public readonly type: MessageType = MessageType.ENV_UPDATE;
+
+    constructor(public readonly payload: EnvUpdatePayload) { }
+}
+
+export interface EnvClosePayload extends ServerPayload {
+    environment_id: string;
+}
+
+export class EnvCloseMessage implements ServerMessage {
+    public readonly type: MessageType = MessageType.ENV_CLOSE;
+
+    constructor(public readonly payload: EnvClosePayload) { }
+}
+
+// Responded to once the cas client has finished warming up.
+const READY_MESSAGE: ServerMessage = {
+    type: MessageType.READY,
+    payload: {}
+};
+
 // ======== client responses ========
 
 export interface ClientResponse {
@@ -82,6 +181,15 @@ export interface ErrorResponse extends ClientResponse {
     };
 }
 
+export interface PartialResponse extends ClientResponse {
+    status: MessageStatus.PARTIAL;
+    uid: string;
+    payload: {
+        type: string
+        value: GenericPayload
+    };
+}
+
 export interface InterrutpedResposne extends ClientResponse {
     status: MessageStatus.INTERRUPTED;
     uid: string;
@@ -101,6 +209,7 @@ interface MessagePromiseEntry {
     sent_time: UnixTimestampMillis;
     resolve: (value: ClientResponse | PromiseLike<ClientResponse>) => void;
     reject: (reason?: unknown) => void;
+    on_partial?: (response: PartialResponse) => void;
 }
 
 // The LmatCasServer class manages a connection as well as message encoding and handling, with an LmatCasClient script instance.
@@ -135,7 +244,24 @@ export class CasServer {
 
         // wait for the process to establish a connection
         this.ws_cas_client = await new Promise(this.resolveConnection.bind(this));
-        this.ws_cas_client.on('message', (buffer) => this.handleMessage(buffer));
+        this.ws_cas_client.on('message', (buffer, is_binary) => this.handleMessage(buffer, is_binary));
+
+        await this.negotiateEncoding();
+
+        // commands are accepted while the client warms up, so initialization does not wait for it.
+        const ready_result = this.send(READY_MESSAGE);
+        // the ready message is only responded to once the warm-up has finished,
+        // so it is never reported as hanging, and never interrupted along with the commands.
+        this.background_uids.add(ready_result.uid);
+        this.ready_response = ready_result.response;
+        this.ready_response.then((response) => {
+            console.log('lmat-cas-client warm-up timings:', response.payload.value.warm_up);
+        }).catch(() => { });
+    }
+
+    // Wait until the cas client has finished warming up, commands sent before then run at cold start speed.
+    public async waitUntilReady(): Promise<void> {
+        await this.ready_response;
     }
 
     // Close server / client connection, and shutdown client process.
@@ -182,7 +308,8 @@ export class CasServer {
     }
 
     // Send a message to the cas client.
-    public send(message: ServerMessage): SendResult {
+    // on_partial is called with every partial response to the message, if it was started with stream set.
+    public send(message: ServerMessage, on_partial?: (response: PartialResponse) => void): SendResult {
 
         const message_uid = crypto.randomUUID();
 
@@ -192,26 +319,39 @@ export class CasServer {
             payload: message.payload
         };
 
-        const result_promise = new Promise<SuccessResponse>((resolve, reject) => {
-            this.message_promises[server_message.uid] = {
-                sent_time: this.getTime(),
-                resolve: resolve,
-                reject: reject,
-            };
-        });
+        const result_promise = this.expectResponse(message_uid, on_partial);
 
-        this.ws_cas_client.send(JSON.stringify(server_message));
+        this.ws_cas_client.send(
+            this.encoding === MessageEncoding.MSGPACK ? encode(server_message) : JSON.stringify(server_message)
+        );
 
         return { uid: message_uid, response: result_promise };
     }
 
+    // Send multiple commands sharing the given environment to the cas client in a single message.
+    // The environment is either given in full, or as the environment_id of an open environment session,
+    // and should not be part of the start args of the commands.
+    // Returns a SendResult for each command, in the order they were given.
+    public sendBatch(
+        batch_environment: { environment: GenericPayload } | { environment_id: string },
+        commands: StartCommandPayload[]
+    ): SendResult[] {
+        const items: BatchItemPayload[] = commands.map((command) => ({ ...command, uid: crypto.randomUUID() }));
+
+        const results = items.map((item) => ({ uid: item.uid, response: this.expectResponse(item.uid) }));
+
+        this.send(new StartBatchMessage({ ...batch_environment, items: items }));
+
+        return results;
+    }
+
     // retreive a list of UID's of messages who has not responded for more than min_hang_time ms.
     public getHangingMessages(options: { min_hang_time: UnixTimestampMillis }): string[] {
         const current_time = this.getTime();
 
         return Object.keys(this.message_promises).filter((key) => {
             const entry = this.message_promises[key];
-            return current_time - entry.sent_time >= options.min_hang_time;
+            return !this.background_uids.has(key) && current_time - entry.sent_time >= options.min_hang_time;
         });
     }
 
@@ -227,7 +367,33 @@ export class CasServer {
     private error_callback: (usr_error: string, dev_error: string) => void;
 
     private message_promises: Record<string, MessagePromiseEntry> = {};
+    // uids of messages awaiting a response in the background, which are not commands, e.g. the ready message.
+    private background_uids: Set<string> = new Set();
+    private ready_response: Promise<SuccessResponse>;
+    // encoding of sent messages, received messages are decoded based on their frame type instead.
+    private encoding: MessageEncoding = MessageEncoding.JSON;
+
+    // Agree on the most compact encoding supported by the cas client, messages are sent as json until then.
+    private async negotiateEncoding(): Promise<void> {
+        const response = await this.send(new ProtocolMessage({
+            encodings: [MessageEncoding.MSGPACK, MessageEncoding.JSON]
+        })).response;
+
+        this.encoding = response.payload.value.encoding as MessageEncoding;
+    }
+
 
+    // Create a promise resolved by the response to the message with the given uid.
+    private expectResponse(message_uid: string, on_partial?: (response: PartialResponse) => void): Promise<SuccessResponse> {
+        return new Promise<SuccessResponse>((resolve, reject) => {
+            this.message_promises[message_uid] = {
+                sent_time: this.getTime(),
+                resolve: resolve,
+                reject: reject,
+                on_partial: on_partial,
+            };
+        });
+    }
 
     private resolveConnection(resolve: (value: WebSocket) => void, _reject: (reason: string) => void) {
         this.ws_cas_server.once('connection', (ws) => {
@@ -240,8 +406,18 @@ export class CasServer {
     // i.e.
     // await send() -> message has uid 1 -> response with uid 1 is resolved.
     // await handleMessage() -> makes sure that the send promise is resolved.
-    private handleMessage(response_buffer: RawData): void {
-        const response: ClientResponse = JSON.parse(response_buffer.toString());
+    private handleMessage(response_buffer: RawData, is_binary: boolean): void {
+        const response = (
+            is_binary
+                ? decode(Array.isArray(response_buffer) ? Buffer.concat(response_buffer) : response_buffer)
+                : JSON.parse(response_buffer.toString())
+        ) as ClientResponse;
+
+        // partial responses are followed by a final response, so the message promise is kept around.
+        if (response.status === MessageStatus.PARTIAL) {
+            this.message_promises[response.uid]?.on_partial?.(response as PartialResponse);
+            return;
+        }
 
         // first retreive the message promise to resolve (if present).
 
@@ -252,6 +428,8 @@ export class CasServer {
             delete this.message_promises[response.uid];
         }
 
+        this.background_uids.delete(response.uid);
+
         // now handle the response depending on its status.
 
         switch (response.status) {
@@ -28,3 +28,12 @@ test('Test CAS Handler Interruption', async () => {
 
     await Promise.all(sent_messages.map(x => expect(x.response).rejects.toThrow('Interrupted')));
 });
+
+test('Test CAS Ready Message Not Hanging', async () => {
+    // the ready message is still waiting on the warm-up here, but is not a command.
+    expect(server.getCurrentMessages()).toEqual([]);
+
+    await new HandlerInterrupter(server, response_verifier).interruptAllHandlers();
+
+    await expect(server.waitUntilReady()).resolves.toBeUndefined();
+});